@@ -1,6 +1,138 @@
+import time
 import numpy as np
 
+
+def trapezoid(x, a, b, c, d):
+    """Trapezoidal membership with feet a, d and shoulders b, c (broadcasting)"""
+    rise = np.where(b > a, (x - a) / np.where(b > a, b - a, 1.0), (x >= b).astype(float))
+    fall = np.where(d > c, (d - x) / np.where(d > c, d - c, 1.0), (x <= c).astype(float))
+    return np.clip(np.minimum(rise, fall), 0.0, 1.0)
+
+
+class DICModel:
+    """
+    Discrete Incremental Clustering.
+
+    Clusters are held in preallocated (k x d) left/kernel/right arrays that
+    grow geometrically; feature ranges are computed once per fit. Each sample
+    is tested against all clusters in one vectorized pass and joins the first
+    cluster (in creation order) whose membership min_d exp(-|kernel - x|)
+    reaches IT, exactly like the original per-cluster loop.
+    """
+
+    def __init__(self, IT, SLOPE, ranges=None, capacity=64):
+        self.IT = IT
+        self.SLOPE = SLOPE
+        self.ranges = None if ranges is None else np.asarray(ranges, dtype=float)
+        self.fixed_ranges = ranges is not None
+        self.capacity = capacity
+        self.k = 0
+        self._left = None
+        self._kernel = None
+        self._right = None
+        self.labels_ = None
+
+    @property
+    def left(self):
+        return self._left[:self.k]
+
+    @property
+    def kernel(self):
+        return self._kernel[:self.k]
+
+    @property
+    def right(self):
+        return self._right[:self.k]
+
+    def _allocate(self, d):
+        self._left = np.empty((self.capacity, d))
+        self._kernel = np.empty((self.capacity, d))
+        self._right = np.empty((self.capacity, d))
+
+    def _grow(self):
+        cap = 2 * self._kernel.shape[0]
+        for name in ('_left', '_kernel', '_right'):
+            old = getattr(self, name)
+            new = np.empty((cap, old.shape[1]))
+            new[:self.k] = old[:self.k]
+            setattr(self, name, new)
+
+    def fit(self, X):
+        """Cluster X from scratch; feature ranges are taken from X unless given"""
+        X = np.asarray(X, dtype=float)
+        self.k = 0
+        self._allocate(X.shape[1])
+        if not self.fixed_ranges:
+            self.ranges = np.max(X, axis=0) - np.min(X, axis=0)
+        return self.partial_fit(X)
+
+    def partial_fit(self, X):
+        """Continue clustering with new samples (ranges stay fixed)"""
+        X = np.asarray(X, dtype=float)
+        if self._kernel is None:
+            self._allocate(X.shape[1])
+        if self.ranges is None:
+            self.ranges = np.max(X, axis=0) - np.min(X, axis=0)
+        spread = self.SLOPE * self.ranges
+        labels = np.empty(len(X), dtype=np.int64)
+
+        for i in range(len(X)):
+            x = X[i]
+            j = -1
+            if self.k:
+                kernel = self._kernel[:self.k]
+                mu = np.exp(-np.max(np.abs(kernel - x), axis=1))
+                hits = np.flatnonzero(mu >= self.IT)
+                if len(hits):
+                    j = hits[0]
+            if j >= 0:
+                above = x > self._kernel[j]
+                self._right[j, above] = x[above] + spread[above]
+                self._left[j, ~above] = x[~above] - spread[~above]
+                self._kernel[j] = (self._kernel[j] + x) / 2
+            else:
+                if self.k == self._kernel.shape[0]:
+                    self._grow()
+                j = self.k
+                self._left[j] = x - spread
+                self._right[j] = x + spread
+                self._kernel[j] = x
+                self.k += 1
+            labels[i] = j
+
+        self.labels_ = labels
+        return self
+
+    def fuzzify(self, X, per_dim=False, chunk_size=4096):
+        """
+        Trapezoidal memberships of X in every cluster.
+
+        Each cluster is a trapezoid per dimension with feet left/right and
+        its (degenerate) core at the kernel. Returns (n, k) memberships
+        combined with the min t-norm, or (n, k, d) with per_dim=True.
+        """
+        X = np.asarray(X, dtype=float)
+        n, d = X.shape
+        left, kernel, right = self.left, self.kernel, self.right
+        out = np.empty((n, self.k, d) if per_dim else (n, self.k))
+        for start in range(0, n, chunk_size):
+            x = X[start:start + chunk_size, None, :]
+            mu = trapezoid(x, left, kernel, kernel, right)
+            out[start:start + chunk_size] = mu if per_dim else mu.min(axis=2)
+        return out
+
+    def clusters(self):
+        """Clusters as a list of {'left', 'right', 'kernel'} dicts"""
+        return [{'left': self._left[j].copy(), 'right': self._right[j].copy(), 'kernel': self._kernel[j].copy()}
+                for j in range(self.k)]
+
+
 def DIC(X, IT, SLOPE):
+    return DICModel(IT, SLOPE).fit(X).clusters()
+
+
+def _DIC_reference(X, IT, SLOPE):
+    # Original per-sample/per-cluster/per-dimension loop, kept for parity checks and benchmarking
     clusters = []
     n, d = X.shape
     for i in range(n):
@@ -22,4 +154,28 @@ def DIC(X, IT, SLOPE):
             left = X[i]-SLOPE*(np.max(X,axis=0)-np.min(X,axis=0))
             right = X[i]+SLOPE*(np.max(X,axis=0)-np.min(X,axis=0))
             clusters.append({'left': left, 'right': right, 'kernel': X[i].copy()})
-    return clusters
\ No newline at end of file
+    return clusters
+
+
+def benchmark(sizes=(2000, 8000), IT=0.98, SLOPE=0.1):
+    """Time the reference loop against DICModel on hourly price features and check they agree"""
+    from features import load_feature_matrix
+    rows = []
+    for n in sizes:
+        X = load_feature_matrix('hour', n_samples=n)
+        t0 = time.perf_counter()
+        ref = _DIC_reference(X, IT, SLOPE)
+        t1 = time.perf_counter()
+        new = DIC(X, IT, SLOPE)
+        t2 = time.perf_counter()
+        same = len(ref) == len(new) and all(
+            np.array_equal(a[key], b[key]) for a, b in zip(ref, new) for key in ('left', 'kernel', 'right')
+        )
+        rows.append((n, len(new), t1 - t0, t2 - t1, same))
+        print(f"n={n:6d} clusters={len(new):4d} reference={t1 - t0:8.3f}s "
+              f"vectorized={t2 - t1:7.3f}s speedup={(t1 - t0) / (t2 - t1):6.1f}x identical={same}")
+    return rows
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -1,6 +1,167 @@
 import numpy as np
 
+
+class EFCMModel:
+    """
+    Evolving Fuzzy C-Means.
+
+    Centers and radii live in growable arrays and the assignment of every
+    sample is recorded as an int label (the cluster that absorbed, created or
+    already contained it) instead of a dense (n x c) indicator matrix.
+    Memberships and the objective are computed in row chunks from
+    ||x||^2 - 2 x.c + ||c||^2, so the temporaries are (chunk_size x c)
+    arrays whatever the feature dimension.
+    """
+
+    def __init__(self, Dthr, capacity=64, chunk_size=16384):
+        self.Dthr = Dthr
+        self.capacity = capacity
+        self.chunk_size = chunk_size
+        self.k = 0
+        self._centers = None
+        self._radii = None
+        self.labels_ = None
+
+    @property
+    def centers(self):
+        return self._centers[:self.k]
+
+    @property
+    def radii(self):
+        return self._radii[:self.k]
+
+    def _grow(self):
+        cap = 2 * self._centers.shape[0]
+        centers = np.empty((cap, self._centers.shape[1]))
+        centers[:self.k] = self._centers[:self.k]
+        radii = np.zeros(cap)
+        radii[:self.k] = self._radii[:self.k]
+        self._centers, self._radii = centers, radii
+
+    def _add_center(self, x):
+        if self.k == self._centers.shape[0]:
+            self._grow()
+        self._centers[self.k] = x
+        self._radii[self.k] = 0.
+        self.k += 1
+        return self.k - 1
+
+    def fit(self, X):
+        X = np.asarray(X, dtype=float)
+        self.k = 0
+        self._centers = np.empty((self.capacity, X.shape[1]))
+        self._radii = np.zeros(self.capacity)
+        return self.partial_fit(X)
+
+    def partial_fit(self, X):
+        X = np.asarray(X, dtype=float)
+        labels = np.empty(len(X), dtype=np.int64)
+        start = 0
+        if self._centers is None:
+            self._centers = np.empty((self.capacity, X.shape[1]))
+            self._radii = np.zeros(self.capacity)
+        if self.k == 0 and len(X):
+            labels[0] = self._add_center(X[0])
+            start = 1
+
+        two_dthr = 2 * self.Dthr
+        for i in range(start, len(X)):
+            x = X[i]
+            c = self._centers[:self.k]
+            r = self._radii[:self.k]
+            dist = np.sqrt(np.sum((x - c)**2, axis=1))
+            inside = np.flatnonzero(dist <= r)
+            if len(inside):
+                labels[i] = inside[0]
+                continue
+            idx = np.argmin(dist)
+            if dist[idx] + r[idx] > two_dthr:
+                labels[i] = self._add_center(x)
+            else:
+                S = dist[idx] + r[idx]
+                r[idx] = S/2
+                direction = x - c[idx]
+                normd = np.linalg.norm(direction)
+                if normd>1e-12:
+                    direction *= (r[idx]/normd)
+                c[idx] = x - direction
+                labels[i] = idx
+
+        self.labels_ = labels
+        return self
+
+    def _distances(self, X):
+        C = self.centers
+        x_sq = np.einsum('ij,ij->i', X, X)
+        c_sq = np.einsum('ij,ij->i', C, C)
+        D2 = x_sq[:, None] - 2 * (X @ C.T) + c_sq[None, :]
+        # The expansion cancels for (near-)coincident pairs; recompute those exactly so that
+        # a sample on a center still gets distance 0
+        rows, cols = np.nonzero(D2 <= 1e-8 * (x_sq[:, None] + c_sq[None, :]))
+        if len(rows):
+            diff = X[rows] - C[cols]
+            D2[rows, cols] = np.einsum('ij,ij->i', diff, diff)
+        return np.sqrt(np.maximum(D2, 0.))
+
+    def memberships(self, X, out=None):
+        """
+        Fuzzy memberships (n x c), computed chunk by chunk.
+
+        out may be a preallocated (e.g. memory-mapped) array. A sample that
+        coincides with a center gets membership 1 there while the other
+        entries of its row hold the unnormalized 1/d^2 weights, which is what
+        the original double loop produced.
+        """
+        X = np.asarray(X, dtype=float)
+        n = len(X)
+        if out is None:
+            out = np.zeros((n, self.k))
+        for s in range(0, n, self.chunk_size):
+            D = self._distances(X[s:s + self.chunk_size])
+            zero = D < 1e-12
+            with np.errstate(divide='ignore'):
+                inv = np.where(zero, 0., (1.0/np.where(zero, 1., D))**2)
+            denom = inv.sum(axis=1)
+            has_zero = zero.any(axis=1)
+
+            U = np.zeros_like(D)
+            normal = ~has_zero & (denom >= 1e-12)
+            U[normal] = inv[normal] / denom[normal, None]
+
+            rows = np.flatnonzero(has_zero)
+            if len(rows):
+                U[rows] = inv[rows]
+                U[rows, np.argmax(zero[rows], axis=1)] = 1
+            out[s:s + len(D)] = U
+        return out
+
+    def objective(self, X, U=None):
+        """sum_ij U_ij * ||x_i - c_j||, memberships computed on the fly when U is not given"""
+        X = np.asarray(X, dtype=float)
+        val = 0.
+        for s in range(0, len(X), self.chunk_size):
+            chunk = X[s:s + self.chunk_size]
+            D = self._distances(chunk)
+            Uc = self.memberships(chunk) if U is None else U[s:s + len(chunk)]
+            val += np.sum(Uc * D)
+        return val
+
+
 def EFCM(X, Dthr):
+    model = EFCMModel(Dthr).fit(X)
+    c = list(model.centers.copy())
+    r = list(model.radii)
+    return c, r, model.memberships(X)
+
+def EFCM_objective(X, c, U):
+    model = EFCMModel(None)
+    model._centers = np.asarray(c, dtype=float)
+    model.k = len(model._centers)
+    return model.objective(X, U)
+
+
+def _EFCM_reference(X, Dthr):
+    # Original implementation, kept for parity checks
     c = [X[0].copy()]
     r = [0.]
     n, d = X.shape
@@ -53,7 +214,8 @@ def EFCM(X, Dthr):
             U[i,j] = ((1.0/dvals[j])**2)/denom
     return c, r, U
 
-def EFCM_objective(X, c, U):
+
+def _EFCM_objective_reference(X, c, U):
     val=0
     for i in range(X.shape[0]):
         for j in range(len(c)):
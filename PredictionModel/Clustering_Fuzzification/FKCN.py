@@ -1,21 +1,79 @@
 import numpy as np
 
-def FCKN(X, c, m, lr, max_iter):
+EPS = 1e-12
+
+
+def _sq_distances(X, V, x_sq=None):
+    # ||x - v||^2 = ||x||^2 - 2 x.v + ||v||^2, clipped against round-off
+    if x_sq is None:
+        x_sq = np.einsum('ij,ij->i', X, X)
+    v_sq = np.einsum('ij,ij->i', V, V)
+    D2 = x_sq[:, None] - 2 * (X @ V.T) + v_sq[None, :]
+    return np.maximum(D2, EPS)
+
+
+def FCKN_memberships(X, V, m, chunk_size=16384, dtype=None):
+    """Fuzzy memberships (n x c) of X to prototypes V, computed in row chunks"""
+    dtype = dtype or V.dtype
+    X = np.asarray(X, dtype=dtype)
+    V = np.asarray(V, dtype=dtype)
+    U = np.empty((len(X), len(V)), dtype=dtype)
+    for s in range(0, len(X), chunk_size):
+        # dist^(2/(m-1)) == (dist^2)^(1/(m-1))
+        w = _sq_distances(X[s:s + chunk_size], V) ** (-1 / (m - 1))
+        U[s:s + chunk_size] = w / w.sum(axis=1, keepdims=True)
+    return U
+
+
+def FCKN(X, c, m, lr, max_iter, batch_size=None, dtype=np.float64, seed=None, return_U=True, chunk_size=16384):
+    """
+    Fuzzy Kohonen Clustering Network.
+
+    batch_size=None trains online, one sample at a time (the original
+    algorithm). With a batch_size every epoch visits X in shuffled
+    mini-batches: distances of the whole batch come from one matrix product
+    and each winning prototype moves towards the membership-weighted mean of
+    the samples it won, by min(1, lr * sum of their memberships) -- the
+    step the online updates would take for small lr.
+
+    dtype=np.float32 halves memory and bandwidth; seed makes the prototype
+    initialization and the batch order reproducible. Memberships are only
+    computed once at the end (in chunks), or not at all with return_U=False.
+    """
+    rng = np.random.default_rng(seed) if seed is not None else None
+    X = np.asarray(X, dtype=dtype)
     n, d = X.shape
-    V = X[np.random.choice(n, c, replace=False)]
-    U = np.zeros((n, c))
-    for _ in range(max_iter):
-        for i in range(n):
-            dist = np.linalg.norm(X[i] - V, axis=1)
-            idx = np.argmin(dist)
-            num = dist[idx]**(2/(m-1))
-            denom = np.sum((dist**(2/(m-1)))**-1)**-1
-            alpha = (num**-1)*denom
-            V[idx] += lr * alpha * (X[i] - V[idx])
-        for i in range(n):
-            dist = np.linalg.norm(X[i] - V, axis=1)
-            denom = np.sum((dist**(2/(m-1)))**-1)**-1
-            for j in range(c):
-                num = dist[j]**(2/(m-1))
-                U[i,j] = (num**-1)*denom
-    return V, U
\ No newline at end of file
+    init = rng.choice(n, c, replace=False) if rng is not None else np.random.choice(n, c, replace=False)
+    V = X[init].copy()
+
+    if batch_size is None:
+        for _ in range(max_iter):
+            for i in range(n):
+                dist = np.linalg.norm(X[i] - V, axis=1)
+                idx = np.argmin(dist)
+                num = dist[idx]**(2/(m-1))
+                denom = np.sum((dist**(2/(m-1)))**-1)**-1
+                alpha = (num**-1)*denom
+                V[idx] += lr * alpha * (X[i] - V[idx])
+    else:
+        x_sq = np.einsum('ij,ij->i', X, X)
+        rows = np.arange(c)
+        for _ in range(max_iter):
+            order = rng.permutation(n) if rng is not None else np.random.permutation(n)
+            for s in range(0, n, batch_size):
+                batch = order[s:s + batch_size]
+                xb = X[batch]
+                w = _sq_distances(xb, V, x_sq[batch]) ** (-1 / (m - 1))
+                winner = np.argmax(w, axis=1)
+                alpha = w[np.arange(len(batch)), winner] / w.sum(axis=1)
+
+                # Membership-weighted sums per winning prototype
+                weights = (winner[None, :] == rows[:, None]) * alpha[None, :]
+                mass = weights.sum(axis=1)
+                won = mass > 0
+                target = (weights[won] @ xb) / mass[won, None]
+                step = np.minimum(1.0, lr * mass[won])[:, None].astype(dtype)
+                V[won] += step * (target - V[won])
+
+    U = FCKN_memberships(X, V, m, chunk_size) if return_U else None
+    return V, U
@@ -1,24 +1,136 @@
 import numpy as np
-def FuzzyART(X, alpha, rho, beta, epochs):
-    n, d = X.shape
-    w = []
-    categories = []
-    for _ in range(epochs):
-        for i in range(n):
-            T = []
-            for j in range(len(w)):
-                numer = np.sum(np.minimum(X[i], w[j]))
-                denom = alpha + np.sum(w[j])
-                T.append(numer/denom)
-            if len(T)==0:
-                w.append(X[i].copy())
-                categories.append([i])
+
+
+class FuzzyARTModel:
+    """
+    Fuzzy ART with category weights in a preallocated matrix.
+
+    The weight matrix grows geometrically, the category sizes |w_j| are kept
+    alongside it, and choice T_j = |x ^ w_j| / (alpha + |w_j|) and match
+    |x ^ w_j| / |x| are evaluated for all categories in one vectorized call.
+    labels_ holds the category of every sample of the last pass.
+    """
+
+    VERSION = 1
+
+    def __init__(self, alpha, rho, beta, capacity=64):
+        self.alpha = alpha
+        self.rho = rho
+        self.beta = beta
+        self.capacity = capacity
+        self.k = 0
+        self._w = None
+        self._wsum = None
+        self.labels_ = None
+
+    @property
+    def weights(self):
+        return self._w[:self.k]
+
+    def _allocate(self, d):
+        self._w = np.empty((self.capacity, d))
+        self._wsum = np.empty(self.capacity)
+
+    def _add_category(self, x):
+        if self.k == self._w.shape[0]:
+            cap = 2 * self._w.shape[0]
+            w = np.empty((cap, self._w.shape[1]))
+            w[:self.k] = self._w[:self.k]
+            wsum = np.empty(cap)
+            wsum[:self.k] = self._wsum[:self.k]
+            self._w, self._wsum = w, wsum
+        self._w[self.k] = x
+        self._wsum[self.k] = np.sum(x)
+        self.k += 1
+        return self.k - 1
+
+    def fit(self, X, epochs=1):
+        X = np.asarray(X, dtype=float)
+        self.k = 0
+        self._allocate(X.shape[1])
+        for _ in range(epochs):
+            self.partial_fit(X)
+        return self
+
+    def partial_fit(self, X):
+        """One learning pass over X, continuing from the current categories"""
+        X = np.asarray(X, dtype=float)
+        if self._w is None:
+            self._allocate(X.shape[1])
+        labels = np.empty(len(X), dtype=np.int64)
+        buf = np.empty_like(self._w)
+        for i in range(len(X)):
+            x = X[i]
+            if self.k == 0:
+                labels[i] = self._add_category(x)
                 continue
-            jdx = np.argmax(T)
-            if np.sum(np.minimum(X[i], w[jdx]))/np.sum(X[i]) >= rho:
-                w[jdx] = beta*np.minimum(X[i], w[jdx]) + (1-beta)*w[jdx]
-                categories[jdx].append(i)
+            if buf.shape[0] < self._w.shape[0]:
+                buf = np.empty_like(self._w)
+            w = self._w[:self.k]
+            inter = np.sum(np.minimum(x, w, out=buf[:self.k]), axis=1)
+            jdx = np.argmax(inter / (self.alpha + self._wsum[:self.k]))
+            if inter[jdx]/np.sum(x) >= self.rho:
+                w[jdx] = self.beta*np.minimum(x, w[jdx]) + (1-self.beta)*w[jdx]
+                self._wsum[jdx] = np.sum(w[jdx])
+                labels[i] = jdx
             else:
-                w.append(X[i].copy())
-                categories.append([i])
+                labels[i] = self._add_category(x)
+        self.labels_ = labels
+        return self
+
+    def choice_match(self, X, chunk_size=None):
+        """Choice (n x k) and match (n x k) of every sample against every category"""
+        X = np.asarray(X, dtype=float)
+        n, d = X.shape
+        chunk_size = chunk_size or max(1, 4_000_000 // max(1, self.k * d))
+        T = np.empty((n, self.k))
+        M = np.empty((n, self.k))
+        w = self.weights
+        for s in range(0, n, chunk_size):
+            xb = X[s:s + chunk_size]
+            inter = np.minimum(xb[:, None, :], w[None, :, :]).sum(axis=2)
+            T[s:s + len(xb)] = inter / (self.alpha + self._wsum[:self.k])
+            M[s:s + len(xb)] = inter / xb.sum(axis=1, keepdims=True)
+        return T, M
+
+    def predict(self, X, chunk_size=None):
+        """Category with the highest choice for every sample, -1 where it fails the vigilance test"""
+        T, M = self.choice_match(X, chunk_size)
+        labels = np.argmax(T, axis=1)
+        labels[M[np.arange(len(labels)), labels] < self.rho] = -1
+        return labels
+
+    def save(self, path):
+        np.savez_compressed(path, version=self.VERSION, alpha=self.alpha, rho=self.rho, beta=self.beta,
+                            weights=self.weights)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            if int(data['version']) != cls.VERSION:
+                raise ValueError(f"Unsupported FuzzyART checkpoint version {int(data['version'])}")
+            model = cls(float(data['alpha']), float(data['rho']), float(data['beta']))
+            weights = data['weights']
+        model.capacity = max(model.capacity, len(weights))
+        model._allocate(weights.shape[1])
+        model._w[:len(weights)] = weights
+        model._wsum[:len(weights)] = weights.sum(axis=1)
+        model.k = len(weights)
+        return model
+
+
+def FuzzyART(X, alpha, rho, beta, epochs):
+    model = FuzzyARTModel(alpha, rho, beta)
+    X = np.asarray(X, dtype=float)
+    epoch_labels = []
+    for _ in range(epochs):
+        epoch_labels.append(model.partial_fit(X).labels_)
+    # Per-category sample indices in visiting order, as the list-based version accumulated them
+    categories = [[] for _ in range(model.k)]
+    for labels in epoch_labels:
+        order = np.argsort(labels, kind='stable')
+        bounds = np.searchsorted(labels[order], np.arange(model.k + 1))
+        for j in range(model.k):
+            categories[j].extend(order[bounds[j]:bounds[j + 1]].tolist())
+    w = [row.copy() for row in model.weights]
     return w, categories
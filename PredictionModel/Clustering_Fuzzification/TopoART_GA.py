@@ -1,5 +1,8 @@
 import numpy as np
 
+ALPHA = 1e-4
+
+
 def complement_code(X):
     """
     Perform complement coding on input array X.
@@ -15,38 +18,93 @@ class TopoARTLayer:
       - candidate nodes (noise handling)
       - optional partial learning for the second best match
       - topology edges
+
+    Nodes are stored column-wise: a weight matrix that grows geometrically,
+    plus per-node |w|, count and permanent arrays. Edges are an undirected
+    edge list (i < j) that is converted to CSR adjacency when the topology is
+    read. Removing candidate nodes compacts all arrays and remaps the edge
+    endpoints to the new node indices.
     """
 
-    def __init__(self, vigilance=0.9, beta_sbm=0.5, phi=5, max_min_dist=1.0):
+    def __init__(self, vigilance=0.9, beta_sbm=0.5, phi=5, max_min_dist=1.0, capacity=64):
         """
         :param vigilance: 0 < vigilance <= 1. Smaller => bigger categories.
         :param beta_sbm: partial learning rate for second best match in [0..1].
         :param phi: node candidate threshold; if node's counter < phi after some time, remove it.
         :param max_min_dist: maximum complement-coded distance allowed. Usually = 2*d if no normalization is done.
+        :param capacity: initial number of preallocated node slots.
         """
         self.vigilance = vigilance
         self.beta_sbm = beta_sbm
         self.phi = phi
         self.max_min_dist = max_min_dist
+        self.capacity = capacity
+
+        self.n_nodes = 0
+        # w: (capacity, dim) category weights, wsum: |w| per node, count: samples learned by each node,
+        # permanent: node reached phi samples, uid: id that stays with a node when candidates are removed.
+        # dim is 0 until the first node fixes it.
+        self._allocate(0)
+        self.next_uid = 0
+        self._edges = np.empty((0, 2), dtype=np.int64)   # undirected edge list, i < j
+        self.n_edges = 0
+        self._edge_set = set()
+
+    @property
+    def weights(self):
+        return self.w[:self.n_nodes]
+
+    @property
+    def uids(self):
+        return self.uid[:self.n_nodes]
+
+    @property
+    def edges(self):
+        return self._edges[:self.n_edges]
+
+    @property
+    def nodes(self):
+        """Snapshot of the nodes as dicts ({'w', 'count', 'edges', 'permanent'})"""
+        neighbours = [set() for _ in range(self.n_nodes)]
+        for i, j in self.edges:
+            neighbours[i].add(int(j))
+            neighbours[j].add(int(i))
+        return [{'w': self.w[i].copy(), 'count': int(self.count[i]), 'edges': neighbours[i],
+                 'permanent': bool(self.permanent[i])} for i in range(self.n_nodes)]
+
+    def _allocate(self, dim):
+        self.w = np.empty((self.capacity, dim))
+        self.wsum = np.empty(self.capacity)
+        self.count = np.zeros(self.capacity, dtype=np.int64)
+        self.permanent = np.zeros(self.capacity, dtype=bool)
+        self.uid = np.zeros(self.capacity, dtype=np.int64)
+
+    def _grow(self):
+        cap = 2 * self.w.shape[0]
+        n = self.n_nodes
+        w = np.empty((cap, self.w.shape[1]))
+        w[:n] = self.w[:n]
+        wsum = np.empty(cap)
+        wsum[:n] = self.wsum[:n]
+        count = np.zeros(cap, dtype=np.int64)
+        count[:n] = self.count[:n]
+        permanent = np.zeros(cap, dtype=bool)
+        permanent[:n] = self.permanent[:n]
+        uid = np.zeros(cap, dtype=np.int64)
+        uid[:n] = self.uid[:n]
+        self.w, self.wsum, self.count, self.permanent, self.uid = w, wsum, count, permanent, uid
 
-        # Each node will store:
-        # w   => category weights
-        # count => how many samples have been learned by this node
-        # edges => set of node indices it connects to
-        self.nodes = []  # list of dict: [{'w':..., 'count':..., 'edges':set(...), 'permanent': bool}, ...]
-        
     def _choice_function(self, x, w):
         """
         Fuzzy ART choice function: activation = |x AND w| / (alpha + |w|)
         We set alpha = 0.0001
         x AND w => component-wise min
         """
-        alpha = 1e-4
         intersection = np.minimum(x, w)
-        numer = np.sum(intersection)
-        denom = alpha + np.sum(w)
+        numer = np.sum(intersection, axis=-1)
+        denom = ALPHA + np.sum(w, axis=-1)
         return numer / denom
-    
+
     def _match_function(self, x, w):
         """
         Fuzzy ART match function:
@@ -54,7 +112,7 @@ class TopoARTLayer:
         Must be >= vigilance for resonance.
         """
         intersection = np.minimum(x, w)
-        numer = np.sum(intersection)
+        numer = np.sum(intersection, axis=-1)
         denom = np.sum(x) + 1e-12
         return numer / denom
 
@@ -69,115 +127,226 @@ class TopoARTLayer:
         else:
             return beta * intersection + (1.0 - beta) * w
 
+    def resonance(self, x):
+        """Activation and match of x against all nodes, in one vectorized pass"""
+        if self.n_nodes == 0:
+            return np.empty(0), np.empty(0)
+        numer = np.sum(np.minimum(x, self.w[:self.n_nodes]), axis=1)
+        activation = numer / (ALPHA + self.wsum[:self.n_nodes])
+        match = numer / (np.sum(x) + 1e-12)
+        return activation, match
+
+    def _best(self, activation, match, exclude=None):
+        """Highest activation among nodes that pass vigilance (lowest index on ties), or None"""
+        candidates = np.where(match >= self.vigilance, activation, -np.inf)
+        if exclude is not None:
+            candidates[exclude] = -np.inf
+        if len(candidates) == 0:
+            return None
+        idx = int(np.argmax(candidates))
+        return idx if candidates[idx] > -np.inf else None
+
+    def best_match(self, x):
+        """Best match id that passes vigilance, or None if no match found"""
+        return self._best(*self.resonance(x))
+
     def insert_node(self, x):
         """
         Insert a brand new node representing x.
         This node is initially a candidate (count=1).
         """
-        node_dict = {
-            'w': x.copy(),
-            'count': 1,
-            'edges': set(),
-            'permanent': False
-        }
-        self.nodes.append(node_dict)
-        return len(self.nodes) - 1
+        if self.n_nodes == 0 and self.w.shape[1] != len(x):
+            self._allocate(len(x))
+        if self.n_nodes == self.w.shape[0]:
+            self._grow()
+        idx = self.n_nodes
+        self.w[idx] = x
+        self.wsum[idx] = np.sum(x)
+        self.count[idx] = 1
+        self.permanent[idx] = self.count[idx] >= self.phi
+        self.uid[idx] = self.next_uid
+        self.next_uid += 1
+        self.n_nodes += 1
+        return idx
+
+    def _learn(self, idx, x, full, beta=1.0):
+        self.w[idx] = self._update_weights(self.w[idx], x, full=full, beta=beta)
+        self.wsum[idx] = np.sum(self.w[idx])
+        self.count[idx] += 1
+        if self.count[idx] >= self.phi:
+            self.permanent[idx] = True
+
+    def add_edge(self, i, j):
+        key = (min(i, j), max(i, j))
+        if i == j or key in self._edge_set:
+            return
+        self._edge_set.add(key)
+        if self.n_edges == len(self._edges):
+            edges = np.empty((max(64, 2 * len(self._edges)), 2), dtype=np.int64)
+            edges[:self.n_edges] = self._edges[:self.n_edges]
+            self._edges = edges
+        self._edges[self.n_edges] = key
+        self.n_edges += 1
 
     def remove_candidate_nodes(self):
         """
-        Periodically remove nodes with count < phi.
+        Periodically remove nodes with count < phi, compacting the node arrays
+        and remapping the edges of the remaining nodes.
         """
-        new_nodes = []
-        for nd in self.nodes:
-            # If permanent or count >= phi => keep
-            if nd['permanent'] or nd['count'] >= self.phi:
-                new_nodes.append(nd)
-            # else => remove node + its edges
-        self.nodes = new_nodes
-
-    def train_sample(self, x):
-
-        # Step 1: compute activation for all nodes
-        if len(self.nodes) == 0:
-            # no nodes => create first node
-            new_id = self.insert_node(x)
-            self.nodes[new_id]['permanent'] = (self.nodes[new_id]['count'] >= self.phi)
+        n = self.n_nodes
+        if n == 0:
             return
+        keep = self.permanent[:n] | (self.count[:n] >= self.phi)
+        if keep.all():
+            return
+        new_index = np.cumsum(keep) - 1
+        m = int(keep.sum())
+        self.w[:m] = self.w[:n][keep]
+        self.wsum[:m] = self.wsum[:n][keep]
+        self.count[:m] = self.count[:n][keep]
+        self.permanent[:m] = self.permanent[:n][keep]
+        self.uid[:m] = self.uid[:n][keep]
+        self.count[m:n] = 0
+        self.permanent[m:n] = False
+        self.n_nodes = m
+
+        edges = self.edges
+        alive = keep[edges[:, 0]] & keep[edges[:, 1]]
+        remapped = new_index[edges[alive]]
+        self.n_edges = len(remapped)
+        self._edges[:self.n_edges] = remapped
+        self._edge_set = set(map(tuple, remapped.tolist()))
+
+    def adjacency(self, permanent_only=True):
+        """CSR adjacency (indptr, indices) of the node topology"""
+        n = self.n_nodes
+        edges = self.edges
+        if permanent_only and len(edges):
+            edges = edges[self.permanent[edges[:, 0]] & self.permanent[edges[:, 1]]]
+        src = np.concatenate([edges[:, 0], edges[:, 1]])
+        dst = np.concatenate([edges[:, 1], edges[:, 0]])
+        order = np.argsort(src, kind='stable')
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src, minlength=n), out=indptr[1:])
+        return indptr, dst[order]
 
-        activations = []
-        for i, nd in enumerate(self.nodes):
-            act = self._choice_function(x, nd['w'])
-            activations.append((act, i))
-        # sort by activation descending
-        activations.sort(key=lambda tup: tup[0], reverse=True)
+    def train_sample(self, x, activation=None, match=None):
+        """
+        Learn one sample. activation/match may be passed in if they were
+        already computed for x.
+
+        Returns the best matching node for x after learning (None if no node
+        resonates), i.e. the node TopoART uses to decide whether x is
+        passed on to the next layer.
+        """
+        if activation is None:
+            activation, match = self.resonance(x)
 
         # Step 2: find best match that passes vigilance
-        best_match_id = None
-        for act, idx in activations:
-            match_val = self._match_function(x, self.nodes[idx]['w'])
-            if match_val >= self.vigilance:
-                best_match_id = idx
-                break
+        best_match_id = self._best(activation, match)
 
         if best_match_id is None:
             # no suitable node => create new node
             new_id = self.insert_node(x)
-            self.nodes[new_id]['permanent'] = (self.nodes[new_id]['count'] >= self.phi)
-            return
-        else:
-            # full update best match
-            old_w = self.nodes[best_match_id]['w']
-            new_w = self._update_weights(old_w, x, full=True, beta=1.0)
-            self.nodes[best_match_id]['w'] = new_w
-            self.nodes[best_match_id]['count'] += 1
-            if not self.nodes[best_match_id]['permanent'] and (self.nodes[best_match_id]['count'] >= self.phi):
-                self.nodes[best_match_id]['permanent'] = True
-
-            # find second best match that passes vigilance
-            second_best_id = None
-            for act, idx in activations:
-                if idx == best_match_id:
-                    continue
-                match_val = self._match_function(x, self.nodes[idx]['w'])
-                if match_val >= self.vigilance:
-                    second_best_id = idx
-                    break
-            if second_best_id is not None:
-                # partial update
-                old_w2 = self.nodes[second_best_id]['w']
-                new_w2 = self._update_weights(old_w2, x, full=False, beta=self.beta_sbm)
-                self.nodes[second_best_id]['w'] = new_w2
-                self.nodes[second_best_id]['count'] += 1
-                if (not self.nodes[second_best_id]['permanent']) and (self.nodes[second_best_id]['count'] >= self.phi):
-                    self.nodes[second_best_id]['permanent'] = True
-
-                # create edges
-                self.nodes[best_match_id]['edges'].add(second_best_id)
-                self.nodes[second_best_id]['edges'].add(best_match_id)
+            new_match = self._match_function(x, self.w[new_id])
+            return new_id if new_match >= self.vigilance else None
 
-    def get_clusters(self):
+        # full update best match
+        self._learn(best_match_id, x, full=True)
+        updated = [best_match_id]
+
+        # find second best match that passes vigilance
+        second_best_id = self._best(activation, match, exclude=best_match_id)
+        if second_best_id is not None:
+            # partial update
+            self._learn(second_best_id, x, full=False, beta=self.beta_sbm)
+            updated.append(second_best_id)
+
+            # create edges
+            self.add_edge(best_match_id, second_best_id)
+
+        # Only the learned nodes changed, so only their entries need refreshing
+        for idx in updated:
+            activation[idx] = self._choice_function(x, self.w[idx])
+            match[idx] = self._match_function(x, self.w[idx])
+        return self._best(activation, match)
+
+    def resonance_batch(self, X, chunk_size=None):
+        """Activation (n x k) and match (n x k) of complement-coded samples against all nodes"""
+        n, d = X.shape
+        k = self.n_nodes
+        if k == 0:
+            return np.empty((n, 0)), np.empty((n, 0))
+        chunk_size = chunk_size or max(1, 4_000_000 // max(1, k * d))
+        T = np.empty((n, k))
+        M = np.empty((n, k))
+        w = self.weights
+        for s in range(0, n, chunk_size):
+            xb = X[s:s + chunk_size]
+            inter = np.minimum(xb[:, None, :], w[None, :, :]).sum(axis=2)
+            T[s:s + len(xb)] = inter / (ALPHA + self.wsum[:k])
+            M[s:s + len(xb)] = inter / (xb.sum(axis=1, keepdims=True) + 1e-12)
+        return T, M
 
-        visited = set()
+    def best_match_batch(self, X, chunk_size=None):
+        """Best resonating node per sample (-1 if none) and its match value"""
+        if self.n_nodes == 0:
+            return np.full(len(X), -1, dtype=np.int64), np.zeros(len(X))
+        T, M = self.resonance_batch(X, chunk_size)
+        T[M < self.vigilance] = -np.inf
+        best = np.argmax(T, axis=1)
+        rows = np.arange(len(X))
+        score = M[rows, best]
+        best[T[rows, best] == -np.inf] = -1
+        score[best < 0] = 0.
+        return best, score
+
+    def cluster_labels(self):
+        """Cluster id of every node (index into get_clusters()), -1 for candidate nodes"""
+        labels = np.full(self.n_nodes, -1, dtype=np.int64)
+        for cid, comp in enumerate(self.get_clusters()):
+            labels[comp] = cid
+        return labels
+
+    def state(self):
+        return {'w': self.weights.copy(), 'count': self.count[:self.n_nodes].copy(),
+                'permanent': self.permanent[:self.n_nodes].copy(), 'edges': self.edges.copy()}
+
+    def load_state(self, w, count, permanent, edges):
+        n = len(w)
+        self.capacity = max(self.capacity, n)
+        self._allocate(w.shape[1])
+        self.w[:n] = w
+        self.wsum[:n] = w.sum(axis=1)
+        self.count[:n] = count
+        self.permanent[:n] = permanent
+        self.uid[:n] = np.arange(n)
+        self.next_uid = n
+        self.n_nodes = n
+        self._edges = np.array(edges, dtype=np.int64).reshape(-1, 2)
+        self.n_edges = len(self._edges)
+        self._edge_set = set(map(tuple, self._edges.tolist()))
+
+    def get_clusters(self):
+        """Connected components of the permanent nodes (lists of node ids)"""
+        indptr, indices = self.adjacency(permanent_only=True)
+        visited = np.zeros(self.n_nodes, dtype=bool)
         clusters = []
-        for i, nd in enumerate(self.nodes):
-            if nd['permanent'] is False:
+        for i in np.flatnonzero(self.permanent[:self.n_nodes]):
+            if visited[i]:
                 continue
-            if i not in visited:
-                # BFS or DFS to find all connected permanent nodes
-                stack = [i]
-                comp = []
-                while stack:
-                    curr = stack.pop()
-                    if curr in visited:
-                        continue
-                    visited.add(curr)
-                    comp.append(curr)
-                    # push neighbors if permanent
-                    for nb in self.nodes[curr]['edges']:
-                        if self.nodes[nb]['permanent']:
-                            if nb not in visited:
-                                stack.append(nb)
-                clusters.append(comp)
+            # DFS to find all connected permanent nodes
+            stack = [i]
+            visited[i] = True
+            comp = []
+            while stack:
+                curr = stack.pop()
+                comp.append(int(curr))
+                for nb in indices[indptr[curr]:indptr[curr + 1]]:
+                    if not visited[nb]:
+                        visited[nb] = True
+                        stack.append(nb)
+            clusters.append(sorted(comp))
         return clusters
 
 
@@ -187,10 +356,17 @@ class TopoART:
       - TopoART_a with vigilance rho_a
       - TopoART_b with vigilance rho_b ( > rho_a)
       - Filter mechanism: only samples that resonate in layer_a and layer_a node.count >= phi => go to layer_b
+
+    fit trains from scratch, partial_fit continues from the current (or a
+    loaded) state. predict/transform score batches of samples against the
+    trained nodes in chunks; save/load persist both layers to .npz.
     """
-    def __init__(self, 
-                 rho_a=0.9, rho_b=None, 
-                 beta_sbm=0.5, phi=5, 
+
+    VERSION = 1
+
+    def __init__(self,
+                 rho_a=0.9, rho_b=None,
+                 beta_sbm=0.5, phi=5,
                  tau=100):
 
         self.rho_a = rho_a
@@ -203,49 +379,97 @@ class TopoART:
         self.phi = phi
         self.tau = tau
 
+        self._new_layers()
+
+    def _new_layers(self):
         self.layer_a = TopoARTLayer(vigilance=self.rho_a, beta_sbm=self.beta_sbm, phi=self.phi)
         self.layer_b = TopoARTLayer(vigilance=self.rho_b, beta_sbm=self.beta_sbm, phi=self.phi)
-
         self.sample_count = 0
 
     def fit(self, X):
+        """Train both layers from scratch on X"""
+        self._new_layers()
+        return self.partial_fit(X)
 
+    def partial_fit(self, X):
+        """Continue training on new samples (e.g. the next day's bars) from the current state"""
         # complement coding
-        X_cc = complement_code(X)
+        X_cc = complement_code(np.asarray(X, dtype=float))
 
         for i, x in enumerate(X_cc):
             self.sample_count += 1
 
-            # 1) train layer_a
-            self.layer_a.train_sample(x)
+            # 1) train layer_a; it returns its best match after learning
+            best_id = self.layer_a.train_sample(x)
 
             # 2) if best match in layer_a is found & node is permanent => pass x to layer_b
-            best_id = self._best_match_id(self.layer_a, x)
-            if best_id is not None:
-                # check if that node is permanent
-                if self.layer_a.nodes[best_id]['permanent']:
-                    # pass x to layer_b
-                    self.layer_b.train_sample(x)
+            if best_id is not None and self.layer_a.permanent[best_id]:
+                self.layer_b.train_sample(x)
 
             # remove candidate nodes every tau samples
             if (self.sample_count % self.tau) == 0:
                 self.layer_a.remove_candidate_nodes()
                 self.layer_b.remove_candidate_nodes()
+        return self
+
+    def _layer(self, layer):
+        if layer not in ('a', 'b'):
+            raise ValueError(f"layer must be 'a' or 'b', got {layer!r}")
+        return self.layer_a if layer == 'a' else self.layer_b
+
+    def predict(self, X, layer='a', chunk_size=None):
+        """
+        Cluster id of every sample in the given layer (ids index get_clusters_a/_b),
+        -1 if no node resonates or the best node is still a candidate.
+        Returns (labels, scores) where scores is the match of the best node.
+        """
+        lay = self._layer(layer)
+        best, score = lay.best_match_batch(complement_code(np.asarray(X, dtype=float)), chunk_size)
+        labels = np.full(len(best), -1, dtype=np.int64)
+        hit = best >= 0
+        labels[hit] = lay.cluster_labels()[best[hit]]
+        score[labels < 0] = 0.
+        return labels, score
+
+    def transform(self, X, layer='a', chunk_size=None):
+        """Fuzzy resonance (n x n_clusters): best match of each sample among the nodes of each cluster"""
+        lay = self._layer(layer)
+        node_cluster = lay.cluster_labels()
+        n_clusters = int(node_cluster.max()) + 1 if len(node_cluster) else 0
+        out = np.zeros((len(X), n_clusters))
+        if n_clusters == 0:
+            return out
+        _, M = lay.resonance_batch(complement_code(np.asarray(X, dtype=float)), chunk_size)
+        for cid in range(n_clusters):
+            out[:, cid] = M[:, node_cluster == cid].max(axis=1)
+        return out
+
+    def save(self, path):
+        """Write both layers and the hyperparameters to a compressed .npz file"""
+        arrays = {f'{name}_{key}': value
+                  for name, lay in (('a', self.layer_a), ('b', self.layer_b))
+                  for key, value in lay.state().items()}
+        np.savez_compressed(path, version=self.VERSION, rho_a=self.rho_a, rho_b=self.rho_b,
+                            beta_sbm=self.beta_sbm, phi=self.phi, tau=self.tau,
+                            sample_count=self.sample_count, **arrays)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            if int(data['version']) != cls.VERSION:
+                raise ValueError(f"Unsupported TopoART checkpoint version {int(data['version'])}")
+            model = cls(rho_a=float(data['rho_a']), rho_b=float(data['rho_b']), beta_sbm=float(data['beta_sbm']),
+                        phi=int(data['phi']), tau=int(data['tau']))
+            model.sample_count = int(data['sample_count'])
+            for name, lay in (('a', model.layer_a), ('b', model.layer_b)):
+                w = data[f'{name}_w']
+                if len(w):
+                    lay.load_state(w, data[f'{name}_count'], data[f'{name}_permanent'], data[f'{name}_edges'])
+        return model
 
     def _best_match_id(self, layer, x):
         """Return best match id that passes vigilance, or None if no match found."""
-        if len(layer.nodes) == 0:
-            return None
-        activations = []
-        for i, nd in enumerate(layer.nodes):
-            act = layer._choice_function(x, nd['w'])
-            activations.append((act, i))
-        activations.sort(key=lambda tup: tup[0], reverse=True)
-        for act, idx in activations:
-            match_val = layer._match_function(x, layer.nodes[idx]['w'])
-            if match_val >= layer.vigilance:
-                return idx
-        return None
+        return layer.best_match(x)
 
     def get_clusters_a(self):
         """Return the clusters from layer_a (connected permanent nodes)."""
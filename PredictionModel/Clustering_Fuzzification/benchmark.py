@@ -0,0 +1,163 @@
+import os
+import sys
+import json
+import time
+import resource
+import argparse
+import platform
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import runners
+from features import DATA_DIR, load_feature_matrix
+
+BENCH_DIR = os.path.join(DATA_DIR, 'clustering_benchmarks')
+RESULTS_PATH = os.path.join(BENCH_DIR, 'results.json')
+BASELINE_PATH = os.path.join(BENCH_DIR, 'baseline.json')
+
+SIZES = {
+    'daily': [2000, 10000],
+    'hour': [2000, 10000, 50000],
+    'minute': [2000, 10000, 50000],
+}
+# Parameters of each benchmarked run (runners defaults otherwise)
+PARAMS = {
+    'dic': {'IT': 0.98, 'SLOPE': 0.1},
+    'efcm': {'Dthr': 0.1},
+    'fckn': {'c': 8, 'm': 2.0, 'lr': 0.05, 'max_iter': 5, 'batch_size': 1024, 'seed': 0},
+    'fuzzyart': {'alpha': 0.001, 'rho': 0.75, 'beta': 1.0},
+    'topoart': {'rho_a': 0.9, 'phi': 5, 'tau': 100},
+}
+
+
+def _max_rss_mb():
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 2**20 if sys.platform == 'darwin' else rss / 2**10
+
+
+def _bench_case(algorithm, scale, n_samples, params, repeat):
+    """Run one case in a fresh worker process so its peak RSS is not shared with other cases"""
+    X = load_feature_matrix(scale, n_samples=n_samples)
+    rss_before = _max_rss_mb()
+    wall = np.inf
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        summary = runners.run(algorithm, X, params)
+        wall = min(wall, time.perf_counter() - t0)
+    return {
+        'key': f"{algorithm}/{scale}/{n_samples}",
+        'algorithm': algorithm, 'scale': scale, 'n_samples': len(X), 'params': params,
+        'repeat': repeat, 'wall_s': wall, 'samples_per_s': len(X) / wall if wall > 0 else np.inf,
+        'peak_rss_mb': _max_rss_mb(), 'rss_before_mb': rss_before,
+        'n_clusters': summary['n_clusters'],
+    }
+
+
+def run_benchmarks(algorithms=None, scales=None, sizes=None, repeat=3, max_workers=1):
+    """
+    Benchmark every (algorithm, scale, size) case, each in its own
+    process; wall time is the best of repeat runs. max_workers=1 keeps the
+    timings free of interference.
+    """
+    algorithms = algorithms or sorted(PARAMS)
+    scales = scales or list(SIZES)
+    cases = [(algorithm, scale, n, PARAMS[algorithm], repeat)
+             for scale in scales for n in (sizes or SIZES[scale]) for algorithm in algorithms]
+    ctx = multiprocessing.get_context('spawn')
+    results = []
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=ctx, max_tasks_per_child=1) as pool:
+        for result in pool.map(_bench_case, *zip(*cases)):
+            print(f"{result['key']:28s} {result['wall_s']:8.3f}s {result['samples_per_s']:10.0f} samples/s "
+                  f"peak_rss={result['peak_rss_mb']:7.1f}MB clusters={result['n_clusters']}")
+            results.append(result)
+    return {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'machine': {'python': platform.python_version(), 'numpy': np.__version__,
+                    'platform': platform.platform(), 'cpu_count': os.cpu_count()},
+        'results': results,
+    }
+
+
+def save(report, path):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(report, f, indent=2, default=float)
+    os.replace(tmp_path, path)
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(report, baseline, tolerance=0.25, min_delta_s=0.02):
+    """
+    Compare a report with a baseline case by case. A case regresses when its
+    wall time grows by more than tolerance (relative) and min_delta_s
+    (absolute, to ignore timer noise on tiny cases), or when its cluster
+    count changes. Returns a list of row dicts.
+    """
+    base = {r['key']: r for r in baseline['results']}
+    rows = []
+    for r in report['results']:
+        b = base.get(r['key'])
+        if b is None:
+            rows.append({'key': r['key'], 'status': 'new'})
+            continue
+        ratio = r['wall_s'] / b['wall_s'] if b['wall_s'] > 0 else np.inf
+        significant = abs(r['wall_s'] - b['wall_s']) >= min_delta_s
+        if r['n_clusters'] != b['n_clusters']:
+            status = 'clusters changed'
+        elif significant and ratio > 1 + tolerance:
+            status = 'slower'
+        elif significant and ratio < 1 / (1 + tolerance):
+            status = 'faster'
+        else:
+            status = 'ok'
+        rows.append({'key': r['key'], 'status': status, 'time_ratio': ratio,
+                     'wall_s': r['wall_s'], 'baseline_wall_s': b['wall_s'],
+                     'n_clusters': r['n_clusters'], 'baseline_n_clusters': b['n_clusters'],
+                     'peak_rss_mb': r['peak_rss_mb'], 'baseline_peak_rss_mb': b['peak_rss_mb']})
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the fuzzy clustering algorithms on the bundled price data")
+    parser.add_argument('--algorithms', nargs='+', choices=sorted(PARAMS))
+    parser.add_argument('--scales', nargs='+', choices=list(SIZES))
+    parser.add_argument('--sizes', nargs='+', type=int, help="override the sample sizes of every scale")
+    parser.add_argument('--output', default=RESULTS_PATH)
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--save-baseline', action='store_true', help="store this run as the new baseline")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(args.algorithms, args.scales, args.sizes, args.repeat)
+    save(report, args.output)
+    if args.save_baseline:
+        save(report, args.baseline)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one")
+        return 0
+
+    rows = compare(report, load(args.baseline), args.tolerance)
+    for row in rows:
+        if row['status'] == 'new':
+            print(f"{row['key']:28s} new")
+            continue
+        print(f"{row['key']:28s} {row['status']:16s} x{row['time_ratio']:5.2f} "
+              f"({row['baseline_wall_s']:.3f}s -> {row['wall_s']:.3f}s) "
+              f"clusters {row['baseline_n_clusters']} -> {row['n_clusters']}")
+    regressions = [row for row in rows if row['status'] in ('slower', 'clusters changed')]
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+import os
+import glob
+import numpy as np
+import pandas as pd
+
+DATA_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'data'))
+PRICE_DIRS = {
+    'daily': 'historical_price_daily',
+    'hour': 'historical_price_hour',
+    'minute': 'historical_prices_minute',
+}
+FEATURE_NAMES = ['log_return', 'hl_range', 'body', 'log_volume_ratio']
+
+
+def price_files(scale='hour', data_dir=DATA_DIR):
+    """Price CSVs of one granularity ('daily', 'hour' or 'minute'), sorted by ticker"""
+    return sorted(glob.glob(os.path.join(data_dir, PRICE_DIRS[scale], '*.csv')))
+
+
+def load_prices(path):
+    """OHLCV frame of one cleaned price CSV (index = timestamp)"""
+    df = pd.read_csv(path, index_col=0)
+    df = df[['Open', 'High', 'Low', 'Close', 'Volume']].apply(pd.to_numeric, errors='coerce')
+    return df.dropna()
+
+
+def price_feature_frame(df, volume_window=20):
+    """
+    Per-bar features of an OHLCV frame, indexed like df:
+    log return, high-low range, candle body (both relative to the close/open)
+    and log of volume over its rolling mean. Rows with non-finite values are dropped.
+    """
+    close = df['Close'].to_numpy(dtype=float)
+    open_ = df['Open'].to_numpy(dtype=float)
+    volume = df['Volume'].to_numpy(dtype=float)
+    log_return = np.diff(np.log(close), prepend=np.nan)
+    hl_range = (df['High'].to_numpy(dtype=float) - df['Low'].to_numpy(dtype=float)) / close
+    body = (close - open_) / open_
+    mean_volume = pd.Series(volume).rolling(volume_window, min_periods=1).mean().to_numpy()
+    log_volume_ratio = np.log((volume + 1.0) / (mean_volume + 1.0))
+    X = np.column_stack([log_return, hl_range, body, log_volume_ratio])
+    finite = np.isfinite(X).all(axis=1)
+    return pd.DataFrame(X[finite], index=df.index[finite], columns=FEATURE_NAMES)
+
+
+def price_features(df, volume_window=20):
+    """Per-bar features of an OHLCV frame as an (n, 4) float array (see price_feature_frame)"""
+    return price_feature_frame(df, volume_window).to_numpy()
+
+
+def minmax_scale(X, lo=None, hi=None):
+    """Scale columns to [0, 1] (ART-family algorithms require it)"""
+    lo = X.min(axis=0) if lo is None else lo
+    hi = X.max(axis=0) if hi is None else hi
+    span = np.where(hi > lo, hi - lo, 1.0)
+    return np.clip((X - lo) / span, 0.0, 1.0)
+
+
+def load_feature_matrix(scale='hour', n_samples=None, tickers=None, normalize=True, data_dir=DATA_DIR):
+    """
+    Stack the price features of all (or the given) tickers into one matrix.
+
+    Tickers are read in sorted order until n_samples rows are collected.
+    With normalize=True the matrix is min-max scaled to [0, 1].
+    """
+    blocks = []
+    total = 0
+    for path in price_files(scale, data_dir):
+        ticker = os.path.basename(path).split('_')[0]
+        if tickers is not None and ticker not in tickers:
+            continue
+        X = price_features(load_prices(path))
+        blocks.append(X)
+        total += len(X)
+        if n_samples is not None and total >= n_samples:
+            break
+    X = np.concatenate(blocks, axis=0) if blocks else np.empty((0, len(FEATURE_NAMES)))
+    if n_samples is not None:
+        X = X[:n_samples]
+    if normalize and len(X):
+        X = minmax_scale(X)
+    return X
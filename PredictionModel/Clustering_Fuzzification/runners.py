@@ -0,0 +1,75 @@
+import numpy as np
+
+from DIC import DICModel
+from EFCM import EFCMModel
+from FKCN import FCKN, _sq_distances
+from FuzzyArt import FuzzyARTModel
+from TopoART_GA import TopoART
+
+
+def compactness(X, labels):
+    """Mean Euclidean distance of the samples to the centroid of their cluster (label -1 is ignored)"""
+    mask = labels >= 0
+    if not mask.any():
+        return np.nan
+    X, labels = X[mask], labels[mask]
+    k = int(labels.max()) + 1
+    counts = np.bincount(labels, minlength=k)
+    sums = np.zeros((k, X.shape[1]))
+    np.add.at(sums, labels, X)
+    centroids = sums / np.maximum(counts, 1)[:, None]
+    return float(np.mean(np.linalg.norm(X - centroids[labels], axis=1)))
+
+
+def run_fuzzyart(X, alpha=0.001, rho=0.75, beta=1.0, epochs=1):
+    model = FuzzyARTModel(alpha, rho, beta).fit(X, epochs=epochs)
+    return model.labels_, model.k, None
+
+
+def run_topoart(X, rho_a=0.9, rho_b=None, beta_sbm=0.5, phi=5, tau=100, layer='a'):
+    model = TopoART(rho_a=rho_a, rho_b=rho_b, beta_sbm=beta_sbm, phi=phi, tau=tau).fit(X)
+    labels, _ = model.predict(X, layer=layer)
+    n_clusters = len(model.get_clusters_a() if layer == 'a' else model.get_clusters_b())
+    return labels, n_clusters, None
+
+
+def run_dic(X, IT=0.98, SLOPE=0.1):
+    model = DICModel(IT, SLOPE).fit(X)
+    return model.labels_, model.k, None
+
+
+def run_efcm(X, Dthr=0.1):
+    model = EFCMModel(Dthr).fit(X)
+    return model.labels_, model.k, float(model.objective(X))
+
+
+def run_fckn(X, c=8, m=2.0, lr=0.05, max_iter=5, batch_size=1024, seed=0):
+    V, U = FCKN(X, c, m, lr, max_iter, batch_size=batch_size, seed=seed)
+    # Fuzzy c-means objective sum_ij u_ij^m ||x_i - v_j||^2
+    objective = float(np.sum(U ** m * _sq_distances(X, V)))
+    return np.argmax(U, axis=1), c, objective
+
+
+RUNNERS = {
+    'fuzzyart': run_fuzzyart,
+    'topoart': run_topoart,
+    'dic': run_dic,
+    'efcm': run_efcm,
+    'fckn': run_fckn,
+}
+
+
+def run(algorithm, X, params):
+    """
+    Fit one algorithm with the given parameters and summarise the result as
+    {'n_clusters', 'compactness', 'objective'} (objective is NaN for the
+    algorithms that do not define one).
+    """
+    if algorithm not in RUNNERS:
+        raise ValueError(f"Unknown algorithm {algorithm!r}, expected one of {sorted(RUNNERS)}")
+    labels, n_clusters, objective = RUNNERS[algorithm](X, **params)
+    return {
+        'n_clusters': int(n_clusters),
+        'compactness': compactness(X, np.asarray(labels)),
+        'objective': np.nan if objective is None else objective,
+    }
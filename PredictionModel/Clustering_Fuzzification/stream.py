@@ -0,0 +1,311 @@
+import os
+import time
+import pickle
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from DIC import DICModel
+from EFCM import EFCMModel
+from FuzzyArt import FuzzyARTModel
+from TopoART_GA import TopoART, complement_code
+from features import DATA_DIR, load_feature_matrix, load_prices, minmax_scale, price_files
+
+CHECKPOINT_PATH = os.path.join(DATA_DIR, 'clustering_stream', 'checkpoint.pkl')
+CHECKPOINT_VERSION = 1
+
+
+class BarFeatures:
+    """
+    Incremental version of features.price_features for one ticker: turns
+    each new OHLCV bar into the same 4 features, keeping only the previous
+    close and the rolling volume window.
+    """
+
+    def __init__(self, volume_window=20):
+        self.prev_close = None
+        self.volumes = deque(maxlen=volume_window)
+
+    def update(self, bar):
+        """Feature vector of the bar, or None if it cannot be computed yet (first bar) or is not finite"""
+        close, open_ = float(bar['Close']), float(bar['Open'])
+        volume = float(bar['Volume'])
+        self.volumes.append(volume)
+        prev_close, self.prev_close = self.prev_close, close
+        if prev_close is None:
+            return None
+        mean_volume = sum(self.volumes) / len(self.volumes)
+        x = np.array([
+            np.log(close / prev_close),
+            (float(bar['High']) - float(bar['Low'])) / close,
+            (close - open_) / open_,
+            np.log((volume + 1.0) / (mean_volume + 1.0)),
+        ])
+        return x if np.isfinite(x).all() else None
+
+
+# One (factory, step) pair per incremental learner. factory(d, **params) builds a
+# model for d features; step(model, x) learns x and returns (cluster id, membership).
+
+def _new_fuzzyart(d, alpha=0.001, rho=0.75, beta=1.0):
+    return FuzzyARTModel(alpha, rho, beta)
+
+
+def _step_fuzzyart(model, x):
+    j = int(model.partial_fit(x[None]).labels_[0])
+    return j, float(np.sum(np.minimum(x, model.weights[j])) / np.sum(x))
+
+
+def _new_dic(d, IT=0.98, SLOPE=0.1):
+    # Samples are scaled to [0, 1], so the feature ranges are fixed at 1
+    return DICModel(IT, SLOPE, ranges=np.ones(d))
+
+
+def _step_dic(model, x):
+    j = int(model.partial_fit(x[None]).labels_[0])
+    return j, float(np.exp(-np.max(np.abs(model.kernel[j] - x))))
+
+
+def _new_efcm(d, Dthr=0.1):
+    return EFCMModel(Dthr)
+
+
+def _step_efcm(model, x):
+    j = int(model.partial_fit(x[None]).labels_[0])
+    return j, float(model.memberships(x[None])[0, j])
+
+
+class StableTopoART:
+    """
+    TopoART whose layer A cluster ids persist from bar to bar.
+
+    TopoART numbers its clusters by connected component, so the ids shift
+    whenever a component appears, merges or splits. After every update each
+    component takes the id most of its nodes had before; when several
+    components claim an id (a split), the one with the most of its nodes
+    keeps it. Components without previously labelled nodes and the rest of
+    a split get new ids, which are never reused.
+    """
+
+    def __init__(self, **params):
+        self.model = TopoART(**params)
+        self.node_cluster = {}   # layer A node uid -> cluster id
+        self.next_id = 0
+
+    def _relabel(self):
+        """Stable cluster id of every layer A node, -1 for candidate nodes"""
+        layer = self.model.layer_a
+        uids = layer.uids
+        components = layer.get_clusters()
+        claims = []
+        for c, nodes in enumerate(components):
+            previous = [self.node_cluster[u] for u in uids[nodes].tolist() if u in self.node_cluster]
+            if previous:
+                ids, votes = np.unique(previous, return_counts=True)
+                claims.append((-votes.max(), -len(nodes), c, int(ids[np.argmax(votes)])))
+        assigned, taken = {}, set()
+        for _, _, c, cid in sorted(claims):
+            if cid not in taken:
+                assigned[c] = cid
+                taken.add(cid)
+        labels = np.full(layer.n_nodes, -1, dtype=np.int64)
+        self.node_cluster = {}
+        for c, nodes in enumerate(components):
+            if c not in assigned:
+                assigned[c] = self.next_id
+                self.next_id += 1
+            labels[nodes] = assigned[c]
+            self.node_cluster.update(dict.fromkeys(uids[nodes].tolist(), assigned[c]))
+        return labels
+
+    def update(self, x):
+        """Learn x and return its stable cluster id (-1 if no permanent node resonates) and match"""
+        self.model.partial_fit(x[None])
+        labels = self._relabel()
+        best, score = self.model.layer_a.best_match_batch(complement_code(x[None]))
+        cluster = int(labels[best[0]]) if best[0] >= 0 else -1
+        return cluster, float(score[0]) if cluster >= 0 else 0.
+
+
+def _new_topoart(d, **params):
+    return StableTopoART(**params)
+
+
+def _step_topoart(model, x):
+    return model.update(x)
+
+
+ALGORITHMS = {
+    'fuzzyart': (_new_fuzzyart, _step_fuzzyart),
+    'dic': (_new_dic, _step_dic),
+    'efcm': (_new_efcm, _step_efcm),
+    'topoart': (_new_topoart, _step_topoart),
+}
+
+
+class StreamingClusterer:
+    """
+    Online regime assignment over a live bar feed.
+
+    Every bar updates the ticker's feature state and incremental learner
+    (one model per ticker, or one shared model with shared_model=True) and
+    yields the cluster id and membership of that bar. Features are scaled
+    with fixed bounds lo/hi taken from history. State is pickled to
+    checkpoint_path every checkpoint_every bars; bars at or before a
+    ticker's last processed timestamp are skipped, so a restarted service
+    can replay the feed from any earlier point.
+    """
+
+    def __init__(self, lo, hi, algorithm='fuzzyart', params=None, shared_model=False,
+                 checkpoint_path=CHECKPOINT_PATH, checkpoint_every=5000, latency_window=10000):
+        if algorithm not in ALGORITHMS:
+            raise ValueError(f"Unknown algorithm {algorithm!r}, expected one of {sorted(ALGORITHMS)}")
+        self.lo = np.asarray(lo, dtype=float)
+        self.hi = np.asarray(hi, dtype=float)
+        self.algorithm = algorithm
+        self.params = dict(params or {})
+        self.shared_model = shared_model
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_every = checkpoint_every
+        self.models = {}
+        self.features = {}
+        self.last_timestamp = {}
+        self.n_updates = 0
+        self.latencies = deque(maxlen=latency_window)
+
+    @classmethod
+    def from_history(cls, scale='minute', tickers=None, **kwargs):
+        """Service with scaling bounds taken from the stored price features"""
+        X = load_feature_matrix(scale, tickers=tickers, normalize=False)
+        return cls(X.min(axis=0), X.max(axis=0), **kwargs)
+
+    @classmethod
+    def resume(cls, checkpoint_path=CHECKPOINT_PATH, scale='minute', **kwargs):
+        """Restore from checkpoint_path if it exists, otherwise start a new service"""
+        if checkpoint_path and os.path.exists(checkpoint_path):
+            return cls.restore(checkpoint_path, **kwargs)
+        return cls.from_history(scale, checkpoint_path=checkpoint_path, **kwargs)
+
+    def _model(self, ticker):
+        key = None if self.shared_model else ticker
+        model = self.models.get(key)
+        if model is None:
+            factory, _ = ALGORITHMS[self.algorithm]
+            model = self.models[key] = factory(len(self.lo), **self.params)
+        return model
+
+    def update(self, ticker, x, timestamp=None):
+        """Learn one (unscaled) feature vector and return its cluster id and membership"""
+        t0 = time.perf_counter()
+        x = minmax_scale(np.asarray(x, dtype=float)[None], self.lo, self.hi)[0]
+        _, step = ALGORITHMS[self.algorithm]
+        cluster, membership = step(self._model(ticker), x)
+        if timestamp is not None:
+            self.last_timestamp[ticker] = timestamp
+        self.n_updates += 1
+        if self.checkpoint_path and self.n_updates % self.checkpoint_every == 0:
+            self.checkpoint()
+        latency = time.perf_counter() - t0
+        self.latencies.append(latency)
+        return {'ticker': ticker, 'timestamp': timestamp, 'cluster': cluster, 'membership': membership,
+                'latency_ms': 1e3 * latency}
+
+    def on_bar(self, ticker, bar, timestamp=None):
+        """Process one OHLCV bar; None if it was already processed or yields no features"""
+        last = self.last_timestamp.get(ticker)
+        if timestamp is not None and last is not None and timestamp <= last:
+            return None
+        state = self.features.get(ticker)
+        if state is None:
+            state = self.features[ticker] = BarFeatures()
+        x = state.update(bar)
+        if x is None:
+            if timestamp is not None:
+                self.last_timestamp[ticker] = timestamp
+            return None
+        return self.update(ticker, x, timestamp)
+
+    def run(self, feed, callback=None):
+        """Consume (ticker, timestamp, bar) tuples, passing every result to callback"""
+        for ticker, timestamp, bar in feed:
+            result = self.on_bar(ticker, bar, timestamp)
+            if result is not None and callback is not None:
+                callback(result)
+        if self.checkpoint_path:
+            self.checkpoint()
+
+    def latency_stats(self):
+        """p50/p99/max per-bar latency in ms over the recent window"""
+        if not self.latencies:
+            return {'p50_ms': np.nan, 'p99_ms': np.nan, 'max_ms': np.nan}
+        lat = 1e3 * np.fromiter(self.latencies, dtype=float)
+        return {'p50_ms': float(np.percentile(lat, 50)), 'p99_ms': float(np.percentile(lat, 99)),
+                'max_ms': float(lat.max())}
+
+    def checkpoint(self, path=None):
+        """Atomically pickle the models and feed state"""
+        path = path or self.checkpoint_path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        state = {
+            'version': CHECKPOINT_VERSION,
+            'algorithm': self.algorithm, 'params': self.params, 'shared_model': self.shared_model,
+            'lo': self.lo, 'hi': self.hi,
+            'models': self.models, 'features': self.features, 'last_timestamp': self.last_timestamp,
+            'n_updates': self.n_updates,
+        }
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def restore(cls, path, **kwargs):
+        """Service from a checkpoint; its algorithm, params and scaling take precedence over kwargs"""
+        for key in ('lo', 'hi', 'algorithm', 'params', 'shared_model'):
+            kwargs.pop(key, None)
+        with open(path, 'rb') as f:
+            state = pickle.load(f)
+        if state.get('version') != CHECKPOINT_VERSION:
+            raise ValueError(f"Unsupported stream checkpoint version {state.get('version')}")
+        kwargs.setdefault('checkpoint_path', path)
+        service = cls(state['lo'], state['hi'], algorithm=state['algorithm'], params=state['params'],
+                      shared_model=state['shared_model'], **kwargs)
+        service.models = state['models']
+        service.features = state['features']
+        service.last_timestamp = state['last_timestamp']
+        service.n_updates = state['n_updates']
+        return service
+
+
+def replay_feed(scale='minute', tickers=None):
+    """Stored bars of all (or the given) tickers as one (ticker, timestamp, bar) feed in time order"""
+    frames = []
+    for path in price_files(scale):
+        ticker = os.path.basename(path).split('_')[0]
+        if tickers is not None and ticker not in tickers:
+            continue
+        df = load_prices(path)
+        df.index = pd.to_datetime(df.index, utc=True)
+        frames.append(df.assign(ticker=ticker))
+    if not frames:
+        return
+    bars = pd.concat(frames).sort_index(kind='stable')
+    columns = ['Open', 'High', 'Low', 'Close', 'Volume']
+    for timestamp, ticker, values in zip(bars.index, bars['ticker'], bars[columns].to_numpy()):
+        yield ticker, timestamp, dict(zip(columns, values))
+
+
+def main(algorithm='fuzzyart'):
+    service = StreamingClusterer.resume(algorithm=algorithm)
+    results = []
+    t0 = time.perf_counter()
+    service.run(replay_feed('minute'), callback=results.append)
+    elapsed = time.perf_counter() - t0
+    n_tickers = len({r['ticker'] for r in results})
+    print(f"{len(results)} bars from {n_tickers} tickers in {elapsed:.2f}s ({len(results) / max(elapsed, 1e-9):.0f} bars/s)")
+    print(service.latency_stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+import os
+import json
+import time
+import hashlib
+import itertools
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+import runners
+from features import DATA_DIR, load_feature_matrix
+
+RESULTS_PATH = os.path.join(DATA_DIR, 'clustering_sweeps', 'sweep_results.csv')
+RESULT_COLUMNS = ['run_id', 'algorithm', 'params', 'n_samples', 'n_clusters', 'compactness', 'objective',
+                  'runtime_s', 'peak_mem_mb', 'error']
+
+DEFAULT_GRIDS = {
+    'fuzzyart': {'alpha': [0.001], 'rho': [0.6, 0.7, 0.8, 0.9], 'beta': [0.5, 1.0]},
+    'topoart': {'rho_a': [0.8, 0.85, 0.9], 'phi': [3, 5, 10], 'tau': [100, 500]},
+    'dic': {'IT': [0.95, 0.97, 0.98, 0.99], 'SLOPE': [0.05, 0.1, 0.2]},
+    'efcm': {'Dthr': [0.05, 0.1, 0.2, 0.3]},
+    'fckn': {'c': [4, 8, 16], 'm': [1.5, 2.0, 2.5]},
+}
+
+# Per-worker view of the shared feature matrix, set by _attach
+_shm = None
+_X = None
+
+
+def param_grid(grid):
+    """Expand {'name': [values]} into a list of parameter dicts (cartesian product)"""
+    names = sorted(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+
+def data_key(X, scale=None, tickers=None):
+    """Identity of a feature matrix for run ids: its source, shape and a digest of its contents"""
+    return {'scale': scale, 'tickers': sorted(tickers) if tickers is not None else None,
+            'shape': list(X.shape), 'digest': hashlib.sha1(np.ascontiguousarray(X).tobytes()).hexdigest()}
+
+
+def run_id(algorithm, params, data):
+    """Resume key of one run; data is the data_key of the matrix it runs on"""
+    key = json.dumps({'algorithm': algorithm, 'params': params, 'data': data}, sort_keys=True)
+    return hashlib.sha1(key.encode()).hexdigest()[:16]
+
+
+def _attach(name, shape, dtype):
+    """Pool initializer: map the shared feature matrix into this worker without copying it"""
+    global _shm, _X
+    _shm = shared_memory.SharedMemory(name=name)
+    _X = np.ndarray(shape, dtype=dtype, buffer=_shm.buf)
+
+
+def _run_task(algorithm, params, rid, trace_memory=True):
+    row = {'run_id': rid, 'algorithm': algorithm, 'params': json.dumps(params, sort_keys=True),
+           'n_samples': len(_X), 'n_clusters': np.nan, 'compactness': np.nan, 'objective': np.nan,
+           'runtime_s': np.nan, 'peak_mem_mb': np.nan, 'error': ''}
+    if trace_memory:
+        tracemalloc.start()
+    t0 = time.perf_counter()
+    try:
+        row.update(runners.run(algorithm, _X, params))
+    except Exception as e:
+        row['error'] = f"{type(e).__name__}: {e}"
+    row['runtime_s'] = time.perf_counter() - t0
+    if trace_memory:
+        row['peak_mem_mb'] = tracemalloc.get_traced_memory()[1] / 2**20
+        tracemalloc.stop()
+    return row
+
+
+def load_results(results_path=RESULTS_PATH):
+    if not os.path.exists(results_path):
+        return pd.DataFrame(columns=RESULT_COLUMNS)
+    return pd.read_csv(results_path, keep_default_na=False, na_values=[''])
+
+
+def _append_row(row, results_path):
+    exists = os.path.exists(results_path)
+    pd.DataFrame([row], columns=RESULT_COLUMNS).to_csv(results_path, mode='a', header=not exists, index=False)
+
+
+def sweep(grids, X=None, scale='hour', n_samples=20000, results_path=RESULTS_PATH, max_workers=None,
+          trace_memory=True, tickers=None):
+    """
+    Run every parameter combination of grids ({algorithm: {param: [values]}}) on X.
+
+    X (by default the normalized price features of the given tickers, all
+    by default, at the given scale) is copied once into shared
+    memory and every pool worker maps it read-only, so tasks only carry the
+    parameters. Each finished run is appended to results_path right away;
+    runs whose id is already there are skipped, so an interrupted sweep is
+    resumed by calling it again. Run ids cover the parameters and the data
+    (scale, tickers and a digest of X), so sweeps on other data never reuse
+    these rows. Returns the results of this grid.
+
+    Peak memory is measured with tracemalloc, which also slows down the
+    per-sample Python loops (TopoART most of all); pass trace_memory=False
+    when comparing runtimes.
+    """
+    if X is None:
+        X = load_feature_matrix(scale, n_samples=n_samples, tickers=tickers)
+    else:
+        scale = None    # a caller-supplied X is identified by its contents only
+    X = np.ascontiguousarray(X, dtype=float)
+    data = data_key(X, scale, tickers)
+    os.makedirs(os.path.dirname(results_path) or '.', exist_ok=True)
+
+    tasks = [(algorithm, params, run_id(algorithm, params, data))
+             for algorithm, grid in grids.items() for params in param_grid(grid)]
+    done = set(load_results(results_path)['run_id'])
+    pending = [task for task in tasks if task[2] not in done]
+    print(f"{len(tasks)} runs, {len(tasks) - len(pending)} already done, {len(pending)} to go")
+
+    if pending:
+        shm = shared_memory.SharedMemory(create=True, size=X.nbytes)
+        try:
+            np.ndarray(X.shape, dtype=X.dtype, buffer=shm.buf)[:] = X
+            with ProcessPoolExecutor(max_workers=max_workers or os.cpu_count(), initializer=_attach,
+                                     initargs=(shm.name, X.shape, X.dtype)) as pool:
+                futures = {pool.submit(_run_task, *task, trace_memory): task for task in pending}
+                for i, future in enumerate(as_completed(futures), 1):
+                    row = future.result()
+                    _append_row(row, results_path)
+                    status = row['error'] or f"{row['n_clusters']} clusters, {row['runtime_s']:.2f}s"
+                    print(f"[{i}/{len(pending)}] {row['algorithm']} {row['params']}: {status}")
+        finally:
+            shm.close()
+            shm.unlink()
+
+    ids = {task[2] for task in tasks}
+    results = load_results(results_path)
+    return results[results['run_id'].isin(ids)].reset_index(drop=True)
+
+
+def main():
+    results = sweep(DEFAULT_GRIDS)
+    print(results.sort_values(['algorithm', 'compactness']).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,18 @@
+import numpy as np
 import torch
 import torch.nn as nn
 import torch.optim as optim
 from RL.networks import ActorCritic
-from RL.memory import RolloutBuffer
+from RL.memory import RolloutBuffer, BatchRolloutBuffer
 
 class PPO:
-    def __init__(self, state_dim, action_dim, lr, gamma, eps_clip, update_timestep, k_epochs):
+    def __init__(self, state_dim, action_dim, lr, gamma, eps_clip, update_timestep, k_epochs, n_envs=None):
         self.gamma = gamma
         self.eps_clip = eps_clip
         self.k_epochs = k_epochs
         self.update_timestep = update_timestep
-        self.buffer = RolloutBuffer()
+        # With n_envs, every step is one batched step of a vectorized env and update_timestep counts those
+        self.buffer = RolloutBuffer() if n_envs is None else BatchRolloutBuffer(update_timestep, n_envs, state_dim)
         self.policy = ActorCritic(state_dim, action_dim)
         self.optimizer = optim.Adam(self.policy.parameters(), lr=lr)
         self.policy_old = ActorCritic(state_dim, action_dim)
@@ -18,22 +20,30 @@ class PPO:
         self.MseLoss = nn.MSELoss()
         self.timestep = 0
     def select_action(self, state):
+        if np.ndim(state) == 2:
+            # (n_envs, state_dim) batch: one forward pass, numpy actions and logprobs
+            with torch.no_grad():
+                actions, logprobs = self.policy_old.act_batch(torch.as_tensor(state, dtype=torch.float32))
+            return actions.numpy(), logprobs.numpy()
         state = torch.FloatTensor(state)
         action, logprob = self.policy_old.act(state)
         return action, logprob
     def update(self):
-        rewards = []
-        discounted_reward = 0
-        for reward, is_terminal in zip(reversed(self.buffer.rewards), reversed(self.buffer.is_terminals)):
-            if is_terminal:
-                discounted_reward = 0
-            discounted_reward = reward + (self.gamma * discounted_reward)
-            rewards.insert(0, discounted_reward)
-        rewards = torch.tensor(rewards, dtype=torch.float32)
+        if isinstance(self.buffer, BatchRolloutBuffer):
+            old_states, old_actions, old_logprobs, rewards = self.buffer.tensors(self.gamma)
+        else:
+            rewards = []
+            discounted_reward = 0
+            for reward, is_terminal in zip(reversed(self.buffer.rewards), reversed(self.buffer.is_terminals)):
+                if is_terminal:
+                    discounted_reward = 0
+                discounted_reward = reward + (self.gamma * discounted_reward)
+                rewards.insert(0, discounted_reward)
+            rewards = torch.tensor(rewards, dtype=torch.float32)
+            old_states = torch.FloatTensor(self.buffer.states)
+            old_actions = torch.LongTensor(self.buffer.actions)
+            old_logprobs = torch.FloatTensor(self.buffer.logprobs)
         rewards = (rewards - rewards.mean())/(rewards.std() + 1e-7)
-        old_states = torch.FloatTensor(self.buffer.states)
-        old_actions = torch.LongTensor(self.buffer.actions)
-        old_logprobs = torch.FloatTensor(self.buffer.logprobs)
         for _ in range(self.k_epochs):
             logprobs, state_values, dist_entropy = self.policy.evaluate(old_states, old_actions)
             ratios = torch.exp(logprobs - old_logprobs.detach())
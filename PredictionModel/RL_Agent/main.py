@@ -2,6 +2,7 @@ import gym
 import numpy as np
 from RL.agent import PPO
 from RL.environment import CustomEnv
+from RL.vec_environment import VecTradingEnv
 
 def run():
     env = CustomEnv()
@@ -18,5 +19,23 @@ def run():
             ppo_agent.buffer.add(state, action, logprob, reward, done)
             state = next_state
             ppo_agent.step()
+def run_vectorized(n_envs=1024, update_timestep=128, total_steps=20_000_000):
+    env = VecTradingEnv(n_envs=n_envs)
+    state_dim = env.state_dim
+    action_dim = env.single_action_space.n
+    ppo_agent = PPO(state_dim, action_dim, lr=0.002, gamma=0.99, eps_clip=0.2, update_timestep=update_timestep, k_epochs=10, n_envs=n_envs)
+    state = env.reset()
+    episode_returns = []
+    for step in range(total_steps // n_envs):
+        action, logprob = ppo_agent.select_action(state)
+        next_state, reward, done, info = env.step(action)
+        ppo_agent.buffer.add(state, action, logprob, reward, done)
+        state = next_state
+        if 'episode_return' in info:
+            episode_returns.extend(info['episode_return'].tolist())
+        ppo_agent.step()
+        if (step+1)%update_timestep==0 and episode_returns:
+            print(f"{(step+1)*n_envs} steps: mean episode return {np.mean(episode_returns):.4f} over {len(episode_returns)} episodes")
+            episode_returns = []
 if __name__=="__main__":
     run()
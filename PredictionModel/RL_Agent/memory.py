@@ -1,3 +1,4 @@
+import numpy as np
 import torch
 
 class RolloutBuffer:
@@ -19,3 +20,47 @@ class RolloutBuffer:
         self.logprobs.append(logprob)
         self.rewards.append(reward)
         self.is_terminals.append(done)
+
+class BatchRolloutBuffer:
+    """
+    Preallocated (n_steps, n_envs) rollout of a vectorized environment.
+    Every add stores one step of all envs; update consumes the flattened
+    n_steps * n_envs transitions.
+    """
+    def __init__(self, n_steps, n_envs, state_dim):
+        self.n_steps = n_steps
+        self.n_envs = n_envs
+        self.states = np.zeros((n_steps, n_envs, state_dim), dtype=np.float32)
+        self.actions = np.zeros((n_steps, n_envs), dtype=np.int64)
+        self.logprobs = np.zeros((n_steps, n_envs), dtype=np.float32)
+        self.rewards = np.zeros((n_steps, n_envs), dtype=np.float32)
+        self.is_terminals = np.zeros((n_steps, n_envs), dtype=bool)
+        self.step = 0
+    def clear(self):
+        self.step = 0
+    def full(self):
+        return self.step == self.n_steps
+    def add(self, states, actions, logprobs, rewards, dones):
+        t = self.step
+        self.states[t] = states
+        self.actions[t] = actions
+        self.logprobs[t] = logprobs
+        self.rewards[t] = rewards
+        self.is_terminals[t] = dones
+        self.step += 1
+    def discounted_rewards(self, gamma):
+        """Discounted reward-to-go per env, reset at episode ends (the tail of unfinished episodes is cut off)"""
+        out = np.zeros((self.step, self.n_envs), dtype=np.float32)
+        running = np.zeros(self.n_envs, dtype=np.float32)
+        for t in range(self.step - 1, -1, -1):
+            running = np.where(self.is_terminals[t], 0., running)
+            running = self.rewards[t] + gamma * running
+            out[t] = running
+        return out
+    def tensors(self, gamma):
+        """Flattened states, actions, logprobs and discounted rewards of the stored steps"""
+        n = self.step
+        return (torch.from_numpy(self.states[:n].reshape(n * self.n_envs, -1)),
+                torch.from_numpy(self.actions[:n].reshape(-1)),
+                torch.from_numpy(self.logprobs[:n].reshape(-1)),
+                torch.from_numpy(self.discounted_rewards(gamma).reshape(-1)))
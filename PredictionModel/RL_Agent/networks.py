@@ -14,6 +14,13 @@ class ActorCritic(nn.Module):
         action = dist.sample()
         logprob = dist.log_prob(action)
         return action.item(), logprob
+    def act_batch(self, states):
+        # One forward pass for a (n_envs, state_dim) batch; sampled with multinomial, which skips
+        # the per-call argument validation of Categorical
+        probs = self.actor(states)
+        action = torch.multinomial(probs, 1)
+        logprob = torch.log(probs.gather(1, action).clamp_min(1e-12))
+        return action[:, 0], logprob[:, 0]
     def evaluate(self, state, action):
         dist = self.actor(state)
         dist = torch.distributions.Categorical(dist)
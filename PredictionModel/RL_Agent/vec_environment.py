@@ -0,0 +1,153 @@
+import os
+import sys
+import time
+
+import gym
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'TransformerModel'))
+from dataset import PANEL_DIR, build_panel, load_index  # noqa: E402
+from features import FEATURE_NAMES  # noqa: E402
+
+
+class VecTradingEnv:
+    """
+    n_envs trading episodes stepped together over the memory-mapped price
+    feature panel (see TransformerModel/dataset.py).
+
+    Every env trades one ticker from a random start bar for episode_len
+    bars. The observation is the standardized features of the last window
+    bars, flattened, followed by the current position. The action picks a
+    target position from positions (flat/long by default). The reward is
+    position * next-bar log return minus cost per unit of position change.
+    Finished envs are reset to a new random (ticker, start) right away, and
+    step returns their first observation.
+
+    All state is kept in (n_envs,) numpy arrays, so a step is a few
+    vectorized gathers regardless of n_envs. start/end (UTC ns) restrict
+    the episodes to a period, e.g. a training split.
+    """
+
+    def __init__(self, n_envs=1024, scale='hour', episode_len=256, window=8, positions=(0., 1.), cost=5e-4,
+                 tickers=None, start=None, end=None, seed=0, features_path=None):
+        features_path = features_path or os.path.join(PANEL_DIR, f'{scale}_features.npy')
+        if not os.path.exists(features_path):
+            features_path = build_panel(scale)
+        index = load_index(features_path)
+        self.panel = np.load(features_path, mmap_mode='r')
+        self.tickers = [str(t) for t in index['tickers']]
+        offsets, timestamps = index['offsets'], index['timestamps']
+        self.n_envs = n_envs
+        self.episode_len = episode_len
+        self.window = window
+        self.positions = np.asarray(positions, dtype=np.float32)
+        self.cost = cost
+        self.rng = np.random.default_rng(seed)
+
+        log_return = np.asarray(self.panel[:, FEATURE_NAMES.index('log_return')], dtype=np.float32)
+        self.next_return = np.zeros(len(self.panel), dtype=np.float32)
+        self.next_return[:-1] = log_return[1:]
+
+        # Start rows with window - 1 bars of history and episode_len further bars of the same ticker in [start, end)
+        lo = np.iinfo(np.int64).min if start is None else start
+        hi = np.iinfo(np.int64).max if end is None else end
+        starts, rows = [], []
+        for i, ticker in enumerate(self.tickers):
+            if tickers is not None and ticker not in tickers:
+                continue
+            a, b = offsets[i], offsets[i + 1]
+            ts = timestamps[a:b]
+            in_period = np.flatnonzero((ts >= lo) & (ts < hi))
+            if not len(in_period):
+                continue
+            first, last = a + in_period[0], a + in_period[-1]
+            rows.append(np.arange(first, last + 1))
+            starts.append(np.arange(max(first, a + window - 1), last - episode_len + 1))
+        self.starts = np.concatenate(starts) if starts else np.empty(0, dtype=np.int64)
+        if not len(self.starts):
+            raise ValueError(f"No ticker has {window + episode_len} bars in the requested period")
+        period = self.panel[np.concatenate(rows)]
+        self.mean = period.mean(axis=0, dtype=np.float64).astype(np.float32)
+        std = period.std(axis=0, dtype=np.float64)
+        self.std = np.where(std > 0, std, 1.0).astype(np.float32)
+
+        self.state_dim = window * self.panel.shape[1] + 1
+        self.single_observation_space = gym.spaces.Box(low=-np.inf, high=np.inf, shape=(self.state_dim,),
+                                                       dtype=np.float32)
+        self.single_action_space = gym.spaces.Discrete(len(self.positions))
+        self._offsets = np.arange(1 - window, 1)
+        self.row = np.zeros(n_envs, dtype=np.int64)
+        self.t = np.zeros(n_envs, dtype=np.int64)
+        self.position = np.zeros(n_envs, dtype=np.float32)
+        self.episode_return = np.zeros(n_envs, dtype=np.float64)
+
+    def _start(self, envs):
+        self.row[envs] = self.starts[self.rng.integers(len(self.starts), size=int(envs.sum()))]
+        self.t[envs] = 0
+        self.position[envs] = 0.
+        self.episode_return[envs] = 0.
+
+    def _observe(self):
+        x = self.panel[self.row[:, None] + self._offsets]
+        obs = np.empty((self.n_envs, self.state_dim), dtype=np.float32)
+        obs[:, :-1] = ((x - self.mean) / self.std).reshape(self.n_envs, -1)
+        obs[:, -1] = self.position
+        return obs
+
+    def reset(self, seed=None):
+        if seed is not None:
+            self.rng = np.random.default_rng(seed)
+        self._start(np.ones(self.n_envs, dtype=bool))
+        return self._observe()
+
+    def step(self, actions):
+        """Apply one action per env; returns (observations, rewards, dones, info) as (n_envs,) arrays"""
+        position = self.positions[np.asarray(actions)]
+        cost = self.cost * np.abs(position - self.position)
+        reward = position * self.next_return[self.row] - cost
+        self.position = position
+        self.row += 1
+        self.t += 1
+        self.episode_return += reward
+        done = self.t >= self.episode_len
+        info = {'cost': cost}
+        if done.any():
+            info['episode_return'] = self.episode_return[done]
+            self._start(done)
+        return self._observe(), reward, done, info
+
+
+def collect_rollout(env, agent, state, n_steps):
+    """Step all envs n_steps times with batched agent.select_action into agent.buffer; returns the last state"""
+    for _ in range(n_steps):
+        action, logprob = agent.select_action(state)
+        next_state, reward, done, _ = env.step(action)
+        agent.buffer.add(state, action, logprob, reward, done)
+        state = next_state
+    return state
+
+
+def benchmark(n_envs=(256, 1024, 4096), n_steps=200):
+    """Env steps/s with random actions and rollout steps/s with the PPO policy, per number of envs"""
+    from RL.agent import PPO
+    results = {}
+    for n in n_envs:
+        env = VecTradingEnv(n_envs=n)
+        state = env.reset()
+        t0 = time.perf_counter()
+        for _ in range(n_steps):
+            state, _, _, _ = env.step(env.rng.integers(env.single_action_space.n, size=n))
+        env_rate = n * n_steps / (time.perf_counter() - t0)
+        agent = PPO(env.state_dim, env.single_action_space.n, lr=0.002, gamma=0.99, eps_clip=0.2,
+                    update_timestep=n_steps, k_epochs=10, n_envs=n)
+        state = env.reset()
+        t0 = time.perf_counter()
+        collect_rollout(env, agent, state, n_steps)
+        rollout_rate = n * n_steps / (time.perf_counter() - t0)
+        results[n] = {'env_steps_per_s': env_rate, 'rollout_steps_per_s': rollout_rate}
+        print(f"n_envs={n:5d}: env {env_rate:12,.0f} steps/s, rollout with policy {rollout_rate:12,.0f} steps/s")
+    return results
+
+
+if __name__ == "__main__":
+    benchmark()
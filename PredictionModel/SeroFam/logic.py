@@ -1,44 +1,314 @@
+import os
+import threading
+
 import numpy as np
 
+
 class SeroFAM:
-    def __init__(self, input_dim, output_dim, alpha=0.01, beta=0.9, rho=0.75, init_nodes=1):
+    """
+    Self-organizing fuzzy associative memory.
+
+    Rule antecedents (w_in), consequents (w_out), their sizes |w_in| and
+    counts live in preallocated matrices that grow geometrically, so the
+    choice T_j = |x ^ w_j| / (alpha + |w_j|) and the match |x ^ w_j| / |x|
+    of a sample against every rule come from one vectorized pass, and
+    predict_batch scores many samples against all rules at once.
+
+    Rule-base compaction (see compact) runs every compact_every training
+    samples when enabled: rules whose antecedents overlap by at least
+    merge_threshold are merged, rules not used for max_age samples or with
+    fewer than min_count samples are pruned, and the max_rules rules with
+    the highest counts are kept. stats counts what every pass did.
+
+    save/load persist the rule base to a versioned .npz and partial_fit
+    continues training from it, so only new bars have to be learned.
+    """
+
+    VERSION = 1
+    _CONFIG = ('input_dim', 'output_dim', 'alpha', 'beta', 'rho', 'compact_every', 'merge_threshold',
+               'min_count', 'max_age', 'max_rules')
+
+    def __init__(self, input_dim, output_dim, alpha=0.01, beta=0.9, rho=0.75, init_nodes=1, capacity=64,
+                 compact_every=None, merge_threshold=None, min_count=None, max_age=None, max_rules=None):
         self.input_dim = input_dim
         self.output_dim = output_dim
         self.alpha = alpha
         self.beta = beta
         self.rho = rho
-        self.rules = []
+        self.compact_every = compact_every
+        self.merge_threshold = merge_threshold
+        self.min_count = min_count
+        self.max_age = max_age
+        self.max_rules = max_rules
+        self.k = 0
+        self.n_seen = 0             # training samples seen, the clock of last_used
+        self._last_compaction = 0
+        self.stats = {'compactions': 0, 'merged': 0, 'pruned': 0, 'evicted': 0}
+        self.trained_until = None   # timestamp of the last bar learned, for callers that track it
+        capacity = max(capacity, init_nodes)
+        self._w_in = np.empty((capacity, input_dim))
+        self._w_out = np.empty((capacity, output_dim))
+        self._wsum = np.empty(capacity)
+        self._count = np.zeros(capacity, dtype=np.int64)
+        self._last_used = np.zeros(capacity, dtype=np.int64)
         for _ in range(init_nodes):
-            self.rules.append({
-                'w_in': np.ones(input_dim),
-                'w_out': np.zeros(output_dim),
-                'count': 0
-            })
+            self._add_rule(np.ones(input_dim), np.zeros(output_dim), count=0)
+
+    @property
+    def w_in(self):
+        return self._w_in[:self.k]
+
+    @property
+    def w_out(self):
+        return self._w_out[:self.k]
+
+    @property
+    def count(self):
+        return self._count[:self.k]
+
+    @property
+    def last_used(self):
+        return self._last_used[:self.k]
+
+    @property
+    def rules(self):
+        """Snapshot of the rule base as a list of {'w_in', 'w_out', 'count'} dicts"""
+        return [{'w_in': self._w_in[j].copy(), 'w_out': self._w_out[j].copy(), 'count': int(self._count[j])}
+                for j in range(self.k)]
+
+    def _grow(self):
+        cap = 2 * self._w_in.shape[0]
+        for name in ('_w_in', '_w_out', '_wsum', '_count', '_last_used'):
+            old = getattr(self, name)
+            new = np.zeros((cap,) + old.shape[1:], dtype=old.dtype)
+            new[:self.k] = old[:self.k]
+            setattr(self, name, new)
+
+    def _add_rule(self, w_in, w_out, count=1):
+        if self.k == self._w_in.shape[0]:
+            self._grow()
+        j = self.k
+        self._w_in[j] = w_in
+        self._w_out[j] = w_out
+        self._wsum[j] = np.sum(self._w_in[j])
+        self._count[j] = count
+        self._last_used[j] = self.n_seen
+        self.k += 1
+        return j
+
+    def _keep(self, keep):
+        """Compact the rule arrays to the rules where keep is True (order preserved)"""
+        m = int(keep.sum())
+        for name in ('_w_in', '_w_out', '_wsum', '_count', '_last_used'):
+            arr = getattr(self, name)
+            arr[:m] = arr[:self.k][keep]
+        self.k = m
+
+    def _merge_overlapping(self):
+        """
+        Merge rules whose antecedents overlap by |w_i ^ w_j| / max(|w_i|, |w_j|) >= merge_threshold.
+        Rules are visited by decreasing count; each absorbs its still unmerged
+        overlapping rules: antecedent = fuzzy AND, consequent = count-weighted mean.
+        Overlaps are computed in row blocks, so the temporaries stay within
+        about 4M floats whatever the number of rules.
+        """
+        k, d = self.w_in.shape
+        w, wsum = self.w_in, self._wsum[:k]
+        overlap = np.zeros((k, k), dtype=bool)
+        block = max(1, 4_000_000 // max(1, k * d))
+        for s in range(0, k, block):
+            inter = np.minimum(w[s:s + block, None, :], w[None, :, :]).sum(axis=2)
+            denom = np.maximum(np.maximum(wsum[s:s + block, None], wsum[None, :]), 1e-12)
+            overlap[s:s + block] = inter / denom >= self.merge_threshold
+        np.fill_diagonal(overlap, False)
+        keep = np.ones(k, dtype=bool)
+        merged = 0
+        for i in np.argsort(-self._count[:k], kind='stable'):
+            if not keep[i]:
+                continue
+            group = np.flatnonzero(keep & overlap[i])
+            if not len(group):
+                continue
+            members = np.append(group, i)
+            weights = np.maximum(self._count[members], 1).astype(float)
+            self._w_in[i] = w[members].min(axis=0)
+            self._wsum[i] = np.sum(self._w_in[i])
+            self._w_out[i] = weights @ self._w_out[members] / weights.sum()
+            self._count[i] = self._count[members].sum()
+            self._last_used[i] = self._last_used[members].max()
+            keep[group] = False
+            merged += len(group)
+        self._keep(keep)
+        return merged
+
+    def compact(self):
+        """
+        One self-reorganization pass over the rule base: merge, prune, then
+        enforce the rule budget. Low-count rules are only pruned when they
+        were not used since the previous pass, which gives new rules one
+        compaction interval to collect samples. At least one rule is kept.
+        """
+        if self.k > 1 and self.merge_threshold is not None:
+            self.stats['merged'] += self._merge_overlapping()
+
+        if self.k > 1 and (self.min_count is not None or self.max_age is not None):
+            prune = np.zeros(self.k, dtype=bool)
+            if self.min_count is not None:
+                prune |= (self.count < self.min_count) & (self.last_used < self._last_compaction)
+            if self.max_age is not None:
+                prune |= self.n_seen - self.last_used > self.max_age
+            if prune.all():
+                prune[np.argmax(self.count)] = False
+            self.stats['pruned'] += int(prune.sum())
+            self._keep(~prune)
+
+        if self.max_rules is not None and self.k > self.max_rules:
+            # Rank by count, most recently used first among equal counts
+            order = np.lexsort((-self.last_used, -self.count))
+            keep = np.zeros(self.k, dtype=bool)
+            keep[order[:max(self.max_rules, 1)]] = True
+            self.stats['evicted'] += self.k - int(keep.sum())
+            self._keep(keep)
+
+        self._last_compaction = self.n_seen
+        self.stats['compactions'] += 1
+
+    def _choice_match(self, x):
+        """Best rule by choice, its choice value and its match, from one pass over all rules"""
+        inter = np.sum(np.minimum(x, self._w_in[:self.k]), axis=1)
+        T = inter / (self.alpha + self._wsum[:self.k])
+        j = int(np.argmax(T))
+        return j, T[j], inter[j] / np.sum(x)
+
     def _choice(self, x):
-        T = []
-        for r in self.rules:
-            numer = np.sum(np.minimum(x, r['w_in']))
-            denom = self.alpha + np.sum(r['w_in'])
-            T.append(numer/denom)
-        return np.argmax(T), np.max(T)
+        j, val, _ = self._choice_match(x)
+        return j, val
+
     def _match(self, x, w):
         return np.sum(np.minimum(x, w))/np.sum(x)
+
     def train(self, X, Y, epochs=1):
+        X = np.asarray(X, dtype=float)
+        Y = np.asarray(Y, dtype=float).reshape(len(X), self.output_dim)
         for _ in range(epochs):
             for i in range(len(X)):
                 x = X[i]
                 y = Y[i]
-                j, val = self._choice(x)
-                if self._match(x, self.rules[j]['w_in'])>=self.rho:
-                    self.rules[j]['w_in'] = self.beta*np.minimum(x, self.rules[j]['w_in'])+(1-self.beta)*self.rules[j]['w_in']
-                    self.rules[j]['w_out']+= self.alpha*(y-self.rules[j]['w_out'])
-                    self.rules[j]['count']+=1
+                self.n_seen += 1
+                j, val, match = self._choice_match(x)
+                if match >= self.rho:
+                    self._w_in[j] = self.beta*np.minimum(x, self._w_in[j])+(1-self.beta)*self._w_in[j]
+                    self._wsum[j] = np.sum(self._w_in[j])
+                    self._w_out[j] += self.alpha*(y-self._w_out[j])
+                    self._count[j] += 1
+                    self._last_used[j] = self.n_seen
                 else:
-                    self.rules.append({
-                        'w_in': x.copy(),
-                        'w_out': y.copy(),
-                        'count':1
-                    })
+                    self._add_rule(x, y)
+                if self.compact_every and self.n_seen % self.compact_every == 0:
+                    self.compact()
+
+    def partial_fit(self, X, Y, until=None):
+        """One pass over new samples, continuing from the current rule base"""
+        self.train(X, Y, epochs=1)
+        if until is not None:
+            self.trained_until = str(until)
+        return self
+
+    def save(self, path):
+        """Write the rule base, its bookkeeping and the hyperparameters to a compressed .npz file"""
+        config = {name: -1 if getattr(self, name) is None else getattr(self, name) for name in self._CONFIG}
+        tmp_path = path + '.tmp.npz'
+        np.savez_compressed(tmp_path, version=self.VERSION, **config,
+                            w_in=self.w_in, w_out=self.w_out, count=self.count, last_used=self.last_used,
+                            n_seen=self.n_seen, last_compaction=self._last_compaction,
+                            stats=np.array([self.stats[key] for key in sorted(self.stats)]),
+                            trained_until='' if self.trained_until is None else self.trained_until)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            if int(data['version']) != cls.VERSION:
+                raise ValueError(f"Unsupported SeroFAM checkpoint version {int(data['version'])}")
+            config = {name: data[name].item() for name in cls._CONFIG}
+            config = {name: None if value == -1 else value for name, value in config.items()}
+            w_in = data['w_in']
+            model = cls(init_nodes=0, capacity=max(64, len(w_in)), **config)
+            k = len(w_in)
+            model._w_in[:k] = w_in
+            model._w_out[:k] = data['w_out']
+            model._wsum[:k] = w_in.sum(axis=1)
+            model._count[:k] = data['count']
+            model._last_used[:k] = data['last_used']
+            model.k = k
+            model.n_seen = int(data['n_seen'])
+            model._last_compaction = int(data['last_compaction'])
+            model.stats = dict(zip(sorted(model.stats), data['stats'].tolist()))
+            model.trained_until = str(data['trained_until']) or None
+        return model
+
     def predict(self, x):
-        best, val = self._choice(x)
-        return self.rules[best]['w_out']
+        best, val = self._choice(np.asarray(x, dtype=float))
+        return self._w_out[best].copy()
+
+    def predict_batch(self, X, chunk_size=None):
+        """Consequent of the best-choice rule for every row of X, (n x output_dim)"""
+        X = np.asarray(X, dtype=float)
+        n, d = X.shape
+        chunk_size = chunk_size or max(1, 4_000_000 // max(1, self.k * d))
+        best = np.empty(n, dtype=np.int64)
+        w_in = self.w_in
+        denom = self.alpha + self._wsum[:self.k]
+        for s in range(0, n, chunk_size):
+            xb = X[s:s + chunk_size]
+            inter = np.minimum(xb[:, None, :], w_in[None, :, :]).sum(axis=2)
+            best[s:s + len(xb)] = np.argmax(inter / denom, axis=1)
+        return self._w_out[best]
+
+
+class SeroFAMRegistry:
+    """
+    Per-ticker SeroFAM models stored as <root>/<ticker>.npz.
+
+    Models are loaded on first use and kept in memory; tickers without a
+    checkpoint get a fresh model built with model_kwargs. save/save_all
+    write the models that were trained since they were loaded.
+    """
+
+    def __init__(self, root, **model_kwargs):
+        self.root = root
+        self.model_kwargs = model_kwargs
+        self.models = {}
+        self.dirty = set()
+        self.lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, ticker):
+        return os.path.join(self.root, f"{ticker}.npz")
+
+    def get(self, ticker):
+        with self.lock:
+            model = self.models.get(ticker)
+            if model is None:
+                if os.path.exists(self.path(ticker)):
+                    model = SeroFAM.load(self.path(ticker))
+                else:
+                    model = SeroFAM(**self.model_kwargs)
+                self.models[ticker] = model
+            return model
+
+    def partial_fit(self, ticker, X, Y, until=None):
+        model = self.get(ticker).partial_fit(X, Y, until)
+        self.dirty.add(ticker)
+        return model
+
+    def predict_batch(self, ticker, X):
+        return self.get(ticker).predict_batch(X)
+
+    def save(self, ticker):
+        self.models[ticker].save(self.path(ticker))
+        self.dirty.discard(ticker)
+
+    def save_all(self):
+        for ticker in list(self.dirty):
+            self.save(ticker)
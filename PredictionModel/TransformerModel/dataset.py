@@ -0,0 +1,193 @@
+import os
+import sys
+import json
+
+import numpy as np
+import pandas as pd
+import torch
+from torch.utils.data import Dataset, WeightedRandomSampler
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Clustering_Fuzzification'))
+from features import DATA_DIR, FEATURE_NAMES, load_prices, price_feature_frame, price_files  # noqa: E402
+
+PANEL_DIR = os.path.join(DATA_DIR, 'transformer_panel')
+
+
+def build_panel(scale='hour', tickers=None, out_dir=PANEL_DIR):
+    """
+    Write the price features of all (or the given) tickers as one panel:
+    <out_dir>/<scale>_features.npy, a float32 (rows x features) array
+    with the tickers stacked in time order one after another, and
+    <scale>_index.npz holding the ticker names, their row offsets and the
+    UTC timestamp (ns) of every row. Returns the features path.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    frames, names = [], []
+    for path in price_files(scale):
+        ticker = os.path.basename(path).split('_')[0]
+        if tickers is not None and ticker not in tickers:
+            continue
+        df = load_prices(path)
+        df.index = pd.to_datetime(df.index, utc=True)
+        frames.append(price_feature_frame(df.sort_index()))
+        names.append(ticker)
+
+    offsets = np.zeros(len(frames) + 1, dtype=np.int64)
+    np.cumsum([len(f) for f in frames], out=offsets[1:])
+    features_path = os.path.join(out_dir, f'{scale}_features.npy')
+    panel = np.lib.format.open_memmap(features_path + '.tmp.npy', mode='w+', dtype=np.float32,
+                                      shape=(int(offsets[-1]), len(FEATURE_NAMES)))
+    timestamps = np.empty(int(offsets[-1]), dtype=np.int64)
+    for i, frame in enumerate(frames):
+        panel[offsets[i]:offsets[i + 1]] = frame.to_numpy(dtype=np.float32)
+        timestamps[offsets[i]:offsets[i + 1]] = frame.index.as_unit('ns').asi8
+    panel.flush()
+    del panel
+    os.replace(features_path + '.tmp.npy', features_path)
+    np.savez(os.path.join(out_dir, f'{scale}_index.npz'), tickers=np.array(names), offsets=offsets,
+             timestamps=timestamps, feature_names=np.array(FEATURE_NAMES))
+    return features_path
+
+
+def load_index(features_path):
+    with np.load(features_path.replace('_features.npy', '_index.npz')) as data:
+        return {key: data[key] for key in data.files}
+
+
+def time_bounds(timestamps, fractions=(0.7, 0.15, 0.15)):
+    """Timestamps splitting the panel's time range into consecutive train/validation/test periods"""
+    cuts = np.cumsum(fractions)[:-1] / np.sum(fractions)
+    edges = np.quantile(np.unique(timestamps), cuts).astype(np.int64)
+    bounds = np.concatenate([[np.iinfo(np.int64).min], edges, [np.iinfo(np.int64).max]])
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+class WindowDataset(Dataset):
+    """
+    Sliding windows over a memory-mapped feature panel.
+
+    Sample i is the (seq_len, features) window ending at bar t of one
+    ticker, with the log return over the next horizon bars as target.
+    Only the panel (O(rows)) and the int64 end row of every sample are
+    held: windows are strided views of the memory map (see windows) that
+    are standardized when fetched, so memory does not grow with seq_len.
+
+    start/end (UTC ns) select the samples whose target bar falls in
+    [start, end), which keeps train/validation/test targets disjoint in
+    time. mean/std default to the statistics of the rows before end; pass
+    the training set's to the validation and test sets. The memory map is
+    reopened lazily in every DataLoader worker instead of being pickled.
+
+    Indexing with a sequence of indices returns a whole batch, so a
+    DataLoader with batch_size=None and a BatchSampler as sampler lets each
+    worker gather batches with a single fancy index into the window view.
+    """
+
+    def __init__(self, features_path, seq_len, horizon=1, start=None, end=None, tickers=None,
+                 mean=None, std=None):
+        self.features_path = features_path
+        self.seq_len = seq_len
+        self.horizon = horizon
+        self._panel = None
+
+        index = load_index(features_path)
+        self.tickers = [str(t) for t in index['tickers']]
+        offsets, timestamps = index['offsets'], index['timestamps']
+        panel = self.panel
+        log_return = np.asarray(panel[:, FEATURE_NAMES.index('log_return')], dtype=np.float64)
+
+        ends, targets, ticker_ids = [], [], []
+        for i, ticker in enumerate(self.tickers):
+            if tickers is not None and ticker not in tickers:
+                continue
+            lo, hi = offsets[i], offsets[i + 1]
+            t = np.arange(lo + seq_len - 1, hi - horizon)
+            if not len(t):
+                continue
+            target_time = timestamps[t + horizon]
+            keep = np.ones(len(t), dtype=bool)
+            if start is not None:
+                keep &= target_time >= start
+            if end is not None:
+                keep &= target_time < end
+            t = t[keep]
+            # Sum of the next horizon log returns, from the ticker's cumulative returns
+            cum = np.concatenate([[0.], np.cumsum(log_return[lo:hi])])
+            ends.append(t)
+            targets.append(cum[t - lo + horizon + 1] - cum[t - lo + 1])
+            ticker_ids.append(np.full(len(t), i, dtype=np.int64))
+        self.ends = np.concatenate(ends) if ends else np.empty(0, dtype=np.int64)
+        self.targets = np.concatenate(targets).astype(np.float32) if targets else np.empty(0, dtype=np.float32)
+        self.ticker_ids = np.concatenate(ticker_ids) if ticker_ids else np.empty(0, dtype=np.int64)
+
+        if mean is None or std is None:
+            rows = panel if end is None else panel[timestamps < end]
+            mean = rows.mean(axis=0, dtype=np.float64)
+            std = rows.std(axis=0, dtype=np.float64)
+        self.mean = np.asarray(mean, dtype=np.float32)
+        self.std = np.where(np.asarray(std) > 0, std, 1.0).astype(np.float32)
+
+    @property
+    def panel(self):
+        if self._panel is None:
+            self._panel = np.load(self.features_path, mmap_mode='r')
+        return self._panel
+
+    @property
+    def windows(self):
+        """All windows of the panel as a zero-copy (rows - seq_len + 1, seq_len, features) view"""
+        return np.lib.stride_tricks.sliding_window_view(self.panel, self.seq_len, axis=0).transpose(0, 2, 1)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_panel'] = None
+        return state
+
+    def __len__(self):
+        return len(self.ends)
+
+    def _sample(self, x, targets):
+        x = (x - self.mean) / self.std
+        return torch.from_numpy(np.ascontiguousarray(x, dtype=np.float32)), torch.from_numpy(targets)
+
+    def __getitem__(self, i):
+        if np.ndim(i):
+            return self.get_batch(i)
+        t = self.ends[i]
+        return self._sample(self.panel[t - self.seq_len + 1:t + 1], self.targets[[i]])
+
+    def get_batch(self, indices):
+        """(batch, seq_len, features) inputs and (batch, 1) targets, gathered from the window view in one go"""
+        indices = np.asarray(indices)
+        x = self.windows[self.ends[indices] - self.seq_len + 1]
+        return self._sample(x, self.targets[indices, None])
+
+    def ticker_balanced_sampler(self, num_samples=None, generator=None):
+        """Sampler that draws every ticker equally often regardless of its history length"""
+        counts = np.bincount(self.ticker_ids, minlength=len(self.tickers))
+        weights = 1.0 / counts[self.ticker_ids]
+        return WeightedRandomSampler(torch.from_numpy(weights), num_samples or len(self), generator=generator)
+
+
+def make_datasets(features_path, seq_len, horizon=1, fractions=(0.7, 0.15, 0.15), tickers=None):
+    """Train/validation/test WindowDatasets split by time, standardized with the training statistics"""
+    index = load_index(features_path)
+    (train_lo, train_hi), (val_lo, val_hi), (test_lo, test_hi) = time_bounds(index['timestamps'], fractions)
+    train = WindowDataset(features_path, seq_len, horizon, train_lo, train_hi, tickers)
+    val = WindowDataset(features_path, seq_len, horizon, val_lo, val_hi, tickers, train.mean, train.std)
+    test = WindowDataset(features_path, seq_len, horizon, test_lo, test_hi, tickers, train.mean, train.std)
+    return train, val, test
+
+
+def describe(features_path):
+    index = load_index(features_path)
+    info = {'rows': int(index['offsets'][-1]), 'tickers': len(index['tickers']),
+            'features': [str(f) for f in index['feature_names']],
+            'start': str(pd.Timestamp(index['timestamps'].min(), tz='UTC')),
+            'end': str(pd.Timestamp(index['timestamps'].max(), tz='UTC'))}
+    print(json.dumps(info, indent=2))
+    return info
+
+
+if __name__ == "__main__":
+    describe(build_panel('hour'))
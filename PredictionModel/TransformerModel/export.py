@@ -0,0 +1,274 @@
+import os
+import sys
+import json
+import time
+import resource
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+from dataset import PANEL_DIR, make_datasets
+from train import CHECKPOINT_DIR, build_model
+
+EXPORT_DIR = os.path.join(os.path.dirname(PANEL_DIR), 'transformer_exports')
+VARIANTS = ('fp32', 'int8')
+BATCH_SIZES = (1, 8, 64, 256)
+# Largest mean |int8 - fp32| output delta, relative to the mean |fp32| output, for load_exported(variant='auto')
+INT8_TOLERANCE = 0.05
+
+
+def load_checkpoint(checkpoint_path):
+    """Eval-mode GRUTransformer and its training config, mean and std from a train.py checkpoint"""
+    state = torch.load(checkpoint_path, weights_only=False)
+    net = build_model(state['config'], len(state['mean']))
+    net.load_state_dict(state['model'])
+    return net.eval(), state['config'], np.asarray(state['mean']), np.asarray(state['std'])
+
+
+def quantize(net, keep_float=('fc',)):
+    """
+    Dynamic int8 quantization of the GRU and the encoder feed-forward
+    Linear layers: weights are stored as int8, activations are quantized
+    per batch. The layers in keep_float stay float32; by default that is
+    the output head, whose outputs (next-bar log returns) are small enough
+    for activation quantization to swamp them. Attention projections are
+    not dynamically quantizable and stay float32 as well.
+    """
+    layers = {name for name, module in net.named_modules()
+              if type(module) in (nn.Linear, nn.GRU) and name not in keep_float}
+    return torch.ao.quantization.quantize_dynamic(net, layers, dtype=torch.qint8)
+
+
+def to_torchscript(net, example_batch):
+    """
+    Traced, frozen and inference-optimized TorchScript module.
+
+    The fused fast path of nn.TransformerEncoderLayer reads linear weights
+    as tensors, which dynamically quantized Linear layers do not expose,
+    so it is disabled while tracing: the traced graph then holds the
+    regular attention ops and no longer depends on that switch.
+    """
+    fastpath = torch.backends.mha.get_fastpath_enabled()
+    torch.backends.mha.set_fastpath_enabled(False)
+    try:
+        with torch.inference_mode(False), torch.no_grad():
+            traced = torch.jit.trace(net, example_batch, check_trace=False)
+            return torch.jit.optimize_for_inference(torch.jit.freeze(traced.eval()))
+    finally:
+        torch.backends.mha.set_fastpath_enabled(fastpath)
+
+
+def artifact_path(out_dir, variant):
+    return os.path.join(out_dir, f'gru_transformer_{variant}.pt')
+
+
+def export(checkpoint_path=None, out_dir=EXPORT_DIR, variants=VARIANTS):
+    """
+    Write one TorchScript artifact per variant (fp32, int8) of a trained
+    checkpoint to <out_dir>/gru_transformer_<variant>.pt. The training
+    config and the standardization mean/std travel with each artifact as
+    meta.json, so load_exported needs nothing else. Returns {variant: path}.
+    """
+    checkpoint_path = checkpoint_path or os.path.join(CHECKPOINT_DIR, 'best.pt')
+    net, config, mean, std = load_checkpoint(checkpoint_path)
+    example = torch.zeros(1, config['seq_len'], len(mean))
+    os.makedirs(out_dir, exist_ok=True)
+    paths = {}
+    for variant in variants:
+        if variant not in VARIANTS:
+            raise ValueError(f"Unknown variant {variant!r}, expected one of {VARIANTS}")
+        module = to_torchscript(quantize(net) if variant == 'int8' else net, example)
+        meta = {'variant': variant, 'checkpoint': os.path.abspath(checkpoint_path), 'config': config,
+                'input_dim': len(mean), 'mean': mean.tolist(), 'std': std.tolist()}
+        path = artifact_path(out_dir, variant)
+        tmp_path = path + '.tmp'
+        torch.jit.save(module, tmp_path, _extra_files={'meta.json': json.dumps(meta)})
+        os.replace(tmp_path, path)
+        paths[variant] = path
+        print(f"{variant}: {path} ({os.path.getsize(path) / 2**10:.0f} KiB)")
+    return paths
+
+
+def choose_variant(out_dir, tolerance=INT8_TOLERANCE, batch_size=64):
+    """
+    'int8' if the report in out_dir shows its mean output delta within
+    tolerance (relative to the mean |fp32 output|) and a lower latency at
+    batch_size than fp32, else 'fp32' (also without a report).
+    """
+    report_path = os.path.join(out_dir, 'report.json')
+    if not os.path.exists(report_path):
+        return 'fp32'
+    with open(report_path) as f:
+        variants = json.load(f)['variants']
+    if 'int8' not in variants or 'fp32' not in variants:
+        return 'fp32'
+    latency = {name: v['latency'].get(str(batch_size), {}).get('latency_ms', np.inf) for name, v in variants.items()}
+    accurate = variants['int8']['accuracy']['relative_delta'] <= tolerance
+    return 'int8' if accurate and latency['int8'] < latency['fp32'] else 'fp32'
+
+
+def load_exported(path, variant=None, tolerance=INT8_TOLERANCE):
+    """
+    (module, meta) of an exported artifact. path is an artifact file or
+    the export directory, in which case variant picks the artifact: fp32
+    by default, or 'auto' for int8 when the directory's report shows it
+    accurate and fast enough (see choose_variant).
+    """
+    if os.path.isdir(path):
+        if variant == 'auto':
+            variant = choose_variant(path, tolerance)
+        path = artifact_path(path, variant or 'fp32')
+    elif variant == 'auto':
+        variant = None
+    extra = {'meta.json': ''}
+    module = torch.jit.load(path, map_location='cpu', _extra_files=extra)
+    meta = json.loads(extra['meta.json'])
+    if variant is not None and meta['variant'] != variant:
+        raise ValueError(f"{path} holds the {meta['variant']} variant, not {variant}")
+    return module.eval(), meta
+
+
+def evaluation_windows(meta, n_samples=4096, seed=0):
+    """
+    Standardized inputs and targets for the accuracy report: validation
+    windows of the panel the model was trained on when it exists,
+    otherwise standard normal inputs without targets.
+    """
+    config = meta['config']
+    features_path = os.path.join(PANEL_DIR, f"{config['scale']}_features.npy")
+    rng = np.random.default_rng(seed)
+    if os.path.exists(features_path):
+        _, val_set, _ = make_datasets(features_path, config['seq_len'], config['horizon'], config['fractions'])
+        if len(val_set) and val_set.panel.shape[1] == meta['input_dim']:
+            val_set.mean = np.asarray(meta['mean'], dtype=np.float32)
+            val_set.std = np.asarray(meta['std'], dtype=np.float32)
+            indices = np.sort(rng.choice(len(val_set), min(n_samples, len(val_set)), replace=False))
+            x, y = val_set.get_batch(indices)
+            return x, y, 'validation'
+    x = torch.from_numpy(rng.standard_normal((n_samples, config['seq_len'], meta['input_dim']), dtype=np.float32))
+    return x, None, 'random'
+
+
+def accuracy_report(reference, candidate, x, y=None, batch_size=256):
+    """Output deltas of candidate vs. reference on x and, with targets y, the MSE and hit rate of both"""
+    with torch.inference_mode():
+        ref = torch.cat([reference(x[s:s + batch_size]) for s in range(0, len(x), batch_size)]).float()
+        out = torch.cat([candidate(x[s:s + batch_size]) for s in range(0, len(x), batch_size)]).float()
+    delta = (out - ref).abs()
+    report = {
+        'n_samples': len(x),
+        'max_abs_delta': delta.max().item(),
+        'mean_abs_delta': delta.mean().item(),
+        'relative_delta': (delta.mean() / ref.abs().mean().clamp_min(1e-12)).item(),
+        'sign_agreement': (torch.sign(out) == torch.sign(ref)).float().mean().item(),
+    }
+    if y is not None:
+        for name, pred in (('reference', ref), ('candidate', out)):
+            report[f'{name}_mse'] = nn.functional.mse_loss(pred, y).item()
+            report[f'{name}_hit_rate'] = (torch.sign(pred) == torch.sign(y)).float().mean().item()
+    return report
+
+
+def latency_benchmark(modules, seq_len, input_dim, batch_sizes=BATCH_SIZES, repeat=20, warmup=3):
+    """
+    Median forward latency (ms) and samples/s of every module per batch
+    size, {name: {batch_size: ...}}. The modules take turns within each
+    round so that clock and cache effects hit them alike.
+    """
+    times = {name: {n: [] for n in batch_sizes} for name in modules}
+    with torch.inference_mode():
+        for n in batch_sizes:
+            x = torch.randn(n, seq_len, input_dim)
+            for i in range(warmup + repeat):
+                for name, module in modules.items():
+                    t0 = time.perf_counter()
+                    module(x)
+                    if i >= warmup:
+                        times[name][n].append(time.perf_counter() - t0)
+    results = {}
+    for name, per_size in times.items():
+        results[name] = {}
+        for n, t in per_size.items():
+            ms = 1e3 * float(np.median(t))
+            results[name][str(n)] = {'latency_ms': ms, 'samples_per_s': 1e3 * n / ms}
+    return results
+
+
+def _max_rss_mb():
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 2**20 if sys.platform == 'darwin' else rss / 2**10
+
+
+def _memory_case(path, batch_size):
+    """Peak RSS growth from loading an artifact and running one batch (run in a fresh process)"""
+    before = _max_rss_mb()
+    module, meta = load_exported(path)
+    with torch.inference_mode():
+        module(torch.randn(batch_size, meta['config']['seq_len'], meta['input_dim']))
+    return {'peak_rss_mb': _max_rss_mb() - before}
+
+
+def memory_benchmark(paths, batch_size=max(BATCH_SIZES)):
+    ctx = multiprocessing.get_context('spawn')
+    results = {}
+    with ProcessPoolExecutor(max_workers=1, mp_context=ctx, max_tasks_per_child=1) as pool:
+        for variant, path in paths.items():
+            results[variant] = pool.submit(_memory_case, path, batch_size).result()
+    return results
+
+
+def report(paths, batch_sizes=BATCH_SIZES, n_samples=4096, report_path=None):
+    """
+    Compare the exported variants: accuracy deltas of every variant against
+    fp32, latency per batch size, artifact size and peak memory.
+    Written as JSON to <export dir>/report.json unless report_path is given.
+    """
+    modules = {variant: load_exported(path) for variant, path in paths.items()}
+    reference, meta = modules['fp32']
+    x, y, source = evaluation_windows(meta, n_samples)
+    seq_len, input_dim = meta['config']['seq_len'], meta['input_dim']
+    memory = memory_benchmark(paths)
+    latency = latency_benchmark({variant: module for variant, (module, _) in modules.items()},
+                                seq_len, input_dim, batch_sizes)
+    result = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'checkpoint': meta['checkpoint'], 'evaluation_data': source, 'threads': torch.get_num_threads(),
+        'variants': {},
+    }
+    for variant, (module, _) in modules.items():
+        result['variants'][variant] = {
+            'artifact_kib': os.path.getsize(paths[variant]) / 2**10,
+            'accuracy': accuracy_report(reference, module, x, y),
+            'latency': latency[variant],
+            'memory': memory[variant],
+        }
+        v = result['variants'][variant]
+        print(f"{variant}: {v['artifact_kib']:.0f} KiB, max |delta| {v['accuracy']['max_abs_delta']:.2e}, "
+              + ', '.join(f"b={n}: {r['latency_ms']:.2f}ms" for n, r in v['latency'].items()))
+
+    report_path = report_path or os.path.join(os.path.dirname(paths['fp32']), 'report.json')
+    with open(report_path, 'w') as f:
+        json.dump(result, f, indent=2)
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export GRUTransformer as fp32 and int8 TorchScript artifacts")
+    parser.add_argument('--checkpoint', default=os.path.join(CHECKPOINT_DIR, 'best.pt'))
+    parser.add_argument('--out-dir', default=EXPORT_DIR)
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=list(BATCH_SIZES))
+    parser.add_argument('--samples', type=int, default=4096, help="windows for the accuracy report")
+    parser.add_argument('--no-report', action='store_true')
+    args = parser.parse_args(argv)
+    paths = export(args.checkpoint, args.out_dir)
+    if not args.no_report:
+        report(paths, args.batch_sizes, args.samples)
+
+
+if __name__ == "__main__":
+    main()
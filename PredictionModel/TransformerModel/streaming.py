@@ -0,0 +1,164 @@
+import time
+
+import torch
+import torch.nn as nn
+
+from model import GRUTransformer
+
+
+class StreamingGRUTransformer:
+    """
+    Bar-by-bar inference for a trained GRUTransformer over n_streams tickers.
+
+    The encoder has no positional encoding, so attention over the window
+    does not depend on the order of the positions: GRU outputs are kept in
+    a per-stream ring buffer that is overwritten in place. Only the last
+    position feeds the output head, so the final encoder layer is evaluated
+    for that single query; the earlier layers attend bidirectionally and
+    are recomputed over the window (they dominate the remaining cost when
+    transformer_layers > 1).
+
+    exact_gru=True (the default) keeps the raw inputs and reruns the GRU
+    over the window, which matches GRUTransformer.forward to float
+    precision (max abs diff below 1e-6). exact_gru=False is an opt-in
+    approximation: it carries the GRU hidden state from bar to bar, so each
+    bar costs one GRU step, but the GRU then sees the whole stream instead
+    of restarting at the window start like the batch model. With the
+    2-layer, hidden 64 model of __main__ its outputs differed from full
+    recomputation by up to 0.026 (output std about 0.09); check it with
+    parity_check(..., exact_gru=False) before relying on it.
+    """
+
+    def __init__(self, model: GRUTransformer, seq_len: int, n_streams: int, exact_gru: bool = True):
+        self.model = model.eval()
+        self.seq_len = seq_len
+        self.n_streams = n_streams
+        self.exact_gru = exact_gru
+        gru = model.gru
+        param = next(model.parameters())
+        self.h = torch.zeros(gru.num_layers, n_streams, gru.hidden_size, dtype=param.dtype)
+        self.outputs = torch.zeros(n_streams, seq_len, gru.hidden_size, dtype=param.dtype)
+        self.inputs = torch.zeros(n_streams, seq_len, gru.input_size, dtype=param.dtype) if exact_gru else None
+        self.pos = torch.zeros(n_streams, dtype=torch.long)      # next ring slot per stream
+        self.filled = torch.zeros(n_streams, dtype=torch.long)   # valid positions per stream
+
+    def reset(self, streams=None):
+        streams = slice(None) if streams is None else torch.as_tensor(streams)
+        self.h[:, streams] = 0
+        self.outputs[streams] = 0
+        if self.inputs is not None:
+            self.inputs[streams] = 0
+        self.pos[streams] = 0
+        self.filled[streams] = 0
+
+    def _last_layer(self, layer: nn.TransformerEncoderLayer, x, last, padding_mask):
+        """TransformerEncoderLayer output at the position `last` of every row only"""
+        rows = torch.arange(len(x))
+        q = x[rows, last][:, None]
+        if layer.norm_first:
+            kv = layer.norm1(x)
+            q = q + layer.self_attn(layer.norm1(q), kv, kv, key_padding_mask=padding_mask, need_weights=False)[0]
+            return q + layer._ff_block(layer.norm2(q))
+        q = layer.norm1(q + layer.self_attn(q, x, x, key_padding_mask=padding_mask, need_weights=False)[0])
+        return layer.norm2(q + layer._ff_block(q))
+
+    @torch.inference_mode()
+    def step(self, x, streams=None):
+        """
+        Feed one new bar per stream (x: (len(streams), input_dim)) and
+        return the model output (len(streams), output_dim) for the window
+        ending at that bar. Until seq_len bars were seen, the window is the
+        bars seen so far.
+        """
+        idx = torch.arange(self.n_streams) if streams is None else torch.as_tensor(streams, dtype=torch.long)
+        x = torch.as_tensor(x, dtype=self.outputs.dtype)
+        slot = self.pos[idx]
+        self.pos[idx] = (slot + 1) % self.seq_len
+        self.filled[idx] = torch.clamp(self.filled[idx] + 1, max=self.seq_len)
+
+        if self.exact_gru:
+            self.inputs[idx, slot] = x
+            # Chronological window (oldest first), restarted from a zero state like the batch model
+            order = (self.pos[idx, None] + torch.arange(self.seq_len)) % self.seq_len
+            window = self.inputs[idx[:, None], order]
+            valid = torch.arange(self.seq_len) >= self.seq_len - self.filled[idx, None]
+            gru_out, _ = self.model.gru(window)
+            h = gru_out
+            last = torch.full((len(idx),), self.seq_len - 1, dtype=torch.long)
+            padding_mask = ~valid
+            if (self.filled[idx] < self.seq_len).any():
+                # Rerun short windows from their first bar so the zero padding does not reach the GRU state
+                for i in torch.nonzero(self.filled[idx] < self.seq_len).flatten().tolist():
+                    n = int(self.filled[idx[i]])
+                    out, _ = self.model.gru(window[i:i + 1, -n:])
+                    h[i, -n:] = out[0]
+        else:
+            gru_out, h_new = self.model.gru(x[:, None, :], self.h[:, idx].contiguous())
+            self.h[:, idx] = h_new
+            self.outputs[idx, slot] = gru_out[:, 0]
+            h = self.outputs[idx]
+            last = slot
+            valid = torch.arange(self.seq_len) < self.filled[idx, None]
+            padding_mask = ~valid
+
+        if valid.all():
+            # Full windows need no mask, which keeps the encoder layers on their fused fast path
+            padding_mask = None
+        layers = self.model.transformer.layers
+        for layer in layers[:-1]:
+            h = layer(h, src_key_padding_mask=padding_mask)
+        out = self._last_layer(layers[-1], h, last, padding_mask)[:, 0]
+        if self.model.transformer.norm is not None:
+            out = self.model.transformer.norm(out)
+        return self.model.fc(out)
+
+
+def parity_check(model, X, seq_len, exact_gru=True):
+    """
+    Max |streaming - full recomputation| over all full windows of X
+    (n_streams, T, input_dim), stepping all streams bar by bar.
+    """
+    model.eval()
+    stream = StreamingGRUTransformer(model, seq_len, X.shape[0], exact_gru=exact_gru)
+    worst = 0.0
+    with torch.inference_mode():
+        for t in range(X.shape[1]):
+            out = stream.step(X[:, t])
+            if t >= seq_len - 1:
+                ref = model(X[:, t - seq_len + 1:t + 1])
+                worst = max(worst, (out - ref).abs().max().item())
+    return worst
+
+
+def latency_benchmark(model, n_streams=50, seq_len=64, n_bars=200):
+    """Mean per-bar latency (ms) for all streams: full window recomputation vs. the streaming modes"""
+    model.eval()
+    X = torch.randn(n_streams, seq_len + n_bars, model.gru.input_size)
+    results = {}
+    with torch.inference_mode():
+        t0 = time.perf_counter()
+        for t in range(seq_len, seq_len + n_bars):
+            model(X[:, t - seq_len + 1:t + 1])
+        results['full_ms'] = 1e3 * (time.perf_counter() - t0) / n_bars
+        for exact in (True, False):
+            stream = StreamingGRUTransformer(model, seq_len, n_streams, exact_gru=exact)
+            for t in range(seq_len):
+                stream.step(X[:, t])
+            t0 = time.perf_counter()
+            for t in range(seq_len, seq_len + n_bars):
+                stream.step(X[:, t])
+            results['exact_gru_ms' if exact else 'stateful_ms'] = 1e3 * (time.perf_counter() - t0) / n_bars
+    return results
+
+
+if __name__ == "__main__":
+    torch.manual_seed(0)
+    net = GRUTransformer(input_dim=4, hidden_dim=64, gru_layers=2, nhead=4, ff_dim=128,
+                         transformer_layers=2, output_dim=1)
+    X = torch.randn(50, 200, 4)
+    print(f"exact GRU parity: max abs diff {parity_check(net, X, 64, exact_gru=True):.2e}")
+    print(f"stateful GRU vs. recomputation: max abs diff {parity_check(net, X, 64, exact_gru=False):.2e}")
+    print("2 encoder layers:", latency_benchmark(net))
+    net = GRUTransformer(input_dim=4, hidden_dim=64, gru_layers=2, nhead=4, ff_dim=128,
+                         transformer_layers=1, output_dim=1)
+    print("1 encoder layer: ", latency_benchmark(net))
@@ -0,0 +1,223 @@
+import os
+import time
+import json
+import argparse
+
+import numpy as np
+import torch
+import torch.nn as nn
+from torch.utils.data import DataLoader, BatchSampler, RandomSampler, SequentialSampler
+
+from model import GRUTransformer
+from dataset import PANEL_DIR, build_panel, make_datasets
+
+CHECKPOINT_DIR = os.path.join(os.path.dirname(PANEL_DIR), 'transformer_checkpoints')
+
+DEFAULT_CONFIG = {
+    # data
+    'scale': 'hour', 'seq_len': 64, 'horizon': 1, 'fractions': (0.7, 0.15, 0.15), 'balanced_tickers': False,
+    # model
+    'hidden_dim': 64, 'gru_layers': 2, 'nhead': 4, 'ff_dim': 128, 'transformer_layers': 2,
+    # optimization
+    'epochs': 20, 'batch_size': 256, 'accum_steps': 1, 'lr': 1e-3, 'weight_decay': 1e-4, 'grad_clip': 1.0,
+    'patience': 3, 'seed': 0,
+    # CPU execution
+    'num_threads': None, 'interop_threads': None, 'num_workers': 2, 'prefetch_factor': 4, 'amp': 'auto',
+    'checkpoint_dir': CHECKPOINT_DIR, 'resume': True, 'log_every': 100,
+}
+# Settings that may change when a run is resumed; every other key must match the checkpoint's config
+RUN_KEYS = ('epochs', 'patience', 'num_threads', 'interop_threads', 'num_workers', 'prefetch_factor', 'amp',
+            'checkpoint_dir', 'resume', 'log_every')
+
+
+def config_mismatch(saved, config):
+    """{key: (saved, current)} of the non-run settings in which two configs differ"""
+    def norm(value):
+        # JSON configs turn tuples (fractions) into lists
+        return list(value) if isinstance(value, (tuple, list)) else value
+    keys = (set(saved) | set(config)) - set(RUN_KEYS)
+    return {key: (saved.get(key), config.get(key)) for key in sorted(keys)
+            if norm(saved.get(key)) != norm(config.get(key))}
+
+
+def configure_threads(num_threads=None, interop_threads=None):
+    """Set intra-op (defaults to the physical cores torch sees) and inter-op thread counts"""
+    if num_threads:
+        torch.set_num_threads(num_threads)
+    if interop_threads:
+        try:
+            torch.set_num_interop_threads(interop_threads)
+        except RuntimeError:
+            # Only allowed before the first inter-op parallel work has started
+            print("Inter-op thread count already fixed for this process")
+    return torch.get_num_threads()
+
+
+def bf16_autocast_supported():
+    """True on CPUs with native bfloat16 math (AVX512-BF16 or AMX); elsewhere bf16 is emulated and slower"""
+    checks = ('_is_avx512_bf16_supported', '_is_amx_tile_supported')
+    return any(getattr(torch.cpu, name, lambda: False)() for name in checks)
+
+
+def autocast(enabled):
+    return torch.autocast('cpu', dtype=torch.bfloat16, enabled=enabled)
+
+
+def make_loader(dataset, batch_size, shuffle, num_workers, prefetch_factor, sampler=None, generator=None):
+    """
+    DataLoader over whole batches: the sampler yields index batches and the
+    dataset gathers each batch from its window view, so workers prefetch
+    ready (batch, seq_len, features) tensors.
+    """
+    if sampler is None:
+        sampler = RandomSampler(dataset, generator=generator) if shuffle else SequentialSampler(dataset)
+    batches = BatchSampler(sampler, batch_size, drop_last=False)
+    kwargs = {'num_workers': num_workers}
+    if num_workers:
+        kwargs.update(prefetch_factor=prefetch_factor, persistent_workers=True)
+    return DataLoader(dataset, sampler=batches, batch_size=None, **kwargs)
+
+
+def build_model(config, input_dim):
+    return GRUTransformer(input_dim, config['hidden_dim'], config['gru_layers'], config['nhead'],
+                          config['ff_dim'], config['transformer_layers'], output_dim=1)
+
+
+def evaluate(model, loader, use_bf16):
+    model.eval()
+    loss_sum, n = 0.0, 0
+    with torch.inference_mode(), autocast(use_bf16):
+        for x, y in loader:
+            pred = model(x).float()
+            loss_sum += nn.functional.mse_loss(pred, y, reduction='sum').item()
+            n += len(y)
+    return loss_sum / max(n, 1)
+
+
+def train_epoch(model, optimizer, loader, use_bf16, accum_steps=1, grad_clip=None, log_every=0, epoch=0):
+    """One pass over loader with gradient accumulation and clipping; returns (mean train MSE, samples)"""
+    model.train()
+    t0 = time.perf_counter()
+    loss_sum, n = 0.0, 0
+    optimizer.zero_grad(set_to_none=True)
+    for step, (x, y) in enumerate(loader, 1):
+        with autocast(use_bf16):
+            pred = model(x)
+        loss = nn.functional.mse_loss(pred.float(), y)
+        (loss / accum_steps).backward()
+        if step % accum_steps == 0 or step == len(loader):
+            if grad_clip:
+                nn.utils.clip_grad_norm_(model.parameters(), grad_clip)
+            optimizer.step()
+            optimizer.zero_grad(set_to_none=True)
+        loss_sum += loss.item() * len(y)
+        n += len(y)
+        if log_every and step % log_every == 0:
+            print(f"  epoch {epoch} step {step}/{len(loader)} loss={loss_sum / n:.3e} "
+                  f"{n / (time.perf_counter() - t0):.0f} samples/s")
+    return loss_sum / max(n, 1), n
+
+
+def save_checkpoint(path, model, optimizer, epoch, best_val, bad_epochs, config, train_set):
+    tmp_path = path + '.tmp'
+    torch.save({
+        'model': model.state_dict(), 'optimizer': optimizer.state_dict(),
+        'epoch': epoch, 'best_val': best_val, 'bad_epochs': bad_epochs,
+        'config': config, 'mean': train_set.mean, 'std': train_set.std,
+    }, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def train(config=None):
+    """
+    Train GRUTransformer on the windowed price panel on CPU.
+
+    Every epoch logs train/validation MSE, samples/s and epoch time.
+    last.pt is written after each epoch (and resumed from with
+    resume=True, which raises ValueError if its config differs in anything
+    but RUN_KEYS), best.pt whenever the validation loss improves; training
+    stops after patience epochs without improvement. Returns the path of
+    the best checkpoint.
+    """
+    config = {**DEFAULT_CONFIG, **(config or {})}
+    torch.manual_seed(config['seed'])
+    threads = configure_threads(config['num_threads'], config['interop_threads'])
+    use_bf16 = config['amp'] == 'bf16' or (config['amp'] == 'auto' and bf16_autocast_supported())
+    print(f"threads={threads} bf16_autocast={use_bf16}")
+
+    features_path = os.path.join(PANEL_DIR, f"{config['scale']}_features.npy")
+    if not os.path.exists(features_path):
+        features_path = build_panel(config['scale'])
+    train_set, val_set, _ = make_datasets(features_path, config['seq_len'], config['horizon'], config['fractions'])
+    print(f"train={len(train_set)} val={len(val_set)} windows of {config['seq_len']} bars")
+
+    generator = torch.Generator().manual_seed(config['seed'])
+    sampler = train_set.ticker_balanced_sampler(generator=generator) if config['balanced_tickers'] else None
+    train_loader = make_loader(train_set, config['batch_size'], True, config['num_workers'],
+                               config['prefetch_factor'], sampler, generator)
+    val_loader = make_loader(val_set, 4 * config['batch_size'], False, config['num_workers'],
+                             config['prefetch_factor'])
+
+    model = build_model(config, train_set.panel.shape[1])
+    optimizer = torch.optim.AdamW(model.parameters(), lr=config['lr'], weight_decay=config['weight_decay'])
+    os.makedirs(config['checkpoint_dir'], exist_ok=True)
+    last_path = os.path.join(config['checkpoint_dir'], 'last.pt')
+    best_path = os.path.join(config['checkpoint_dir'], 'best.pt')
+
+    start_epoch, best_val, bad_epochs = 0, np.inf, 0
+    if config['resume'] and os.path.exists(last_path):
+        state = torch.load(last_path, weights_only=False)
+        mismatch = config_mismatch(state['config'], config)
+        if mismatch:
+            raise ValueError(f"{last_path} was trained with a different config {mismatch} (saved, current); "
+                             "use another checkpoint_dir or resume=False")
+        model.load_state_dict(state['model'])
+        optimizer.load_state_dict(state['optimizer'])
+        start_epoch, best_val, bad_epochs = state['epoch'] + 1, state['best_val'], state['bad_epochs']
+        print(f"Resumed from {last_path} at epoch {start_epoch}")
+
+    for epoch in range(start_epoch, config['epochs']):
+        if bad_epochs >= config['patience']:
+            break
+        t0 = time.perf_counter()
+        train_loss, n = train_epoch(model, optimizer, train_loader, use_bf16, config['accum_steps'],
+                                    config['grad_clip'], config['log_every'], epoch)
+        train_time = time.perf_counter() - t0
+        val_loss = evaluate(model, val_loader, use_bf16)
+
+        improved = val_loss < best_val
+        if improved:
+            best_val, bad_epochs = val_loss, 0
+        else:
+            bad_epochs += 1
+        save_checkpoint(last_path, model, optimizer, epoch, best_val, bad_epochs, config, train_set)
+        if improved:
+            save_checkpoint(best_path, model, optimizer, epoch, best_val, bad_epochs, config, train_set)
+        print(f"epoch {epoch}: train_mse={train_loss:.3e} val_mse={val_loss:.3e} "
+              f"{n / train_time:.0f} samples/s epoch_time={time.perf_counter() - t0:.1f}s"
+              f"{' *' if improved else ''}")
+    return best_path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train GRUTransformer on CPU; explicit flags override --config")
+    # Unset flags stay out of args, so DEFAULT_CONFIG < --config file < explicit flags
+    for key, value in DEFAULT_CONFIG.items():
+        if isinstance(value, bool):
+            parser.add_argument(f"--{key.replace('_', '-')}", type=lambda s: s.lower() in ('1', 'true', 'yes'),
+                                default=argparse.SUPPRESS, help=f"default: {value}")
+        elif isinstance(value, (int, float, str)) or value is None:
+            parser.add_argument(f"--{key.replace('_', '-')}", type=type(value) if value is not None else int,
+                                default=argparse.SUPPRESS, help=f"default: {value}")
+    parser.add_argument('--config', help="JSON file with config overrides")
+    args = vars(parser.parse_args(argv))
+    config_path = args.pop('config')
+    overrides = {}
+    if config_path:
+        with open(config_path) as f:
+            overrides = json.load(f)
+    train({**overrides, **args})
+
+
+if __name__ == "__main__":
+    main()
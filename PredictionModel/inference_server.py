@@ -0,0 +1,279 @@
+import os
+import sys
+import time
+import queue
+import threading
+from collections import deque
+from concurrent.futures import Future
+
+import numpy as np
+import torch
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+for _sub in ('TransformerModel', 'SeroFam', 'RL_Agent'):
+    sys.path.append(os.path.join(_HERE, _sub))
+
+from model import GRUTransformer  # noqa: E402
+from logic import SeroFAM  # noqa: E402
+from networks import ActorCritic  # noqa: E402
+from export import load_exported  # noqa: E402
+
+
+class TorchBackend:
+    """Stacks per-request tensors into one batch and runs the module under inference_mode"""
+
+    def __init__(self, module, example=None, preprocess=None):
+        self.module = module
+        self.example = example
+        self.preprocess = preprocess
+
+    def predict_batch(self, inputs):
+        x = torch.stack([torch.as_tensor(i, dtype=torch.float32) for i in inputs])
+        if self.preprocess is not None:
+            x = self.preprocess(x)
+        with torch.inference_mode():
+            out = self.module(x)
+        return list(out.float().numpy())
+
+    def warmup(self, batch_sizes=(1, 8, 64)):
+        if self.example is None:
+            return
+        for n in batch_sizes:
+            self.predict_batch([self.example] * n)
+
+
+class SeroFAMBackend:
+    def __init__(self, model: SeroFAM):
+        self.model = model
+
+    def predict_batch(self, inputs):
+        return list(self.model.predict_batch(np.stack(inputs)))
+
+    def warmup(self, batch_sizes=(1, 8, 64)):
+        for n in batch_sizes:
+            self.predict_batch([np.ones(self.model.input_dim)] * n)
+
+
+def load_gru_transformer(checkpoint_path, optimize=True):
+    """
+    GRUTransformer backend from a training checkpoint (see TransformerModel/train.py).
+
+    Inputs are raw (seq_len, features) windows; they are standardized with
+    the training statistics stored in the checkpoint. With optimize=True
+    the model is traced, frozen and optimized for inference with TorchScript.
+    """
+    state = torch.load(checkpoint_path, weights_only=False)
+    config = state['config']
+    input_dim = len(state['mean'])
+    net = GRUTransformer(input_dim, config['hidden_dim'], config['gru_layers'], config['nhead'],
+                         config['ff_dim'], config['transformer_layers'], output_dim=1)
+    net.load_state_dict(state['model'])
+    net.eval()
+    example = torch.zeros(config['seq_len'], input_dim)
+    module = optimize_module(net, example[None]) if optimize else net
+    mean = torch.as_tensor(state['mean'], dtype=torch.float32)
+    std = torch.as_tensor(state['std'], dtype=torch.float32)
+    return TorchBackend(module, example, preprocess=lambda x: (x - mean) / std)
+
+
+def load_exported_transformer(path, variant=None):
+    """
+    GRUTransformer backend from an exported TorchScript artifact (see
+    TransformerModel/export.py). path is an artifact or the export
+    directory, where variant ('fp32' by default, 'int8', or 'auto' for
+    int8 only when its export report is within tolerance) picks one.
+    """
+    module, meta = load_exported(path, variant)
+    mean = torch.as_tensor(meta['mean'], dtype=torch.float32)
+    std = torch.as_tensor(meta['std'], dtype=torch.float32)
+    example = torch.zeros(meta['config']['seq_len'], meta['input_dim'])
+    return TorchBackend(module, example, preprocess=lambda x: (x - mean) / std)
+
+
+def optimize_module(net, example_batch):
+    """Traced, frozen TorchScript module specialised for inference"""
+    with torch.inference_mode(False), torch.no_grad():
+        traced = torch.jit.trace(net, example_batch, check_trace=False)
+        return torch.jit.optimize_for_inference(torch.jit.freeze(traced.eval()))
+
+
+def load_policy(state_dict_path, state_dim, action_dim):
+    """PPO actor backend returning the action probabilities for every state"""
+    policy = ActorCritic(state_dim, action_dim)
+    policy.load_state_dict(torch.load(state_dict_path))
+    policy.eval()
+    return TorchBackend(policy.actor, example=torch.zeros(state_dim))
+
+
+class LatencyStats:
+    """Request latencies and batch sizes over a sliding window"""
+
+    def __init__(self, window=10000):
+        self.latencies = deque(maxlen=window)
+        self.batch_sizes = deque(maxlen=window)
+        self.completed = deque(maxlen=window)   # completion times, for throughput
+        self.lock = threading.Lock()
+
+    def record_batch(self, submitted, done):
+        with self.lock:
+            self.batch_sizes.append(len(submitted))
+            for t in submitted:
+                self.latencies.append(done - t)
+                self.completed.append(done)
+
+    def summary(self):
+        with self.lock:
+            if not self.latencies:
+                return {'requests': 0}
+            lat = 1e3 * np.fromiter(self.latencies, dtype=float)
+            span = self.completed[-1] - self.completed[0]
+            return {
+                'requests': len(lat),
+                'p50_ms': float(np.percentile(lat, 50)),
+                'p99_ms': float(np.percentile(lat, 99)),
+                'mean_batch': float(np.mean(self.batch_sizes)),
+                'throughput_rps': len(lat) / span if span > 0 else float('nan'),
+            }
+
+
+class DynamicBatcher:
+    """
+    Coalesces concurrent requests for one backend into batches.
+
+    A worker thread waits for the first request, then keeps collecting
+    until max_batch_size requests are queued or max_latency_ms have passed
+    since that first request, and runs them as one predict_batch call.
+    """
+
+    def __init__(self, backend, max_batch_size=64, max_latency_ms=5.0):
+        self.backend = backend
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency_ms / 1e3
+        self.stats = LatencyStats()
+        self.requests = queue.Queue()
+        self._stop = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def submit(self, x):
+        future = Future()
+        self.requests.put((time.perf_counter(), x, future))
+        return future
+
+    def _collect(self):
+        try:
+            first = self.requests.get(timeout=0.1)
+        except queue.Empty:
+            return []
+        batch = [first]
+        deadline = first[0] + self.max_latency
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                batch.append(self.requests.get(timeout=remaining) if remaining > 0 else self.requests.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while not self._stop.is_set():
+            batch = self._collect()
+            if not batch:
+                continue
+            submitted, inputs, futures = zip(*batch)
+            try:
+                outputs = self.backend.predict_batch(list(inputs))
+            except Exception as e:
+                for future in futures:
+                    future.set_exception(e)
+                continue
+            done = time.perf_counter()
+            for future, out in zip(futures, outputs):
+                future.set_result(out)
+            self.stats.record_batch(submitted, done)
+
+    def close(self):
+        self._stop.set()
+        self.thread.join()
+
+
+class InferenceServer:
+    """
+    In-process inference service for several models.
+
+    Models are registered (and warmed up) once; callers on any thread then
+    submit single samples and the per-model DynamicBatcher turns concurrent
+    requests -- e.g. one per ticker every bar -- into one batched forward.
+    """
+
+    def __init__(self, max_batch_size=64, max_latency_ms=5.0, num_threads=None):
+        if num_threads:
+            torch.set_num_threads(num_threads)
+        self.max_batch_size = max_batch_size
+        self.max_latency_ms = max_latency_ms
+        self.batchers = {}
+
+    def register(self, name, backend, warmup=True, **batcher_kwargs):
+        if warmup and hasattr(backend, 'warmup'):
+            backend.warmup()
+        kwargs = {'max_batch_size': self.max_batch_size, 'max_latency_ms': self.max_latency_ms, **batcher_kwargs}
+        old = self.batchers.get(name)
+        self.batchers[name] = DynamicBatcher(backend, **kwargs)
+        if old is not None:
+            old.close()
+
+    def submit(self, name, x):
+        return self.batchers[name].submit(x)
+
+    def predict(self, name, x, timeout=None):
+        return self.submit(name, x).result(timeout)
+
+    def predict_many(self, name, xs, timeout=None):
+        """Score many samples (e.g. the whole universe for one bar); they are batched together"""
+        futures = [self.submit(name, x) for x in xs]
+        return [f.result(timeout) for f in futures]
+
+    def metrics(self):
+        return {name: batcher.stats.summary() for name, batcher in self.batchers.items()}
+
+    def close(self):
+        for batcher in self.batchers.values():
+            batcher.close()
+        self.batchers = {}
+
+
+def demo(n_clients=50, n_rounds=40, seq_len=64):
+    """Score 50 tickers per bar from 50 client threads against all three model types"""
+    torch.manual_seed(0)
+    net = GRUTransformer(4, 64, 2, 4, 128, 2, 1).eval()
+    example = torch.zeros(seq_len, 4)
+    sero = SeroFAM(4, 1)
+    sero.train(np.random.rand(500, 4), np.random.rand(500, 1))
+    policy = ActorCritic(4, 2).eval()
+
+    server = InferenceServer(max_batch_size=64, max_latency_ms=5.0)
+    server.register('gru_transformer', TorchBackend(optimize_module(net, example[None]), example))
+    server.register('serofam', SeroFAMBackend(sero))
+    server.register('policy', TorchBackend(policy.actor, torch.zeros(4)))
+
+    def client(i):
+        rng = np.random.default_rng(i)
+        for _ in range(n_rounds):
+            server.predict('gru_transformer', rng.standard_normal((seq_len, 4)).astype(np.float32))
+            server.predict('serofam', rng.random(4))
+            server.predict('policy', rng.standard_normal(4).astype(np.float32))
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(n_clients)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    print(f"{3 * n_clients * n_rounds} requests in {time.perf_counter() - t0:.2f}s")
+    for name, m in server.metrics().items():
+        print(name, m)
+    server.close()
+
+
+if __name__ == "__main__":
+    demo()
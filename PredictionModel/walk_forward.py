@@ -0,0 +1,386 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+import torch
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+for _sub in ('TransformerModel', 'SeroFam', 'Clustering_Fuzzification'):
+    sys.path.append(os.path.join(_HERE, _sub))
+
+from dataset import PANEL_DIR, WindowDataset, build_panel, load_index  # noqa: E402
+from train import (DEFAULT_CONFIG, bf16_autocast_supported, autocast, build_model, make_loader,  # noqa: E402
+                   save_checkpoint, train_epoch)
+from logic import SeroFAM  # noqa: E402
+from TopoART_GA import TopoART  # noqa: E402
+from features import FEATURE_NAMES, minmax_scale  # noqa: E402
+from runners import compactness  # noqa: E402
+
+WALK_FORWARD_DIR = os.path.join(os.path.dirname(PANEL_DIR), 'walk_forward')
+DAY_NS = 86_400 * 10**9
+
+# Walk-forward defaults per model; GRUTransformer keys override train.DEFAULT_CONFIG
+DEFAULT_PARAMS = {
+    'gru_transformer': {'epochs': 3, 'warm_epochs': 1, 'num_workers': 0, 'log_every': 0},
+    'serofam': {'rho': 0.75, 'compact_every': 5000, 'merge_threshold': 0.95, 'max_rules': 500},
+    'topoart': {'rho_a': 0.9, 'phi': 5, 'tau': 100},
+}
+
+# Per-worker memory map of the feature panel, set by _panel
+_PANEL = {}
+
+
+def make_folds(timestamps, train_days=365, test_days=30, step_days=None, expanding=False):
+    """
+    Consecutive folds over the panel's time range: a train window of
+    train_days (or everything since the start with expanding=True) followed
+    by a test window of test_days, moved forward by step_days (test_days by
+    default). Bounds are UTC ns, every window is [start, end).
+    """
+    first, last = int(timestamps.min()), int(timestamps.max()) + 1
+    step = (step_days or test_days) * DAY_NS
+    folds = []
+    train_end = first + train_days * DAY_NS
+    while train_end < last:
+        folds.append({'fold': len(folds), 'train_start': first if expanding else train_end - train_days * DAY_NS,
+                      'train_end': train_end, 'test_start': train_end,
+                      'test_end': min(train_end + test_days * DAY_NS, last)})
+        train_end += step
+    return folds
+
+
+def _panel(features_path):
+    """Features, index, next-bar log return and its timestamp for every row, opened once per process"""
+    if features_path not in _PANEL:
+        index = load_index(features_path)
+        features = np.load(features_path, mmap_mode='r')
+        offsets, timestamps = index['offsets'], index['timestamps']
+        log_return = np.asarray(features[:, FEATURE_NAMES.index('log_return')], dtype=np.float64)
+        target = np.full(len(features), np.nan)
+        target[:-1] = log_return[1:]
+        target[offsets[1:] - 1] = np.nan   # the last bar of a ticker has no next bar
+        target_time = np.full(len(features), np.iinfo(np.int64).max)
+        target_time[:-1] = timestamps[1:]
+        target_time[offsets[1:] - 1] = np.iinfo(np.int64).max
+        _PANEL[features_path] = {'features': features, 'tickers': [str(t) for t in index['tickers']],
+                                 'offsets': offsets, 'timestamps': timestamps, 'target': target,
+                                 'target_time': target_time}
+    return _PANEL[features_path]
+
+
+def _rows(panel, start, end, tickers=None):
+    """
+    Rows (of the given tickers) whose next-bar target has its timestamp in
+    [start, end), in time order. Filtering on the target rather than the
+    row's own bar keeps the last bar before a test window, whose target lies
+    inside it, out of training (like WindowDataset).
+    """
+    ts = panel['target_time']
+    mask = (ts >= start) & (ts < end) & np.isfinite(panel['target'])
+    if tickers is not None:
+        keep = np.zeros(len(ts), dtype=bool)
+        for ticker in tickers:
+            i = panel['tickers'].index(ticker)
+            keep[panel['offsets'][i]:panel['offsets'][i + 1]] = True
+        mask &= keep
+    rows = np.flatnonzero(mask)
+    return rows[np.argsort(ts[rows], kind='stable')]
+
+
+def regression_metrics(pred, y):
+    """MSE (and that of always predicting 0), directional hit rate and information coefficient"""
+    pred, y = np.asarray(pred, dtype=float).ravel(), np.asarray(y, dtype=float).ravel()
+    if not len(y):
+        return {'mse': np.nan, 'zero_mse': np.nan, 'hit_rate': np.nan, 'ic': np.nan}
+    ic = np.corrcoef(pred, y)[0, 1] if np.std(pred) > 0 and np.std(y) > 0 else np.nan
+    return {'mse': float(np.mean((pred - y) ** 2)), 'zero_mse': float(np.mean(y ** 2)),
+            'hit_rate': float(np.mean(np.sign(pred) == np.sign(y))), 'ic': float(ic)}
+
+
+def gru_transformer_fold(features_path, fold, chain, init_path, since, out_path, params):
+    """
+    Train GRUTransformer on the fold's train windows and score its test
+    windows. Warm-started folds continue from the previous fold's weights,
+    optimizer state and standardization for warm_epochs instead of epochs.
+    """
+    config = {**DEFAULT_CONFIG, **params}
+    tickers = config.pop('tickers', None)
+    torch.manual_seed(config['seed'] + fold['fold'])
+    mean = std = state = None
+    if init_path:
+        state = torch.load(init_path, weights_only=False)
+        mean, std = state['mean'], state['std']
+    train_set = WindowDataset(features_path, config['seq_len'], config['horizon'], fold['train_start'],
+                              fold['train_end'], tickers, mean, std)
+    test_set = WindowDataset(features_path, config['seq_len'], config['horizon'], fold['test_start'],
+                             fold['test_end'], tickers, train_set.mean, train_set.std)
+    if not len(train_set):
+        raise ValueError("No training windows in this fold")
+
+    model = build_model(config, train_set.panel.shape[1])
+    optimizer = torch.optim.AdamW(model.parameters(), lr=config['lr'], weight_decay=config['weight_decay'])
+    epochs = config['epochs']
+    if state is not None:
+        model.load_state_dict(state['model'])
+        optimizer.load_state_dict(state['optimizer'])
+        epochs = config['warm_epochs']
+    use_bf16 = config['amp'] == 'bf16' or (config['amp'] == 'auto' and bf16_autocast_supported())
+    generator = torch.Generator().manual_seed(config['seed'] + fold['fold'])
+    train_loader = make_loader(train_set, config['batch_size'], True, config['num_workers'],
+                               config['prefetch_factor'], generator=generator)
+    train_mse = np.nan
+    for epoch in range(epochs):
+        train_mse, _ = train_epoch(model, optimizer, train_loader, use_bf16, config['accum_steps'],
+                                   config['grad_clip'], config['log_every'], epoch)
+
+    model.eval()
+    preds, targets = [], []
+    with torch.inference_mode(), autocast(use_bf16):
+        for x, y in make_loader(test_set, 4 * config['batch_size'], False, 0, config['prefetch_factor']):
+            preds.append(model(x).float().numpy())
+            targets.append(y.numpy())
+    metrics = regression_metrics(np.concatenate(preds) if preds else [], np.concatenate(targets) if targets else [])
+    save_checkpoint(out_path, model, optimizer, epochs - 1, metrics['mse'], 0, config, train_set)
+    return {'n_train': len(train_set), 'n_test': len(test_set), 'train_mse': train_mse, **metrics}
+
+
+def serofam_fold(features_path, fold, chain, init_path, since, out_path, params):
+    """
+    Per-ticker SeroFAM predicting the next-bar log return from the current
+    bar's scaled features. Warm-started folds load the previous rule base
+    and only learn the bars after its train window (since).
+    """
+    params = dict(params)
+    lo, hi = (np.asarray(b) for b in params.pop('bounds'))
+    panel = _panel(features_path)
+    model = SeroFAM.load(init_path) if init_path else SeroFAM(len(FEATURE_NAMES), 1, **params)
+    train = _rows(panel, fold['train_start'] if since is None else since, fold['train_end'], [chain])
+    test = _rows(panel, fold['test_start'], fold['test_end'], [chain])
+    model.partial_fit(minmax_scale(panel['features'][train], lo, hi), panel['target'][train],
+                      until=pd.Timestamp(fold['train_end'], tz='UTC'))
+    model.save(out_path)
+    pred = model.predict_batch(minmax_scale(panel['features'][test], lo, hi))[:, 0] if len(test) else []
+    return {'n_train': len(train), 'n_test': len(test), 'n_rules': model.k,
+            **regression_metrics(pred, panel['target'][test])}
+
+
+def topoart_fold(features_path, fold, chain, init_path, since, out_path, params):
+    """
+    TopoART over the scaled features of all tickers; the test bars are
+    assigned to the learned clusters. Warm-started folds load the previous
+    nodes and only learn the bars after its train window (since).
+    """
+    params = dict(params)
+    lo, hi = (np.asarray(b) for b in params.pop('bounds'))
+    tickers = params.pop('tickers', None)
+    panel = _panel(features_path)
+    model = TopoART.load(init_path) if init_path else TopoART(**params)
+    train = _rows(panel, fold['train_start'] if since is None else since, fold['train_end'], tickers)
+    test = _rows(panel, fold['test_start'], fold['test_end'], tickers)
+    model.partial_fit(minmax_scale(panel['features'][train], lo, hi))
+    model.save(out_path)
+    X_test = minmax_scale(panel['features'][test], lo, hi)
+    labels, _ = model.predict(X_test)
+    return {'n_train': len(train), 'n_test': len(test), 'n_nodes': model.layer_a.n_nodes,
+            'n_clusters': len(model.get_clusters_a()),
+            'coverage': float(np.mean(labels >= 0)) if len(labels) else np.nan,
+            'compactness': compactness(X_test, labels)}
+
+
+MODELS = {
+    'gru_transformer': (gru_transformer_fold, '.pt'),
+    'serofam': (serofam_fold, '.npz'),
+    'topoart': (topoart_fold, '.npz'),
+}
+
+
+def study_id(model, params, folds, warm_start):
+    key = json.dumps({'model': model, 'params': params, 'warm_start': warm_start,
+                      'folds': [[f['train_start'], f['train_end'], f['test_end']] for f in folds]}, sort_keys=True)
+    return hashlib.sha1(key.encode()).hexdigest()[:12]
+
+
+def _fold_path(study_dir, chain, fold, model):
+    return os.path.join(study_dir, chain, f"fold_{fold['fold']:03d}{MODELS[model][1]}")
+
+
+def _init_worker(num_threads):
+    torch.set_num_threads(num_threads)
+
+
+def _run_chain(features_path, model, chain, folds, params, study_dir, warm_start):
+    """
+    Run the folds of one chain in order; with warm_start each fold starts
+    from the checkpoint of the one before. A fold whose result file exists
+    is not rerun (its checkpoint still seeds the next fold). Stops at the
+    first failing fold. Returns the result rows of the folds run here.
+    """
+    fold_fn, _ = MODELS[model]
+    os.makedirs(os.path.join(study_dir, chain), exist_ok=True)
+    rows, prev = [], None
+    for fold in folds:
+        path = _fold_path(study_dir, chain, fold, model)
+        if os.path.exists(path + '.json'):
+            prev = fold
+            continue
+        init = _fold_path(study_dir, chain, prev, model) if warm_start and prev is not None else None
+        row = {'model': model, 'chain': chain, 'fold': fold['fold'], 'warm_start': init is not None,
+               **{key: str(pd.Timestamp(fold[key], tz='UTC'))
+                  for key in ('train_start', 'train_end', 'test_start', 'test_end')}, 'error': ''}
+        t0 = time.perf_counter()
+        try:
+            row.update(fold_fn(features_path, fold, chain, init, prev['train_end'] if init else None, path, params))
+        except Exception as e:
+            row['error'] = f"{type(e).__name__}: {e}"
+        row['runtime_s'] = time.perf_counter() - t0
+        rows.append(row)
+        if row['error']:
+            # Reported by collect, but not a finished fold: a rerun tries it again
+            _write_row(path + '.error.json', row)
+            break
+        _write_row(path + '.json', row)
+        if os.path.exists(path + '.error.json'):
+            os.remove(path + '.error.json')
+        prev = fold
+    return rows
+
+
+def _write_row(path, row):
+    with open(path + '.tmp', 'w') as f:
+        json.dump(row, f)
+    os.replace(path + '.tmp', path)
+
+
+def collect(out_dir=WALK_FORWARD_DIR, studies=None):
+    """
+    Evaluation table of all finished and failed folds (of the given study
+    ids), one row per model/chain/fold; failed folds have a non-empty error.
+    """
+    rows = []
+    for study in sorted(studies or os.listdir(out_dir)):
+        study_dir = os.path.join(out_dir, study)
+        for chain in sorted(os.listdir(study_dir)) if os.path.isdir(study_dir) else []:
+            for name in sorted(os.listdir(os.path.join(study_dir, chain))):
+                if name.endswith('.json'):
+                    with open(os.path.join(study_dir, chain, name)) as f:
+                        rows.append({'study': study, **json.load(f)})
+    return pd.DataFrame(rows)
+
+
+def summarize(table):
+    """
+    Per model and fold: metrics averaged over the chains (tickers) that
+    finished the fold, weighted by their test bars, and n_failed, the number
+    of chains that failed it.
+    """
+    metric_cols = [c for c in ('mse', 'zero_mse', 'hit_rate', 'ic', 'n_rules', 'n_clusters', 'coverage',
+                               'compactness') if c in table]
+
+    def weighted(group):
+        w = group['n_test'].clip(lower=1)
+        out = {c: np.average(group[c].fillna(0), weights=w * group[c].notna()) if group[c].notna().any()
+               else np.nan for c in metric_cols}
+        out.update(n_test=int(group['n_test'].sum()), runtime_s=float(group['runtime_s'].sum()))
+        return pd.Series(out)
+
+    keys = ['model', 'fold', 'test_start']
+    failed = table['error'].fillna('').ne('')
+    n_failed = failed.groupby([table[key] for key in keys]).sum()
+    summary = table[~failed].groupby(keys).apply(weighted) if (~failed).any() else pd.DataFrame()
+    summary = summary.reindex(n_failed.index)
+    summary['n_failed'] = n_failed
+    return summary.reset_index()
+
+
+def run_walk_forward(models=tuple(MODELS), scale='hour', train_days=365, test_days=30, step_days=None,
+                     expanding=False, warm_start=True, params=None, tickers=None, max_workers=None,
+                     num_threads=1, out_dir=WALK_FORWARD_DIR):
+    """
+    Walk-forward study over the stored feature panel of one scale.
+
+    Every model runs as chains of consecutive folds: GRUTransformer and
+    TopoART as one chain over all (or the given) tickers, SeroFAM as one
+    chain per ticker.
+    With warm_start each fold continues from the previous fold's checkpoint
+    and only has to learn the new bars (SeroFAM, TopoART) or fine-tune for
+    a few epochs (GRUTransformer); without it every fold trains from
+    scratch and becomes a chain of its own. Chains are independent and run
+    in parallel processes with num_threads torch threads each.
+
+    Checkpoints and per-fold results go to <out_dir>/<model>-<study id>/,
+    so an interrupted study resumes where it stopped. Returns the
+    evaluation table of all folds (see collect and summarize).
+    """
+    features_path = os.path.join(PANEL_DIR, f'{scale}_features.npy')
+    if not os.path.exists(features_path):
+        features_path = build_panel(scale)
+    panel = _panel(features_path)
+    folds = make_folds(panel['timestamps'], train_days, test_days, step_days, expanding)
+    if not folds:
+        raise ValueError(f"The {scale} panel is shorter than the {train_days} day train window")
+    selected = [t for t in panel['tickers'] if tickers is None or t in tickers]
+    # ART-family inputs are scaled with the bounds of the first train window only, kept fixed across folds
+    first = _rows(panel, folds[0]['train_start'], folds[0]['train_end'], tickers and selected)
+    lo, hi = np.percentile(panel['features'][first], [0.5, 99.5], axis=0)
+
+    tasks, studies = [], []
+    for model in models:
+        model_params = {**DEFAULT_PARAMS[model], **(params or {}).get(model, {})}
+        if model != 'gru_transformer':
+            model_params['bounds'] = [lo.tolist(), hi.tolist()]
+        if tickers is not None and model != 'serofam':
+            model_params['tickers'] = selected
+        study = f"{model}-{study_id(model, model_params, folds, warm_start)}"
+        study_dir = os.path.join(out_dir, study)
+        studies.append(study)
+        chains = selected if model == 'serofam' else ['all']
+        for chain in chains:
+            for chain_folds in ([folds] if warm_start else [[f] for f in folds]):
+                tasks.append((features_path, model, chain, chain_folds, model_params, study_dir, warm_start))
+    print(f"{len(folds)} folds x {len(models)} models in {len(tasks)} chains, test "
+          f"{pd.Timestamp(folds[0]['test_start'], tz='UTC')} .. {pd.Timestamp(folds[-1]['test_end'], tz='UTC')}")
+
+    t0 = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=max_workers or os.cpu_count(), initializer=_init_worker,
+                             initargs=(num_threads,)) as pool:
+        futures = {pool.submit(_run_chain, *task): task for task in tasks}
+        for i, future in enumerate(as_completed(futures), 1):
+            rows = future.result()
+            errors = [row['error'] for row in rows if row['error']]
+            _, model, chain, *_ = futures[future]
+            print(f"[{i}/{len(tasks)}] {model}/{chain}: {len(rows)} folds run"
+                  f"{', ' + errors[0] if errors else ''} ({time.perf_counter() - t0:.0f}s)")
+
+    table = collect(out_dir, studies)
+    table.to_csv(os.path.join(out_dir, 'results.csv'), index=False)
+    return table
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Walk-forward retraining study of the prediction models")
+    parser.add_argument('--models', nargs='+', default=list(MODELS), choices=list(MODELS))
+    parser.add_argument('--scale', default='hour')
+    parser.add_argument('--train-days', type=int, default=365)
+    parser.add_argument('--test-days', type=int, default=30)
+    parser.add_argument('--step-days', type=int)
+    parser.add_argument('--expanding', action='store_true')
+    parser.add_argument('--cold', action='store_true', help="train every fold from scratch")
+    parser.add_argument('--tickers', nargs='+')
+    parser.add_argument('--max-workers', type=int)
+    parser.add_argument('--num-threads', type=int, default=1, help="torch threads per worker process")
+    parser.add_argument('--params', help="JSON {model: {param: value}} overriding DEFAULT_PARAMS")
+    args = parser.parse_args(argv)
+    table = run_walk_forward(args.models, args.scale, args.train_days, args.test_days, args.step_days,
+                             args.expanding, not args.cold, json.loads(args.params) if args.params else None,
+                             args.tickers, args.max_workers, args.num_threads)
+    print(summarize(table).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,125 @@
+import os
+import time
+import pickle
+import hashlib
+import threading
 import pandas as pd
 import numpy as np
 import requests
-from typing import Dict, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+# Default time-to-live of each cached data set (seconds)
+MACRO_TTL = 24 * 3600
+RATIOS_TTL = 7 * 24 * 3600
+EARNINGS_TTL = 7 * 24 * 3600
+
+
+class TTLCache:
+    """
+    Thread-safe cache whose entries expire after ttl seconds.
+
+    Loads are single-flight: when several threads ask for the same stale key
+    only one of them calls the loader, the others wait for its result. With a
+    cache_dir, entries are also pickled to disk so they survive restarts.
+    """
+
+    def __init__(self, ttl: float, cache_dir: Optional[str] = None, name: str = 'cache'):
+        self.ttl = ttl
+        self.entries = {}
+        self.lock = threading.Lock()
+        self.key_locks = {}
+        self.path = os.path.join(cache_dir, name) if cache_dir else None
+        if self.path:
+            os.makedirs(self.path, exist_ok=True)
+
+    def _file(self, key: str) -> str:
+        return os.path.join(self.path, hashlib.sha1(key.encode('utf-8')).hexdigest() + '.pkl')
+
+    def _lookup(self, key: str):
+        """Fresh (loaded_at, value) entry for key, or None"""
+        entry = self.entries.get(key)
+        if entry is None and self.path and os.path.exists(self._file(key)):
+            try:
+                with open(self._file(key), 'rb') as f:
+                    entry = pickle.load(f)
+                self.entries[key] = entry
+            except Exception:
+                entry = None
+        if entry is not None and time.time() - entry[0] < self.ttl:
+            return entry
+        return None
+
+    def is_fresh(self, key: str) -> bool:
+        return self._lookup(key) is not None
+
+    def get(self, key: str, loader: Callable[[], Any]) -> Any:
+        """Cached value for key, calling loader() when it is missing or expired"""
+        entry = self._lookup(key)
+        if entry is not None:
+            return entry[1]
+
+        with self.lock:
+            key_lock = self.key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            # Another thread may have loaded it while we were waiting
+            entry = self._lookup(key)
+            if entry is not None:
+                return entry[1]
+            value = loader()
+            self.set(key, value)
+            return value
+
+    def set(self, key: str, value: Any):
+        entry = (time.time(), value)
+        self.entries[key] = entry
+        if self.path:
+            tmp_path = self._file(key) + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(entry, f)
+            os.replace(tmp_path, self._file(key))
 
 
 class FundamentalAnalyzer:
-    def __init__(self, api_key: str = "YOUR_API_KEY"):
+    def __init__(self,
+                 api_key: str = "YOUR_API_KEY",
+                 cache_dir: Optional[str] = None,
+                 macro_ttl: float = MACRO_TTL,
+                 ratios_ttl: float = RATIOS_TTL,
+                 earnings_ttl: float = EARNINGS_TTL,
+                 max_workers: int = 8):
+        """
+        Fundamental data is cached: macro indicators are shared by all tickers,
+        ratios and earnings are cached per ticker. Each data set has its own
+        TTL; with cache_dir the caches are persisted on disk.
+        """
         self.api_key = api_key
+        self.max_workers = max_workers
+        self.macro_cache = TTLCache(macro_ttl, cache_dir, 'macro')
+        self.ratios_cache = TTLCache(ratios_ttl, cache_dir, 'ratios')
+        self.earnings_cache = TTLCache(earnings_ttl, cache_dir, 'earnings')
 
     def get_financial_ratios(self, ticker: str) -> Dict:
         """
-        Get key financial ratios for a company.
+        Get key financial ratios for a company (cached).
+        """
+        return self.ratios_cache.get(ticker, lambda: self._fetch_financial_ratios(ticker))
+
+    def get_earnings_data(self, ticker: str) -> pd.DataFrame:
+        """
+        Get historical earnings data (cached).
+        """
+        return self.earnings_cache.get(ticker, lambda: self._fetch_earnings_data(ticker))
+
+    def get_macro_indicators(self) -> Dict:
+        """
+        Get macroeconomic indicators (cached, shared by all tickers).
+        """
+        return self.macro_cache.get('macro', self._fetch_macro_indicators)
+
+    def _fetch_financial_ratios(self, ticker: str) -> Dict:
+        """
+        Fetch key financial ratios for a company.
         """
         ratios = {
             'PE_Ratio': None,
@@ -24,9 +133,9 @@ class FundamentalAnalyzer:
         # TODO: Implement API call to get actual data
         return ratios
 
-    def get_earnings_data(self, ticker: str) -> pd.DataFrame:
+    def _fetch_earnings_data(self, ticker: str) -> pd.DataFrame:
         """
-        Get historical earnings data.
+        Fetch historical earnings data.
         """
         # Placeholder for earnings data structure
         data = {
@@ -37,9 +146,9 @@ class FundamentalAnalyzer:
         }
         return pd.DataFrame(data)
 
-    def get_macro_indicators(self) -> Dict:
+    def _fetch_macro_indicators(self) -> Dict:
         """
-        Get macroeconomic indicators.
+        Fetch macroeconomic indicators.
         """
         indicators = {
             'GDP_Growth': None,
@@ -51,13 +160,14 @@ class FundamentalAnalyzer:
         # TODO: Implement API call to get actual data
         return indicators
 
-    def analyze_company(self, ticker: str) -> Dict:
+    def analyze_company(self, ticker: str, macro: Optional[Dict] = None) -> Dict:
         """
         Comprehensive fundamental analysis of a company.
         """
         ratios = self.get_financial_ratios(ticker)
         earnings = self.get_earnings_data(ticker)
-        macro = self.get_macro_indicators()
+        if macro is None:
+            macro = self.get_macro_indicators()
 
         analysis = {
             'ticker': ticker,
@@ -68,6 +178,24 @@ class FundamentalAnalyzer:
 
         return analysis
 
+    def analyze_universe(self, tickers: List[str]) -> Dict[str, Dict]:
+        """
+        Fundamental analysis of many companies.
+
+        Macro indicators are fetched (at most) once for the whole universe and
+        only stale ratios/earnings are refetched, concurrently.
+        """
+        macro = self.get_macro_indicators()
+
+        stale = [ticker for ticker in tickers
+                 if not (self.ratios_cache.is_fresh(ticker) and self.earnings_cache.is_fresh(ticker))]
+        if stale:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                list(executor.map(self.get_financial_ratios, stale))
+                list(executor.map(self.get_earnings_data, stale))
+
+        return {ticker: self.analyze_company(ticker, macro) for ticker in tickers}
+
     def _assess_financial_health(self, ratios: Dict) -> str:
         # Implement financial health assessment logic
         return "stable"
@@ -1,18 +1,31 @@
 import os
-import requests
 import pandas as pd
 import datetime
-import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
 from tqdm import tqdm
-import json
+from http_client import RateLimiter, make_session
+from insider_store import InsiderDeltaStore, KEY_FORM_TYPES, insider_sentiment_label, transaction_side
+from insider_universe import build_insider_frame, build_filings_frame, analyze_universe
+from insider_sink import InsiderResultSink, summary_row
 
 # Load environment variables from .env file in parent directory
 load_dotenv(dotenv_path='../.env')
 
 class InsiderTradingAnalyzer:
-    def __init__(self):
-        """Initialize the analyzer with API key from environment variables"""
+    def __init__(self, max_workers=8, requests_per_second=5.0, timeout=10, retries=3, delta_mode=False,
+                 export_json=False):
+        """
+        Initialize the analyzer with API key from environment variables
+
+        - max_workers: maximum number of concurrent API requests
+        - requests_per_second: rate limit shared by all workers
+        - timeout: per-request timeout in seconds
+        - retries: retries (with backoff) on connection errors, 429 and 5xx
+        - delta_mode: ingest only new records into a persistent store and
+          analyze its running aggregates instead of the fetched history
+        - export_json: also write the full per-ticker JSON result files
+        """
         self.api_key = os.getenv('QUIVER_API_KEY')
         if not self.api_key:
             raise ValueError("QUIVER_API_KEY not found in .env file")
@@ -23,10 +36,23 @@ class InsiderTradingAnalyzer:
             'Authorization': f'Bearer {self.api_key}'
         }
 
+        # Pooled keep-alive connections shared by all fetches
+        self.timeout = timeout
+        self.max_workers = max_workers
+        self.session = make_session(pool_size=max_workers, retries=retries, headers=self.headers)
+        self.rate_limiter = RateLimiter(requests_per_second, burst=max_workers)
+
         # Create output directory
         self.output_dir = os.path.join('..', 'data', 'insider')
         os.makedirs(self.output_dir, exist_ok=True)
 
+        # Results are buffered and written as one partitioned table per run
+        self.sink = InsiderResultSink(os.path.join(self.output_dir, 'results'),
+                                      export_json=export_json, json_dir=self.output_dir)
+
+        # Persistent store of already ingested records for delta mode
+        self.store = InsiderDeltaStore(os.path.join(self.output_dir, 'insider_store.db')) if delta_mode else None
+
     def get_sp500_tickers(self):
         """Get S&P 500 tickers as a sample of companies to analyze"""
         try:
@@ -37,37 +63,34 @@ class InsiderTradingAnalyzer:
             # Return a small subset of major companies as fallback
             return ["AAPL", "MSFT", "AMZN", "GOOGL", "META", "TSLA", "NVDA", "JPM", "V", "JNJ"]
 
-    def fetch_insider_trading(self, ticker):
-        """Fetch insider trading data for a specific ticker"""
-        endpoint = f"/live/insiders/{ticker}"
+    def _fetch(self, endpoint, ticker, label):
+        """Rate-limited GET on the pooled session, returns [] on failure"""
         url = f"{self.base_url}{endpoint}"
 
+        self.rate_limiter.acquire()
         try:
-            response = requests.get(url, headers=self.headers)
+            response = self.session.get(url, timeout=self.timeout)
             if response.status_code == 200:
                 return response.json()
             else:
-                print(f"Error fetching insider trading for {ticker}: {response.status_code}")
+                print(f"Error fetching {label} for {ticker}: {response.status_code}")
                 return []
         except Exception as e:
-            print(f"Request error for {ticker} insider trading: {e}")
+            print(f"Request error for {ticker} {label}: {e}")
             return []
 
+    def fetch_insider_trading(self, ticker):
+        """Fetch insider trading data for a specific ticker"""
+        return self._fetch(f"/live/insiders/{ticker}", ticker, "insider trading")
+
     def fetch_sec_filings(self, ticker):
         """Fetch SEC filings for a specific ticker"""
-        endpoint = f"/live/forms/{ticker}"
-        url = f"{self.base_url}{endpoint}"
+        return self._fetch(f"/live/forms/{ticker}", ticker, "SEC filings")
 
-        try:
-            response = requests.get(url, headers=self.headers)
-            if response.status_code == 200:
-                return response.json()
-            else:
-                print(f"Error fetching SEC filings for {ticker}: {response.status_code}")
-                return []
-        except Exception as e:
-            print(f"Request error for {ticker} SEC filings: {e}")
-            return []
+    def submit_fetches(self, pool, ticker):
+        """Queue both endpoints for a ticker on pool, returns (insider, filings) futures"""
+        return (pool.submit(self.fetch_insider_trading, ticker),
+                pool.submit(self.fetch_sec_filings, ticker))
 
     def analyze_insider_sentiment(self, insider_data):
         """
@@ -95,26 +118,21 @@ class InsiderTradingAnalyzer:
         net_value = 0
 
         for trade in insider_data:
-            transaction_type = trade.get('TransactionType', '').upper()
+            side = transaction_side(trade.get('TransactionType', ''))
             shares = trade.get('Shares', 0)
             value = trade.get('Value', 0)
 
-            if 'BUY' in transaction_type or 'PURCHASE' in transaction_type:
+            if side > 0:
                 buy_count += 1
                 net_shares += shares
                 net_value += value
-            elif 'SELL' in transaction_type or 'DISPOSITION' in transaction_type:
+            elif side < 0:
                 sell_count += 1
                 net_shares -= shares
                 net_value -= value
 
         # Determine sentiment
-        if net_value > 0 and buy_count > sell_count:
-            sentiment = 'Bullish'
-        elif net_value < 0 and sell_count > buy_count:
-            sentiment = 'Bearish'
-        else:
-            sentiment = 'Neutral'
+        sentiment = insider_sentiment_label(buy_count, sell_count, net_value)
 
         return {
             'buy_count': buy_count,
@@ -161,7 +179,7 @@ class InsiderTradingAnalyzer:
                 recent_filing_count += 1
 
             # Track key filings that indicate institutional interest
-            if form_type in ['13F', '13G', '13D', '13F-HR']:
+            if form_type in KEY_FORM_TYPES:
                 key_filings.append({
                     'form_type': form_type,
                     'date': date,
@@ -214,17 +232,79 @@ class InsiderTradingAnalyzer:
         # Clip the final score to -100 to 100 range
         return max(-100, min(100, base_score))
 
+    def analyze_universe(self, insider_by_ticker, filings_by_ticker):
+        """
+        Columnar equivalent of analyze_insider_sentiment, analyze_sec_filings,
+        calculate_institutional_confidence and get_confidence_category for many
+        tickers at once.
+
+        Takes dicts of ticker -> raw records and returns a DataFrame with one row per ticker
+        """
+        insider_df = build_insider_frame(insider_by_ticker)
+        filings_df = build_filings_frame(filings_by_ticker)
+        tickers = list(dict.fromkeys(list(insider_by_ticker) + list(filings_by_ticker)))
+        return analyze_universe(insider_df, filings_df, tickers)
+
     def process_company(self, ticker):
-        """Process insider trading and SEC filings for a specific company"""
+        """Process insider trading and SEC filings for a specific company and write its result"""
         print(f"Processing {ticker}...")
 
-        # Fetch data
-        insider_data = self.fetch_insider_trading(ticker)
-        filings_data = self.fetch_sec_filings(ticker)
+        # Fetch both endpoints in parallel
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            insider_future, filings_future = self.submit_fetches(pool, ticker)
+            insider_data, filings_data = insider_future.result(), filings_future.result()
 
-        # Analyze data
-        insider_sentiment = self.analyze_insider_sentiment(insider_data)
-        sec_analysis = self.analyze_sec_filings(filings_data)
+        result = self.analyze_company(ticker, insider_data, filings_data)
+        self.sink.flush()
+        return result
+
+    def process_companies(self, tickers):
+        """
+        Process many companies concurrently.
+
+        All fetches are queued on one pool (bounded by max_workers and the
+        rate limiter); each company is analyzed as soon as both of its
+        endpoints have returned. The pool is shut down on exit, and if the
+        loop raises, the fetches that have not started are cancelled.
+        Returns a dict of ticker -> result; the results stay buffered until
+        generate_aggregate_report writes them.
+        """
+        results = {}
+        processed = set()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            try:
+                futures = {ticker: self.submit_fetches(pool, ticker) for ticker in tickers}
+                owner = {future: ticker for ticker, pair in futures.items() for future in pair}
+                with tqdm(total=len(futures)) as progress:
+                    for future in as_completed(owner):
+                        ticker = owner[future]
+                        insider_future, filings_future = futures[ticker]
+                        if ticker in processed or not (insider_future.done() and filings_future.done()):
+                            continue
+                        processed.add(ticker)
+                        try:
+                            results[ticker] = self.analyze_company(ticker, insider_future.result(),
+                                                                   filings_future.result())
+                        except Exception as e:
+                            print(f"Error processing {ticker}: {e}")
+                        progress.update(1)
+            except BaseException:
+                pool.shutdown(wait=False, cancel_futures=True)
+                raise
+
+        return results
+
+    def analyze_company(self, ticker, insider_data, filings_data):
+        """Analyze already fetched insider trading and SEC filings data for a company"""
+        if self.store is not None:
+            # Delta mode: only fold new records into the stored running aggregates
+            insider_data, filings_data = self.store.ingest(ticker, insider_data, filings_data)
+            insider_sentiment = self.store.insider_sentiment(ticker)
+            sec_analysis = self.store.sec_analysis(ticker)
+        else:
+            # Analyze data
+            insider_sentiment = self.analyze_insider_sentiment(insider_data)
+            sec_analysis = self.analyze_sec_filings(filings_data)
 
         # Calculate confidence score
         confidence_score = self.calculate_institutional_confidence(insider_sentiment, sec_analysis)
@@ -245,8 +325,8 @@ class InsiderTradingAnalyzer:
             'confidence_category': self.get_confidence_category(confidence_score)
         }
 
-        # Save result
-        self.save_result(ticker, result)
+        # Buffer result for the next bulk write
+        self.buffer_result(ticker, result)
 
         return result
 
@@ -263,54 +343,24 @@ class InsiderTradingAnalyzer:
         else:
             return "Very Bearish"
 
-    def save_result(self, ticker, result):
-        """Save analysis result to file"""
-        file_path = os.path.join(self.output_dir, f"{ticker}_insider_analysis.json")
-        with open(file_path, 'w') as f:
-            json.dump(result, f, indent=2)
-
-        # Also save a summary CSV
-        summary = {
-            'Ticker': ticker,
-            'Analysis Date': result['analysis_date'],
-            'Confidence Score': result['institutional_confidence_score'],
-            'Confidence Category': result['confidence_category'],
-            'Insider Buy Count': result['insider_trading']['analysis']['buy_count'],
-            'Insider Sell Count': result['insider_trading']['analysis']['sell_count'],
-            'Net Shares': result['insider_trading']['analysis']['net_shares'],
-            'Net Value ($)': result['insider_trading']['analysis']['net_value'],
-            'Insider Sentiment': result['insider_trading']['analysis']['sentiment'],
-            'Recent SEC Filings': result['sec_filings']['analysis']['recent_filing_count'],
-            'Key Institutional Filings': len(result['sec_filings']['analysis']['key_filings'])
-        }
-
-        summary_df = pd.DataFrame([summary])
-        summary_path = os.path.join(self.output_dir, f"{ticker}_summary.csv")
-        summary_df.to_csv(summary_path, index=False)
+    def buffer_result(self, ticker, result):
+        """
+        Buffer an analysis result in the sink. Nothing is written until the
+        sink is flushed: by process_company for a single company, or by
+        generate_aggregate_report for a whole run.
+        """
+        self.sink.add(ticker, result)
 
     def generate_aggregate_report(self, results):
-        """Generate an aggregate report of all analyzed companies"""
+        """Write all buffered results and generate an aggregate report of all analyzed companies"""
         if not results:
             return
 
-        # Create aggregate summary DataFrame
-        summary_rows = []
-        for ticker, result in results.items():
-            summary_rows.append({
-                'Ticker': ticker,
-                'Analysis Date': result['analysis_date'],
-                'Confidence Score': result['institutional_confidence_score'],
-                'Confidence Category': result['confidence_category'],
-                'Insider Buy Count': result['insider_trading']['analysis']['buy_count'],
-                'Insider Sell Count': result['insider_trading']['analysis']['sell_count'],
-                'Net Shares': result['insider_trading']['analysis']['net_shares'],
-                'Net Value ($)': result['insider_trading']['analysis']['net_value'],
-                'Insider Sentiment': result['insider_trading']['analysis']['sentiment'],
-                'Recent SEC Filings': result['sec_filings']['analysis']['recent_filing_count'],
-                'Key Institutional Filings': len(result['sec_filings']['analysis']['key_filings'])
-            })
-
-        summary_df = pd.DataFrame(summary_rows)
+        # Bulk write of this run's summary and raw records
+        summary_df = self.sink.flush()
+        if summary_df.empty:
+            summary_df = pd.DataFrame([summary_row(ticker, result) for ticker, result in results.items()])
+
         summary_df.sort_values('Confidence Score', ascending=False, inplace=True)
 
         # Save aggregate report
@@ -323,22 +373,21 @@ class InsiderTradingAnalyzer:
         category_path = os.path.join(self.output_dir, "confidence_distribution.csv")
         category_counts.to_csv(category_path, index=False)
 
-def main():
-    analyzer = InsiderTradingAnalyzer()
+def main(delta_mode=False):
+    """
+    Run the insider analysis over the S&P 500
+
+    Parameters:
+    - delta_mode: keep a persistent store and only ingest records that are new since the last run
+    """
+    analyzer = InsiderTradingAnalyzer(delta_mode=delta_mode)
 
     # Get tickers (using S&P 500 as an example)
     tickers = analyzer.get_sp500_tickers()
     print(f"Retrieved {len(tickers)} tickers for analysis")
 
-    # Analyze each company (limit to first 50 for demo purposes)
-    results = {}
-    for ticker in tqdm(tickers[:50]):
-        try:
-            results[ticker] = analyzer.process_company(ticker)
-            # Add delay to avoid API rate limits
-            time.sleep(1)
-        except Exception as e:
-            print(f"Error processing {ticker}: {e}")
+    # Analyze all companies concurrently (rate limiting is handled by the analyzer)
+    results = analyzer.process_companies(tickers)
 
     # Generate aggregate report
     analyzer.generate_aggregate_report(results)
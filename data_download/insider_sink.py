@@ -0,0 +1,127 @@
+import os
+import json
+import uuid
+import shutil
+import datetime
+import pandas as pd
+from typing import Dict, Optional
+
+
+def summary_row(ticker: str, result: Dict) -> Dict:
+    """One summary row of an InsiderTradingAnalyzer result"""
+    return {
+        'Ticker': ticker,
+        'Analysis Date': result['analysis_date'],
+        'Confidence Score': result['institutional_confidence_score'],
+        'Confidence Category': result['confidence_category'],
+        'Insider Buy Count': result['insider_trading']['analysis']['buy_count'],
+        'Insider Sell Count': result['insider_trading']['analysis']['sell_count'],
+        'Net Shares': result['insider_trading']['analysis']['net_shares'],
+        'Net Value ($)': result['insider_trading']['analysis']['net_value'],
+        'Insider Sentiment': result['insider_trading']['analysis']['sentiment'],
+        'Recent SEC Filings': result['sec_filings']['analysis']['recent_filing_count'],
+        'Key Institutional Filings': len(result['sec_filings']['analysis']['key_filings'])
+    }
+
+
+class InsiderResultSink:
+    """
+    Buffers InsiderTradingAnalyzer results and writes them in bulk.
+
+    Each flush writes one Parquet file to each of two date-partitioned tables:
+
+        <root>/summary/analysis_date=YYYY-MM-DD/<run>.parquet   one row per ticker
+        <root>/raw/analysis_date=YYYY-MM-DD/<run>.parquet       one row per raw record
+
+    Both files are staged first and then moved into place, raw records
+    before the summary, so a run becomes visible to readers of the summary
+    table only once all of its data is on disk. Readers load a whole table
+    with a single pd.read_parquet(<root>/summary).
+    """
+
+    def __init__(self, root: str, export_json: bool = False, json_dir: Optional[str] = None):
+        self.root = root
+        self.export_json = export_json
+        self.json_dir = json_dir or root
+        self.buffer = {}
+        os.makedirs(self.root, exist_ok=True)
+
+    def add(self, ticker: str, result: Dict):
+        """Buffer a result until the next flush"""
+        self.buffer[ticker] = result
+
+    def __len__(self):
+        return len(self.buffer)
+
+    def _raw_frame(self) -> pd.DataFrame:
+        rows = []
+        for ticker, result in self.buffer.items():
+            for source, key in (('insider', 'insider_trading'), ('filings', 'sec_filings')):
+                for record in result[key]['data'] or []:
+                    rows.append({
+                        'Ticker': ticker,
+                        'Analysis Date': result['analysis_date'],
+                        'Source': source,
+                        'Record': json.dumps(record, separators=(',', ':'), default=str),
+                    })
+        return pd.DataFrame(rows, columns=['Ticker', 'Analysis Date', 'Source', 'Record'])
+
+    def _write_partitioned(self, df: pd.DataFrame, table: str, run_id: str, staging: str):
+        """Stage one file per analysis date, returns the (staged, final) paths"""
+        moves = []
+        for date, part in df.groupby('Analysis Date', sort=True):
+            staged = os.path.join(staging, f"{table}-{date}.parquet")
+            part.drop(columns='Analysis Date').to_parquet(staged, index=False)
+            final_dir = os.path.join(self.root, table, f"analysis_date={date}")
+            moves.append((staged, final_dir, os.path.join(final_dir, f"{run_id}.parquet")))
+        return moves
+
+    def flush(self) -> pd.DataFrame:
+        """Write all buffered results, returns this run's summary table"""
+        if not self.buffer:
+            return pd.DataFrame()
+
+        summary_df = pd.DataFrame([summary_row(ticker, result) for ticker, result in self.buffer.items()])
+        raw_df = self._raw_frame()
+
+        run_id = f"{datetime.datetime.now().strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        staging = os.path.join(self.root, '_staging', run_id)
+        os.makedirs(staging, exist_ok=True)
+        try:
+            moves = self._write_partitioned(raw_df, 'raw', run_id, staging)
+            moves += self._write_partitioned(summary_df, 'summary', run_id, staging)
+            for staged, final_dir, final_path in moves:
+                os.makedirs(final_dir, exist_ok=True)
+                os.replace(staged, final_path)
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+            if not os.listdir(os.path.dirname(staging)):
+                os.rmdir(os.path.dirname(staging))
+
+        if self.export_json:
+            for ticker, result in self.buffer.items():
+                with open(os.path.join(self.json_dir, f"{ticker}_insider_analysis.json"), 'w') as f:
+                    json.dump(result, f, indent=2)
+
+        self.buffer = {}
+        return summary_df
+
+
+def load_summary(root: str, analysis_date: Optional[str] = None) -> pd.DataFrame:
+    """Read the summary table of all runs (or of one analysis date) in one read"""
+    path = os.path.join(root, 'summary')
+    if analysis_date:
+        df = pd.read_parquet(os.path.join(path, f"analysis_date={analysis_date}"))
+        df['analysis_date'] = analysis_date
+        return df
+    return pd.read_parquet(path)
+
+
+def load_raw_records(root: str, analysis_date: Optional[str] = None) -> pd.DataFrame:
+    """Read the raw record table of all runs (or of one analysis date) in one read"""
+    path = os.path.join(root, 'raw')
+    if analysis_date:
+        df = pd.read_parquet(os.path.join(path, f"analysis_date={analysis_date}"))
+        df['analysis_date'] = analysis_date
+        return df
+    return pd.read_parquet(path)
@@ -0,0 +1,252 @@
+import json
+import sqlite3
+import hashlib
+import datetime
+from typing import Dict, List, Optional, Tuple
+
+# Filings that indicate institutional interest
+KEY_FORM_TYPES = ['13F', '13G', '13D', '13F-HR']
+
+
+def transaction_side(transaction_type: str) -> int:
+    """Classify an insider transaction: 1 = buy, -1 = sell, 0 = other"""
+    transaction_type = (transaction_type or '').upper()
+    if 'BUY' in transaction_type or 'PURCHASE' in transaction_type:
+        return 1
+    elif 'SELL' in transaction_type or 'DISPOSITION' in transaction_type:
+        return -1
+    return 0
+
+
+def insider_sentiment_label(buy_count: int, sell_count: int, net_value: float) -> str:
+    """Overall insider sentiment from the aggregated transactions"""
+    if net_value > 0 and buy_count > sell_count:
+        return 'Bullish'
+    elif net_value < 0 and sell_count > buy_count:
+        return 'Bearish'
+    return 'Neutral'
+
+
+def record_key(record: Dict) -> str:
+    """Content hash used to recognise records that were already ingested"""
+    return hashlib.sha1(json.dumps(record, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+def insider_record_date(record: Dict) -> str:
+    return str(record.get('Date') or record.get('fileDate') or '')
+
+
+class InsiderDeltaStore:
+    """
+    Persistent SQLite store for insider trades and SEC filings.
+
+    ingest() inserts every fetched record whose content hash is not stored
+    yet and folds only the newly inserted rows into running aggregates, so
+    the aggregates grow with the new activity rather than being recomputed
+    over the whole history. Records are not filtered by date: Form 4
+    filings can arrive days after the transaction they report, and a late
+    filing dated before the newest stored one is still new. For every
+    ticker the store also records the latest transaction/filing date seen
+    (watermark()), for reporting only.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS insider_trades (
+        ticker TEXT NOT NULL,
+        record_key TEXT NOT NULL,
+        date TEXT NOT NULL,
+        transaction_type TEXT,
+        shares NUMERIC,
+        value NUMERIC,
+        raw TEXT,
+        PRIMARY KEY (ticker, record_key)
+    );
+    CREATE TABLE IF NOT EXISTS sec_filings (
+        ticker TEXT NOT NULL,
+        record_key TEXT NOT NULL,
+        date TEXT NOT NULL,
+        form_type TEXT,
+        filer TEXT,
+        description TEXT,
+        raw TEXT,
+        PRIMARY KEY (ticker, record_key)
+    );
+    CREATE INDEX IF NOT EXISTS idx_sec_filings_date ON sec_filings (ticker, date);
+    CREATE INDEX IF NOT EXISTS idx_sec_filings_form ON sec_filings (ticker, form_type);
+    CREATE TABLE IF NOT EXISTS insider_aggregates (
+        ticker TEXT PRIMARY KEY,
+        buy_count INTEGER NOT NULL DEFAULT 0,
+        sell_count INTEGER NOT NULL DEFAULT 0,
+        net_shares NUMERIC NOT NULL DEFAULT 0,
+        net_value NUMERIC NOT NULL DEFAULT 0
+    );
+    CREATE TABLE IF NOT EXISTS form_counts (
+        ticker TEXT NOT NULL,
+        form_type TEXT NOT NULL,
+        count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (ticker, form_type)
+    );
+    CREATE TABLE IF NOT EXISTS watermarks (
+        ticker TEXT NOT NULL,
+        source TEXT NOT NULL,
+        last_date TEXT NOT NULL,
+        PRIMARY KEY (ticker, source)
+    );
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.executescript(self.SCHEMA)
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def watermark(self, ticker: str, source: str) -> Optional[str]:
+        """Latest record date seen for a ticker ('insider' or 'filings')"""
+        row = self.conn.execute(
+            "SELECT last_date FROM watermarks WHERE ticker = ? AND source = ?", (ticker, source)
+        ).fetchone()
+        return row[0] if row else None
+
+    def _new_records(self, records: List[Dict], date_fn) -> List[Tuple[str, str, Dict]]:
+        """Records as (key, date, record), in input order; already stored ones are skipped on insert by key"""
+        return [(record_key(record), date_fn(record), record) for record in records or []]
+
+    def _advance_watermark(self, ticker: str, source: str, dates: List[str]):
+        if not dates:
+            return
+        self.conn.execute(
+            """INSERT INTO watermarks (ticker, source, last_date) VALUES (?, ?, ?)
+               ON CONFLICT (ticker, source) DO UPDATE SET last_date = MAX(last_date, excluded.last_date)""",
+            (ticker, source, max(dates))
+        )
+
+    def ingest(self, ticker: str, insider_data: List[Dict], filings_data: List[Dict]) -> Tuple[List[Dict], List[Dict]]:
+        """
+        Ingest freshly fetched records for a ticker in a single transaction.
+
+        Returns the (insider, filings) records that were not in the store yet.
+        """
+        with self.conn:
+            new_trades = self._ingest_insider(ticker, insider_data)
+            new_filings = self._ingest_filings(ticker, filings_data)
+        return new_trades, new_filings
+
+    def _ingest_insider(self, ticker: str, insider_data: List[Dict]) -> List[Dict]:
+        inserted = []
+        buy_count = sell_count = 0
+        net_shares = net_value = 0
+
+        for key, date, trade in self._new_records(insider_data, insider_record_date):
+            transaction_type = trade.get('TransactionType', '')
+            shares = trade.get('Shares', 0)
+            value = trade.get('Value', 0)
+            cursor = self.conn.execute(
+                """INSERT OR IGNORE INTO insider_trades
+                   (ticker, record_key, date, transaction_type, shares, value, raw)
+                   VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                (ticker, key, date, transaction_type, shares, value, json.dumps(trade, separators=(',', ':'), default=str))
+            )
+            if cursor.rowcount == 0:
+                continue
+            inserted.append(trade)
+
+            side = transaction_side(transaction_type)
+            if side > 0:
+                buy_count += 1
+                net_shares += shares
+                net_value += value
+            elif side < 0:
+                sell_count += 1
+                net_shares -= shares
+                net_value -= value
+
+        if inserted:
+            self.conn.execute(
+                """INSERT INTO insider_aggregates (ticker, buy_count, sell_count, net_shares, net_value)
+                   VALUES (?, ?, ?, ?, ?)
+                   ON CONFLICT (ticker) DO UPDATE SET
+                       buy_count = buy_count + excluded.buy_count,
+                       sell_count = sell_count + excluded.sell_count,
+                       net_shares = net_shares + excluded.net_shares,
+                       net_value = net_value + excluded.net_value""",
+                (ticker, buy_count, sell_count, net_shares, net_value)
+            )
+            self._advance_watermark(ticker, 'insider', [insider_record_date(t) for t in inserted])
+
+        return inserted
+
+    def _ingest_filings(self, ticker: str, filings_data: List[Dict]) -> List[Dict]:
+        inserted = []
+        form_counts = {}
+
+        for key, date, filing in self._new_records(filings_data, lambda f: str(f.get('Date', ''))):
+            form_type = filing.get('FormType', '')
+            cursor = self.conn.execute(
+                """INSERT OR IGNORE INTO sec_filings
+                   (ticker, record_key, date, form_type, filer, description, raw)
+                   VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                (ticker, key, date, form_type, filing.get('Filer', ''), filing.get('Description', ''),
+                 json.dumps(filing, separators=(',', ':'), default=str))
+            )
+            if cursor.rowcount == 0:
+                continue
+            inserted.append(filing)
+            form_counts[form_type] = form_counts.get(form_type, 0) + 1
+
+        if inserted:
+            self.conn.executemany(
+                """INSERT INTO form_counts (ticker, form_type, count) VALUES (?, ?, ?)
+                   ON CONFLICT (ticker, form_type) DO UPDATE SET count = count + excluded.count""",
+                [(ticker, form_type, count) for form_type, count in form_counts.items()]
+            )
+            self._advance_watermark(ticker, 'filings', [str(f.get('Date', '')) for f in inserted])
+
+        return inserted
+
+    def insider_sentiment(self, ticker: str) -> Dict:
+        """Running insider aggregates, same shape as InsiderTradingAnalyzer.analyze_insider_sentiment"""
+        row = self.conn.execute(
+            "SELECT buy_count, sell_count, net_shares, net_value FROM insider_aggregates WHERE ticker = ?",
+            (ticker,)
+        ).fetchone()
+        buy_count, sell_count, net_shares, net_value = row if row else (0, 0, 0, 0)
+        return {
+            'buy_count': buy_count,
+            'sell_count': sell_count,
+            'net_shares': net_shares,
+            'net_value': net_value,
+            'sentiment': insider_sentiment_label(buy_count, sell_count, net_value)
+        }
+
+    def sec_analysis(self, ticker: str, now: Optional[datetime.datetime] = None) -> Dict:
+        """Running filing aggregates, same shape as InsiderTradingAnalyzer.analyze_sec_filings"""
+        now = now or datetime.datetime.now()
+        ninety_days_ago = (now - datetime.timedelta(days=90)).strftime('%Y-%m-%d')
+
+        form_counts = dict(self.conn.execute(
+            "SELECT form_type, count FROM form_counts WHERE ticker = ? ORDER BY form_type", (ticker,)
+        ).fetchall())
+
+        # The 90-day window slides, so it is counted from the date index instead of being accumulated
+        recent_filing_count = self.conn.execute(
+            "SELECT COUNT(*) FROM sec_filings WHERE ticker = ? AND date >= ?", (ticker, ninety_days_ago)
+        ).fetchone()[0]
+
+        placeholders = ', '.join('?' * len(KEY_FORM_TYPES))
+        key_filings = [
+            {'form_type': form_type, 'date': date, 'filer': filer, 'description': description}
+            for form_type, date, filer, description in self.conn.execute(
+                f"""SELECT form_type, date, filer, description FROM sec_filings
+                    WHERE ticker = ? AND form_type IN ({placeholders}) ORDER BY date, rowid""",
+                (ticker, *KEY_FORM_TYPES)
+            )
+        ]
+
+        return {
+            'form_counts': form_counts,
+            'recent_filing_count': recent_filing_count,
+            'key_filings': key_filings
+        }
@@ -0,0 +1,169 @@
+import datetime
+import numpy as np
+import pandas as pd
+from typing import Dict, Iterable, List, Optional
+from insider_store import KEY_FORM_TYPES, transaction_side
+
+CONFIDENCE_CATEGORIES = ['Very Bearish', 'Bearish', 'Neutral', 'Bullish', 'Very Bullish']
+
+
+def _categorical(values: List) -> pd.Categorical:
+    return pd.Categorical(pd.Series(values, dtype='object').fillna(''))
+
+
+def build_insider_frame(insider_by_ticker: Dict[str, List[Dict]]) -> pd.DataFrame:
+    """
+    Flatten the insider records of all tickers into one typed table.
+
+    Columns: ticker (category), transaction_type (category), side (int8,
+    1 = buy, -1 = sell, 0 = other), shares, value, date (datetime64).
+    """
+    tickers, types, shares, values, dates = [], [], [], [], []
+    for ticker, records in insider_by_ticker.items():
+        for trade in records or []:
+            tickers.append(ticker)
+            types.append(trade.get('TransactionType', ''))
+            shares.append(trade.get('Shares', 0))
+            values.append(trade.get('Value', 0))
+            dates.append(trade.get('Date') or trade.get('fileDate'))
+
+    transaction_type = _categorical(types)
+    # Classify each distinct transaction type once and broadcast through the category codes
+    category_side = np.array([transaction_side(t) for t in transaction_type.categories] + [0], dtype=np.int8)
+
+    return pd.DataFrame({
+        'ticker': pd.Categorical(tickers, categories=list(insider_by_ticker)),
+        'transaction_type': transaction_type,
+        'side': category_side[transaction_type.codes],
+        'shares': pd.to_numeric(pd.Series(shares, dtype='object').fillna(0)),
+        'value': pd.to_numeric(pd.Series(values, dtype='object').fillna(0)),
+        'date': pd.to_datetime(pd.Series(dates, dtype='object'), errors='coerce', format='mixed'),
+    })
+
+
+def build_filings_frame(filings_by_ticker: Dict[str, List[Dict]]) -> pd.DataFrame:
+    """
+    Flatten the SEC filings of all tickers into one typed table.
+
+    Columns: ticker (category), form_type (category), date (datetime64),
+    filer, description.
+    """
+    tickers, forms, dates, filers, descriptions = [], [], [], [], []
+    for ticker, records in filings_by_ticker.items():
+        for filing in records or []:
+            tickers.append(ticker)
+            forms.append(filing.get('FormType', ''))
+            dates.append(filing.get('Date', ''))
+            filers.append(filing.get('Filer', ''))
+            descriptions.append(filing.get('Description', ''))
+
+    return pd.DataFrame({
+        'ticker': pd.Categorical(tickers, categories=list(filings_by_ticker)),
+        'form_type': _categorical(forms),
+        'date': pd.to_datetime(pd.Series(dates, dtype='object'), errors='coerce', format='mixed'),
+        'filer': filers,
+        'description': descriptions,
+    })
+
+
+def confidence_category(scores) -> np.ndarray:
+    """Vectorized InsiderTradingAnalyzer.get_confidence_category"""
+    scores = np.asarray(scores, dtype=float)
+    return np.select(
+        [scores >= 75, scores >= 25, scores > -25, scores > -75],
+        CONFIDENCE_CATEGORIES[:0:-1],
+        default=CONFIDENCE_CATEGORIES[0]
+    )
+
+
+def institutional_confidence(buy_count, sell_count, net_value, key_filing_count) -> np.ndarray:
+    """Vectorized InsiderTradingAnalyzer.calculate_institutional_confidence"""
+    buy_count = np.asarray(buy_count, dtype=float)
+    sell_count = np.asarray(sell_count, dtype=float)
+    net_value = np.asarray(net_value, dtype=float)
+    key_filing_count = np.asarray(key_filing_count)
+
+    # Base score from insider sentiment
+    bullish = (net_value > 0) & (buy_count > sell_count)
+    bearish = (net_value < 0) & (sell_count > buy_count)
+    base_score = np.select([bullish, bearish], [50.0, -50.0], default=0.0)
+
+    # Adjust based on insider trading metrics
+    with np.errstate(divide='ignore', invalid='ignore'):
+        buy_sell_ratio = np.where(sell_count > 0, buy_count / np.where(sell_count > 0, sell_count, 1),
+                                  np.where(buy_count > 0, 2.0, 0.0))
+    base_score = base_score + np.where(buy_sell_ratio > 1, np.minimum(25, (buy_sell_ratio - 1) * 10), 0.0)
+    base_score = base_score - np.where((buy_sell_ratio > 0) & (buy_sell_ratio <= 1),
+                                       np.minimum(25, (1 - buy_sell_ratio) * 10), 0.0)
+
+    # Adjust based on SEC filings
+    base_score = base_score + np.select(
+        [key_filing_count > 5, key_filing_count > 2, key_filing_count > 0], [15, 10, 5], default=0
+    )
+
+    # Clip the final score to -100 to 100 range
+    return np.clip(base_score, -100, 100)
+
+
+def analyze_universe(insider_df: pd.DataFrame,
+                     filings_df: pd.DataFrame,
+                     tickers: Optional[Iterable[str]] = None,
+                     now: Optional[datetime.datetime] = None) -> pd.DataFrame:
+    """
+    Compute insider sentiment, SEC filing metrics and the institutional
+    confidence score for every ticker at once.
+
+    Produces the same numbers as running analyze_insider_sentiment,
+    analyze_sec_filings and calculate_institutional_confidence ticker by
+    ticker. Returns one row per ticker (index) with the columns buy_count,
+    sell_count, net_shares, net_value, sentiment, recent_filing_count,
+    key_filing_count, institutional_confidence_score and confidence_category.
+    """
+    if tickers is None:
+        tickers = list(dict.fromkeys(
+            list(insider_df['ticker'].cat.categories) + list(filings_df['ticker'].cat.categories)
+        ))
+    index = pd.Index(list(tickers), name='ticker')
+
+    # Insider transactions: signed sums over buys/sells only
+    side = insider_df['side'].to_numpy()
+    signed = pd.DataFrame({
+        'ticker': insider_df['ticker'],
+        'buy_count': side > 0,
+        'sell_count': side < 0,
+        'net_shares': insider_df['shares'] * side,
+        'net_value': insider_df['value'] * side,
+    })
+    insider = signed.groupby('ticker', observed=True).sum().reindex(index, fill_value=0)
+    insider['buy_count'] = insider['buy_count'].astype(int)
+    insider['sell_count'] = insider['sell_count'].astype(int)
+
+    # SEC filings: recent (last 90 days) and key institutional filings
+    now = now or datetime.datetime.now()
+    ninety_days_ago = pd.Timestamp((now - datetime.timedelta(days=90)).strftime('%Y-%m-%d'))
+    filings = pd.DataFrame({
+        'ticker': filings_df['ticker'],
+        'recent_filing_count': (filings_df['date'] >= ninety_days_ago).to_numpy(),
+        'key_filing_count': filings_df['form_type'].isin(KEY_FORM_TYPES).to_numpy(),
+    }).groupby('ticker', observed=True).sum().reindex(index, fill_value=0).astype(int)
+
+    result = insider.join(filings)
+    result['sentiment'] = np.select(
+        [(result['net_value'] > 0) & (result['buy_count'] > result['sell_count']),
+         (result['net_value'] < 0) & (result['sell_count'] > result['buy_count'])],
+        ['Bullish', 'Bearish'],
+        default='Neutral'
+    )
+    result['institutional_confidence_score'] = institutional_confidence(
+        result['buy_count'], result['sell_count'], result['net_value'], result['key_filing_count']
+    )
+    result['confidence_category'] = confidence_category(result['institutional_confidence_score'])
+
+    return result[['buy_count', 'sell_count', 'net_shares', 'net_value', 'sentiment',
+                   'recent_filing_count', 'key_filing_count',
+                   'institutional_confidence_score', 'confidence_category']]
+
+
+def form_counts(filings_df: pd.DataFrame) -> pd.DataFrame:
+    """Count of each form type per ticker (tickers x form types)"""
+    return pd.crosstab(filings_df['ticker'], filings_df['form_type'])
@@ -7,20 +7,22 @@ from news_sentiment import SentimentAnalyzer
 
 
 class DataFusion:
-    def __init__(self):
-        self.fundamental_analyzer = FundamentalAnalyzer()
+    def __init__(self, fundamentals_cache_dir: str = None):
+        self.fundamental_analyzer = FundamentalAnalyzer(cache_dir=fundamentals_cache_dir)
         self.expert_system = ExpertSystem()
         self.sentiment_analyzer = SentimentAnalyzer()
 
     def integrate_data(self,
                        ticker: str,
                        price_data: pd.DataFrame,
-                       news_data: List[Dict]) -> Dict:
+                       news_data: List[Dict],
+                       fundamental_data: Dict = None) -> Dict:
         """
         Integrate different data sources for comprehensive analysis.
         """
         # Get fundamental analysis
-        fundamental_data = self.fundamental_analyzer.analyze_company(ticker)
+        if fundamental_data is None:
+            fundamental_data = self.fundamental_analyzer.analyze_company(ticker)
 
         # Get technical signals
         technical_signals = self.expert_system.analyze_technical_signals(price_data)
@@ -43,6 +45,21 @@ class DataFusion:
             'sentiment_data': sentiment_data
         }
 
+    def integrate_universe(self,
+                           price_data: Dict[str, pd.DataFrame],
+                           news_data: Dict[str, List[Dict]]) -> Dict[str, Dict]:
+        """
+        Integrate data for many tickers; fundamentals are analyzed in one
+        cached batch (macro data fetched once, ratios/earnings only when stale).
+        """
+        tickers = list(price_data)
+        fundamentals = self.fundamental_analyzer.analyze_universe(tickers)
+
+        return {
+            ticker: self.integrate_data(ticker, price_data[ticker], news_data.get(ticker, []), fundamentals[ticker])
+            for ticker in tickers
+        }
+
     def optimize_portfolio(self,
                            tickers: List[str],
                            initial_weights: List[float],
@@ -2,10 +2,11 @@ import os
 import time
 import requests
 import pandas as pd
-from datetime import datetime
+from datetime import datetime, timezone
 from nltk.sentiment import SentimentIntensityAnalyzer
 import nltk
 from dotenv import load_dotenv
+from raw_archive import RawItemArchive
 
 # Load environment variables
 load_dotenv()
@@ -38,27 +39,55 @@ def get_news(ticker):
     return []
 
 
-def analyze_sentiment(news_items):
+def news_text(item):
+    """Text of a news item that is scored."""
+    title = item.get('title', '')
+    summary = item.get('summary', '')
+    return f"{title} {summary}"
+
+
+def score_news(news_items):
+    """Compound VADER score of each news item."""
+    return [sia.polarity_scores(news_text(item))['compound'] for item in news_items]
+
+
+def analyze_sentiment(news_items, scores=None):
     """Analyze sentiment of news items."""
     if not news_items:
         return 0
 
-    sentiments = []
-    for item in news_items:
-        title = item.get('title', '')
-        summary = item.get('summary', '')
-        text = f"{title} {summary}"
-        sentiment = sia.polarity_scores(text)
-        sentiments.append(sentiment['compound'])
+    sentiments = scores if scores is not None else score_news(news_items)
 
     return sum(sentiments) / len(sentiments) if sentiments else 0
 
 
+def to_archive_items(ticker, news_items, scores):
+    """Convert raw news items into archive rows."""
+    items = []
+    for item, score in zip(news_items, scores):
+        tickers = {ts.get('ticker') for ts in item.get('ticker_sentiment', []) if ts.get('ticker')}
+        tickers.add(ticker)
+        published = item.get('time_published')
+        timestamp = pd.to_datetime(published, format='%Y%m%dT%H%M%S') if published else datetime.now(timezone.utc)
+        items.append({
+            'id': item.get('url') or f"{ticker}:{published}:{item.get('title', '')}",
+            'query_ticker': ticker,
+            'tickers': tickers,
+            'timestamp': timestamp,
+            'text': news_text(item),
+            'score': score,
+        })
+    return items
+
+
 def main():
     # Create output directory if it doesn't exist
     output_dir = "../data/sentiment"
     os.makedirs(output_dir, exist_ok=True)
 
+    # Raw items are archived so that history can be rescored without refetching
+    archive = RawItemArchive("../data/raw_items", "news")
+
     # Load tickers
     tickers = load_tickers("../data/top_50_tickers.txt")
 
@@ -74,7 +103,11 @@ def main():
             news = get_news(ticker)
 
             # Analyze sentiment
-            sentiment_score = analyze_sentiment(news)
+            scores = score_news(news)
+            sentiment_score = analyze_sentiment(news, scores)
+
+            # Archive raw items
+            archive.append(to_archive_items(ticker, news, scores))
 
             # Add to results
             results.append({
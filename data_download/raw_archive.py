@@ -0,0 +1,235 @@
+import os
+import uuid
+import hashlib
+import pandas as pd
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, List, Optional
+
+
+# Column layout of every archive part file
+ARCHIVE_COLUMNS = [
+    'id',            # stable item id (tweet id, article URL hash, ...)
+    'query_ticker',  # ticker whose fetch returned the item
+    'tickers',       # list of tickers the item mentions
+    'timestamp',     # publication time (UTC)
+    'archived_at',   # time the row was appended (UTC), orders versions of an edited item
+    'text_hash',     # sha1 of the scored text, part of the dedup key
+    'text',          # raw text so items can be rescored offline
+    'score',         # sentiment score at ingestion time
+    'like_count',
+    'retweet_count',
+    'reply_count',
+    'quote_count',
+]
+
+ENGAGEMENT_COLUMNS = ['like_count', 'retweet_count', 'reply_count', 'quote_count']
+
+
+def text_hash(text: str) -> str:
+    """Hash of the text an item was scored on."""
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def _to_utc(value) -> pd.Timestamp:
+    """Timestamps without a timezone are taken to be UTC."""
+    ts = pd.Timestamp(value)
+    return ts.tz_localize('UTC') if ts.tzinfo is None else ts.tz_convert('UTC')
+
+
+class RawItemArchive:
+    """
+    Append-only archive of raw news/social items.
+
+    Items are stored as Parquet files partitioned by publication date:
+
+        <root>/<source>/date=YYYY-MM-DD/part-<run>.parquet
+
+    Existing part files are never rewritten. An append-only index of
+    (id, query ticker, text hash) keys (<root>/<source>/_ids.tsv) is kept
+    next to the partitions so that new batches can be deduplicated without
+    reading any of the data files. An item returned for several tickers is
+    archived once per ticker, as the per-ticker aggregates count it for
+    each, and an item whose text was edited is archived again as a new
+    version (aggregate_daily uses the latest).
+    """
+
+    def __init__(self, root: str, source: str):
+        self.root = os.path.join(root, source)
+        self.source = source
+        os.makedirs(self.root, exist_ok=True)
+        self.index_path = os.path.join(self.root, '_ids.tsv')
+        self._keys = self._load_index()
+        self._ids = {key[0] for key in self._keys}
+
+    def _load_index(self) -> set:
+        # One line per archived row: the key fields followed by the partition date
+        if not os.path.exists(self.index_path):
+            return set()
+        with open(self.index_path, 'r') as f:
+            return {tuple(line.rstrip('\n').split('\t')[:-1]) for line in f if line.strip()}
+
+    @staticmethod
+    def _key(row: Dict) -> tuple:
+        return row['id'], row['query_ticker'], row['text_hash']
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, item_id):
+        return str(item_id) in self._ids
+
+    def append(self, items: Iterable[Dict]) -> int:
+        """
+        Append raw items to the archive.
+
+        Each item is a dict with at least 'id', 'query_ticker', 'tickers',
+        'timestamp' and 'text'. Items whose key is already in the index (or
+        repeated within the batch) are skipped. Returns the number of items
+        written.
+        """
+        rows = []
+        seen = set()
+        archived_at = pd.Timestamp(datetime.now(timezone.utc))
+        for item in items:
+            text = item.get('text', '') or ''
+            row = {
+                'id': str(item['id']),
+                'query_ticker': str(item['query_ticker']),
+                'tickers': sorted(set(item.get('tickers', []))),
+                'timestamp': _to_utc(item['timestamp']),
+                'archived_at': archived_at,
+                'text_hash': text_hash(text),
+                'text': text,
+                'score': float(item.get('score', 0.0)),
+                **{col: int(item.get(col, 0) or 0) for col in ENGAGEMENT_COLUMNS},
+            }
+            key = self._key(row)
+            if key in self._keys or key in seen:
+                continue
+            seen.add(key)
+            rows.append(row)
+
+        if not rows:
+            return 0
+
+        df = pd.DataFrame(rows, columns=ARCHIVE_COLUMNS)
+        df['timestamp'] = pd.to_datetime(df['timestamp'], utc=True)
+        dates = df['timestamp'].dt.strftime('%Y-%m-%d')
+
+        # One new part file per date partition touched by this batch
+        run_id = f"{archived_at.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        for date, part in df.groupby(dates, sort=True):
+            part_dir = os.path.join(self.root, f"date={date}")
+            os.makedirs(part_dir, exist_ok=True)
+            part_path = os.path.join(part_dir, f"part-{run_id}.parquet")
+            tmp_path = part_path + '.tmp'
+            part.to_parquet(tmp_path, index=False)
+            os.replace(tmp_path, part_path)
+
+        # Only extend the index once the data files are in place
+        keys = [self._key(row) for row in rows]
+        with open(self.index_path, 'a') as f:
+            for key, date in zip(keys, dates):
+                f.write('\t'.join(key) + f"\t{date}\n")
+        self._keys.update(keys)
+        self._ids.update(df['id'])
+
+        return len(df)
+
+    def partitions(self, start_date: Optional[str] = None, end_date: Optional[str] = None) -> List[str]:
+        """List partition dates (YYYY-MM-DD) in the archive, optionally within [start_date, end_date]."""
+        dates = sorted(
+            name.split('=', 1)[1]
+            for name in os.listdir(self.root)
+            if name.startswith('date=')
+        )
+        if start_date:
+            dates = [d for d in dates if d >= start_date]
+        if end_date:
+            dates = [d for d in dates if d <= end_date]
+        return dates
+
+    def scan(self,
+             start_date: Optional[str] = None,
+             end_date: Optional[str] = None,
+             columns: Optional[List[str]] = None,
+             ticker: Optional[str] = None) -> pd.DataFrame:
+        """
+        Read archived items from local disk.
+
+        Only the partitions within [start_date, end_date] are opened and only
+        the requested columns are read.
+        """
+        read_columns = list(columns) if columns else list(ARCHIVE_COLUMNS)
+        if ticker and 'tickers' not in read_columns:
+            read_columns.append('tickers')
+
+        frames = []
+        for date in self.partitions(start_date, end_date):
+            part_dir = os.path.join(self.root, f"date={date}")
+            for name in sorted(os.listdir(part_dir)):
+                if name.endswith('.parquet'):
+                    frames.append(pd.read_parquet(os.path.join(part_dir, name), columns=read_columns))
+
+        if not frames:
+            return pd.DataFrame(columns=read_columns)
+
+        df = pd.concat(frames, ignore_index=True)
+        if ticker:
+            df = df[df['tickers'].apply(lambda t: ticker in t)]
+            if columns and 'tickers' not in columns:
+                df = df.drop(columns='tickers')
+        return df.reset_index(drop=True)
+
+    def rescore(self,
+                score_fn: Callable[[str], float],
+                start_date: Optional[str] = None,
+                end_date: Optional[str] = None) -> pd.DataFrame:
+        """Recompute the score of archived items with a new scoring function."""
+        df = self.scan(start_date, end_date)
+        df['score'] = df['text'].map(score_fn).astype(float)
+        return df
+
+
+def aggregate_daily(items: pd.DataFrame, weight: Optional[str] = None) -> pd.DataFrame:
+    """
+    Re-aggregate archived items into one row per queried ticker per day.
+
+    Every item counts for the ticker whose fetch returned it, not for the
+    other tickers it mentions, like the per-ticker scores of the fetching
+    scripts; of an edited item only the latest version counts.
+
+    Without a weight this is the plain mean used by news_sentiment.py. With
+    weight='engagement' scores are weighted by likes + retweets and fall back
+    to the plain mean when a day has no engagement, as in
+    social_media_sentiment.py.
+    """
+    columns = ['date', 'ticker', 'sentiment_score', 'engagement', 'item_count']
+    if items.empty:
+        return pd.DataFrame(columns=columns)
+
+    if 'archived_at' in items:
+        items = items.sort_values('archived_at', kind='stable')
+    df = items.drop_duplicates(['query_ticker', 'id'], keep='last').rename(columns={'query_ticker': 'ticker'})
+    df['date'] = pd.to_datetime(df['timestamp'], utc=True).dt.strftime('%Y-%m-%d')
+    df['engagement'] = df['like_count'] + df['retweet_count']
+    df['weighted'] = df['score'] * df['engagement']
+
+    grouped = df.groupby(['date', 'ticker'], sort=True)
+    daily = grouped.agg(
+        mean_score=('score', 'mean'),
+        weighted_sum=('weighted', 'sum'),
+        engagement=('engagement', 'sum'),
+        item_count=('id', 'count'),
+    ).reset_index()
+
+    if weight == 'engagement':
+        has_engagement = daily['engagement'] > 0
+        daily['sentiment_score'] = daily['mean_score']
+        daily.loc[has_engagement, 'sentiment_score'] = (
+            daily.loc[has_engagement, 'weighted_sum'] / daily.loc[has_engagement, 'engagement']
+        )
+    else:
+        daily['sentiment_score'] = daily['mean_score']
+
+    return daily[columns]
@@ -1,11 +1,13 @@
 import os
+import re
 import time
 import pandas as pd
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import tweepy
 import nltk
 from nltk.sentiment import SentimentIntensityAnalyzer
 from dotenv import load_dotenv
+from raw_archive import RawItemArchive
 
 # Load environment variables
 load_dotenv()
@@ -54,23 +56,29 @@ def get_social_posts(ticker):
         return []
 
 
-def analyze_sentiment(tweets):
+def score_tweets(tweets):
+    """Compound VADER score of each tweet."""
+    return [sia.polarity_scores(tweet.text)['compound'] for tweet in tweets]
+
+
+def analyze_sentiment(tweets, scores=None):
     """Analyze sentiment of tweets."""
     if not tweets:
         return 0, 0
 
+    if scores is None:
+        scores = score_tweets(tweets)
+
     sentiments = []
     total_engagement = 0
 
-    for tweet in tweets:
+    for tweet, score in zip(tweets, scores):
         # Calculate engagement (likes + retweets)
         engagement = tweet.public_metrics['like_count'] + tweet.public_metrics['retweet_count']
         total_engagement += engagement
 
-        # Calculate sentiment
-        sentiment = sia.polarity_scores(tweet.text)
         # Weight the sentiment by engagement
-        sentiments.append((sentiment['compound'], engagement))
+        sentiments.append((score, engagement))
 
     if not sentiments:
         return 0, 0
@@ -85,11 +93,34 @@ def analyze_sentiment(tweets):
     return weighted_sentiment, total_engagement
 
 
+def to_archive_items(ticker, tweets, scores):
+    """Convert raw tweets into archive rows."""
+    items = []
+    for tweet, score in zip(tweets, scores):
+        metrics = tweet.public_metrics or {}
+        items.append({
+            'id': tweet.id,
+            'query_ticker': ticker,
+            'tickers': {ticker} | set(re.findall(r'\$([A-Z][A-Z.]{0,5})\b', tweet.text)),
+            'timestamp': tweet.created_at or datetime.now(timezone.utc),
+            'text': tweet.text,
+            'score': score,
+            'like_count': metrics.get('like_count', 0),
+            'retweet_count': metrics.get('retweet_count', 0),
+            'reply_count': metrics.get('reply_count', 0),
+            'quote_count': metrics.get('quote_count', 0),
+        })
+    return items
+
+
 def main():
     # Create output directory if it doesn't exist
     output_dir = "../data/sentiment"
     os.makedirs(output_dir, exist_ok=True)
 
+    # Raw items are archived so that history can be rescored without refetching
+    archive = RawItemArchive("../data/raw_items", "social")
+
     # Load tickers
     tickers = load_tickers("../data/top_50_tickers.txt")
 
@@ -105,7 +136,11 @@ def main():
             tweets = get_social_posts(ticker)
 
             # Analyze sentiment
-            sentiment_score, engagement = analyze_sentiment(tweets)
+            scores = score_tweets(tweets)
+            sentiment_score, engagement = analyze_sentiment(tweets, scores)
+
+            # Archive raw items
+            archive.append(to_archive_items(ticker, tweets, scores))
 
             # Add to results
             results.append({
@@ -0,0 +1,72 @@
+import os
+import sys
+
+import pytest
+
+pytest.importorskip('pyarrow')
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data_download'))
+from raw_archive import RawItemArchive, aggregate_daily  # noqa: E402
+
+# Scores the fetching scripts computed; the archive is filled with stale ones and rescored
+SCORES = {'a1': 0.5, 'a2': -0.1, 'shared': 0.3, 'm1': 0.2}
+
+
+def _news(query_ticker, item_id, tickers):
+    return {'id': f'https://news/{item_id}', 'query_ticker': query_ticker, 'tickers': tickers,
+            'timestamp': '2024-03-01T14:00:00', 'text': item_id, 'score': 0.0}
+
+
+def _tweet(query_ticker, item_id, score, likes, retweets):
+    return {'id': item_id, 'query_ticker': query_ticker, 'tickers': {query_ticker},
+            'timestamp': '2024-03-01T15:00:00Z', 'text': f'tweet {item_id}', 'score': score,
+            'like_count': likes, 'retweet_count': retweets}
+
+
+def test_rescored_news_match_per_ticker_means(tmp_path):
+    archive = RawItemArchive(str(tmp_path), 'news')
+    # The shared article is returned for both queries and mentions a ticker that was not queried
+    archive.append([_news('AAPL', 'a1', {'AAPL'}), _news('AAPL', 'a2', {'AAPL'}),
+                    _news('AAPL', 'shared', {'AAPL', 'MSFT', 'NVDA'})])
+    archive.append([_news('MSFT', 'shared', {'AAPL', 'MSFT', 'NVDA'}), _news('MSFT', 'm1', {'MSFT'})])
+
+    daily = aggregate_daily(archive.rescore(SCORES.get)).set_index('ticker')
+
+    # news_sentiment.analyze_sentiment: plain mean of the items fetched for the ticker
+    assert list(daily.index) == ['AAPL', 'MSFT']
+    assert daily.loc['AAPL', 'sentiment_score'] == pytest.approx((0.5 - 0.1 + 0.3) / 3)
+    assert daily.loc['MSFT', 'sentiment_score'] == pytest.approx((0.3 + 0.2) / 2)
+    assert daily.loc['AAPL', 'item_count'] == 3 and daily.loc['MSFT', 'item_count'] == 2
+
+
+def test_engagement_weighting_matches_social_sentiment(tmp_path):
+    archive = RawItemArchive(str(tmp_path), 'social')
+    archive.append([_tweet('TSLA', 1, 0.6, 3, 1), _tweet('TSLA', 2, -0.2, 0, 0), _tweet('TSLA', 3, 0.4, 1, 0),
+                    _tweet('F', 4, 0.1, 0, 0), _tweet('F', 5, 0.3, 0, 0)])
+
+    daily = aggregate_daily(archive.scan(), weight='engagement').set_index('ticker')
+
+    # social_media_sentiment.analyze_sentiment: engagement-weighted, plain mean without engagement
+    assert daily.loc['TSLA', 'sentiment_score'] == pytest.approx((0.6 * 4 + 0.4 * 1) / 5)
+    assert daily.loc['TSLA', 'engagement'] == 5
+    assert daily.loc['F', 'sentiment_score'] == pytest.approx(0.2)
+
+
+def test_append_skips_archived_items(tmp_path):
+    archive = RawItemArchive(str(tmp_path), 'news')
+    assert archive.append([_news('AAPL', 'a1', {'AAPL'}), _news('AAPL', 'a1', {'AAPL'})]) == 1
+    assert RawItemArchive(str(tmp_path), 'news').append([_news('AAPL', 'a1', {'AAPL'})]) == 0
+    assert archive.append([_news('MSFT', 'a1', {'AAPL'})]) == 1
+    assert len(archive.scan()) == 2
+
+
+def test_edited_item_replaces_its_previous_version(tmp_path):
+    archive = RawItemArchive(str(tmp_path), 'news')
+    archive.append([_news('AAPL', 'a1', {'AAPL'}), _news('AAPL', 'a2', {'AAPL'})])
+    edited = {**_news('AAPL', 'a1', {'AAPL'}), 'text': 'a1 (corrected)'}
+    assert archive.append([edited]) == 1
+    assert archive.append([edited]) == 0
+
+    daily = aggregate_daily(archive.rescore({'a1 (corrected)': -0.4, 'a2': 0.2}.get)).set_index('ticker')
+    assert daily.loc['AAPL', 'item_count'] == 2
+    assert daily.loc['AAPL', 'sentiment_score'] == pytest.approx((-0.4 + 0.2) / 2)
@@ -0,0 +1,30 @@
+import os
+import sys
+
+import torch
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'PredictionModel', 'TransformerModel'))
+from model import GRUTransformer  # noqa: E402
+from streaming import StreamingGRUTransformer, parity_check  # noqa: E402
+
+
+def _model():
+    torch.manual_seed(0)
+    return GRUTransformer(input_dim=4, hidden_dim=16, gru_layers=2, nhead=2, ff_dim=32, transformer_layers=2,
+                          output_dim=1).eval()
+
+
+def test_default_matches_full_recomputation():
+    model = _model()
+    assert StreamingGRUTransformer(model, seq_len=8, n_streams=3).exact_gru
+    X = torch.randn(3, 30, 4)
+    assert parity_check(model, X, seq_len=8) < 1e-5
+
+
+def test_stateful_mode_within_documented_error():
+    model = _model()
+    X = torch.randn(3, 30, 4)
+    with torch.inference_mode():
+        scale = model(X[:, -8:]).std().item()
+    # Approximate by design; stays well below the output spread
+    assert parity_check(model, X, seq_len=8, exact_gru=False) < max(0.5 * scale, 0.05)
@@ -0,0 +1,64 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'PredictionModel',
+                             'Clustering_Fuzzification'))
+from TopoART_GA import TopoART  # noqa: E402
+from stream import StableTopoART  # noqa: E402
+
+
+def test_empty_layer_b():
+    # Three samples never make a layer A node permanent (phi=5), so layer B stays empty
+    X = np.random.default_rng(0).random((3, 2))
+    model = TopoART(phi=5).fit(X)
+    assert model.layer_b.n_nodes == 0
+    assert model.get_clusters_b() == []
+    labels, scores = model.predict(X, layer='b')
+    assert (labels == -1).all() and (scores == 0).all()
+    assert model.transform(X, layer='b').shape == (3, 0)
+
+
+def test_untrained_model():
+    model = TopoART()
+    assert model.get_clusters_a() == []
+    labels, _ = model.predict(np.random.default_rng(0).random((4, 2)))
+    assert (labels == -1).all()
+
+
+def test_save_load_with_empty_layer_b(tmp_path):
+    X = np.random.default_rng(0).random((3, 2))
+    model = TopoART(phi=5).fit(X)
+    path = str(tmp_path / 'topoart.npz')
+    model.save(path)
+    loaded = TopoART.load(path)
+    assert loaded.layer_a.n_nodes == model.layer_a.n_nodes
+    assert loaded.layer_b.n_nodes == 0
+    np.testing.assert_array_equal(loaded.predict(X)[0], model.predict(X)[0])
+    # Training continues from the loaded state, and layer B fills once layer A nodes become permanent
+    X_more = np.repeat(X, 5, axis=0)
+    loaded.partial_fit(X_more)
+    model.partial_fit(X_more)
+    assert loaded.layer_b.n_nodes == model.layer_b.n_nodes > 0
+    np.testing.assert_array_equal(loaded.predict(X, layer='b')[0], model.predict(X, layer='b')[0])
+
+
+def test_stream_cluster_ids_survive_relabelling():
+    rng = np.random.default_rng(0)
+    centers = rng.random((6, 4)) * 0.8 + 0.1
+    X = np.clip(centers[rng.integers(6, size=1500)] + rng.normal(0, 0.05, (1500, 4)), 0, 1)
+    stream, reference = StableTopoART(rho_a=0.8, phi=3, tau=50), TopoART(rho_a=0.8, phi=3, tau=50)
+    previous = {}
+    for x in X:
+        cluster, score = stream.update(x)
+        labels, scores = reference.partial_fit(x[None]).predict(x[None])
+        assert (cluster < 0) == (labels[0] < 0) and score == pytest.approx(scores[0])
+        # A component whose nodes did not change keeps its id, even when TopoART renumbers it
+        layer = stream.model.layer_a
+        current = {frozenset(layer.uids[nodes].tolist()): stream.node_cluster[int(layer.uids[nodes[0]])]
+                   for nodes in layer.get_clusters()}
+        assert all(previous[nodes] == cid for nodes, cid in current.items() if nodes in previous)
+        previous = current
+    assert len(set(previous.values())) == len(previous)